@@ -0,0 +1,59 @@
+"""Biblioteca de edição de SteamID dos saves do Stellar Blade
+
+Os nomes abaixo são importados do submódulo só no primeiro acesso, para
+que 'python -m sbeditor' não carregue o motor inteiro antes de precisar.
+"""
+import importlib
+
+_EXPORTS = {
+    'core': (
+        'STEAMID_LENGTH',
+        'STEAMID_PATTERN',
+        'default_save_root',
+        'is_steamid_folder_name',
+        'parse_steamid',
+        'read_config_steamid',
+        'find_sav_files',
+        'find_sav_file_in_folder',
+        'find_steamid_folders',
+        'steamid_folder_of',
+        'find_steamid',
+        'find_steamid_offsets',
+        'map_save',
+        'read_save',
+        'scan_file',
+        'backup_path_for',
+        'create_backup',
+        'restore_backup',
+        'replace_steamid_in_file',
+        'rename_save_folder',
+    ),
+    'locator': (
+        'ALL_ENCODINGS',
+        'SteamIDHit',
+        'account_id_of',
+        'steamid_from_account_id',
+        'encode_steamid',
+        'locate_steamids',
+    ),
+    'journal': ('PatchJournal',),
+    'migrate': ('migrate_save',),
+    'gvas': ('GvasError', 'GvasFile', 'open_gvas'),
+}
+_MODULE_OF = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULE_OF)
+__version__ = '1.0'
+
+
+def __getattr__(name):
+    module = _MODULE_OF.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
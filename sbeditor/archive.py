@@ -0,0 +1,316 @@
+"""Varredura e patch de saves dentro de arquivos zip/tar, em fluxo, sem extrair para o disco
+
+Cada membro é lido em blocos de tamanho fixo; os últimos MAX_HIT_LENGTH - 1
+bytes de um bloco são mantidos e reprocessados com o seguinte, então uma
+ocorrência que cruza a fronteira entre blocos ainda é encontrada. O patch
+grava um novo arquivo compactado passando cada membro por esse mesmo
+fluxo (a troca de SteamID não muda tamanhos), então a memória usada não
+depende do tamanho do arquivo compactado nem dos membros. O tar é lido em
+modo de fluxo, numa única passada: com getmembers() e extractfile() um tar
+compactado seria descompactado desde o início para cada membro.
+"""
+import os
+import shutil
+import tarfile
+import zipfile
+from contextlib import contextmanager
+
+from . import core, locator, trace
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+_OVERLAP = locator.MAX_HIT_LENGTH - 1
+
+# Compressão do tar pela assinatura do arquivo (para gravar no mesmo formato)
+_TAR_COMPRESSION = ((b'\x1f\x8b', 'gz'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'))
+
+
+def is_archive(path):
+    """Indica se o caminho é um zip ou tar (compactado ou não)"""
+    try:
+        return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+    except OSError:
+        return False
+
+
+def is_save_member(name):
+    return name.lower().endswith('.sav')
+
+
+def _hit_length(hit):
+    return len(locator.encode_steamid(hit.steamid, hit.encoding))
+
+
+def _locate(buffer, steamids, encodings, start, limit):
+    """Ocorrências no buffer a partir de start, só as que começam antes de limit"""
+    hits = locator.iter_steamids(buffer, steamids, encodings, start)
+    result = []
+    for hit in hits:
+        if hit.offset >= limit:
+            break
+        result.append(hit)
+    return result
+
+
+def iter_stream_windows(stream, steamids=None, encodings=locator.ALL_ENCODINGS,
+                        chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lê o fluxo em blocos com sobreposição; gera (buffer, base, limite, ocorrências)
+
+    buffer[:limite] está pronto (não será visto de novo) e pode ser
+    alterado pelo consumidor antes de ir para a saída; base é o offset de
+    buffer[0] no fluxo; os offsets das ocorrências são relativos ao buffer.
+    """
+    buffer = bytearray()
+    base = 0
+    search_from = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        limit = len(buffer) if not chunk else len(buffer) - _OVERLAP
+        hits = _locate(buffer, steamids, encodings, search_from, limit) if limit > search_from else []
+        yield buffer, base, max(limit, 0), hits
+        if not chunk:
+            return
+
+        cut = max(limit, 0)
+        last_end = max((hit.offset + _hit_length(hit) for hit in hits), default=0)
+        search_from = max(search_from, last_end, cut) - cut
+        buffer = buffer[cut:]
+        base += cut
+
+
+def scan_stream(stream, steamids=None, encodings=locator.ALL_ENCODINGS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Todas as ocorrências de SteamID no fluxo, com offsets absolutos"""
+    hits = []
+    for _, base, _, window_hits in iter_stream_windows(stream, steamids, encodings, chunk_size):
+        hits.extend(hit._replace(offset=hit.offset + base) for hit in window_hits)
+    return hits
+
+
+class PatchingReader:
+    """Leitor de arquivo que devolve o fluxo de origem já com o SteamID trocado"""
+
+    def __init__(self, stream, old_steamid, new_steamid, encodings=locator.ALL_ENCODINGS,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        self.new_steamid = new_steamid
+        self.replacements = 0
+        self._windows = iter_stream_windows(stream, [old_steamid], encodings, chunk_size)
+        self._pending = b''
+        self._done = False
+
+    def _fill(self):
+        for buffer, _, limit, hits in self._windows:
+            for hit in hits:
+                new_bytes = locator.encode_steamid(self.new_steamid, hit.encoding)
+                buffer[hit.offset:hit.offset + len(new_bytes)] = new_bytes
+            self.replacements += len(hits)
+            if limit:
+                self._pending = bytes(buffer[:limit])
+                return
+        self._done = True
+
+    def read(self, size=-1):
+        chunks = []
+        wanted = size if size is not None and size >= 0 else None
+        while wanted is None or wanted > 0:
+            if not self._pending:
+                if self._done:
+                    break
+                self._fill()
+                continue
+            take = self._pending if wanted is None else self._pending[:wanted]
+            self._pending = self._pending[len(take):]
+            chunks.append(take)
+            if wanted is not None:
+                wanted -= len(take)
+        return b''.join(chunks)
+
+
+def member_folder_steamid(name):
+    """SteamID da pasta que contém o membro, pelo caminho dentro do arquivo (ou None)"""
+    parts = name.split('/')
+    if len(parts) > 1 and core.is_steamid_folder_name(parts[-2]):
+        return int(parts[-2])
+    return None
+
+
+def rename_member(name, old_steamid, new_steamid):
+    """Troca o componente do caminho igual ao SteamID antigo (pasta do save)"""
+    parts = name.split('/')
+    return '/'.join(str(new_steamid) if part == str(old_steamid) else part for part in parts)
+
+
+def owner_folders(owners):
+    """Pastas de SteamID (caminho dentro do arquivo) com o nome do dono dos saves nelas
+
+    owners é {membro: SteamID dono}; uma pasta cujo nome não é o dono do
+    save que ela contém fica de fora.
+    """
+    return {name.rsplit('/', 1)[0] for name, owner in owners.items()
+            if owner is not None and member_folder_steamid(name) == owner}
+
+
+def rename_in_folders(name, folders, new_steamid):
+    """Troca o nome da pasta de SteamID se o membro estiver numa das pastas dadas"""
+    for folder in folders:
+        if name.rstrip('/') == folder or name.startswith(folder + '/'):
+            parent = folder.rsplit('/', 1)[0] + '/' if '/' in folder else ''
+            return f"{parent}{new_steamid}{name[len(folder):]}"
+    return name
+
+
+@contextmanager
+def _open_archive(archive_path):
+    """Abre o arquivo compactado; gera (tipo, objeto aberto, membros)
+
+    membros gera (membro, feito, total) na ordem do arquivo, uma única vez;
+    feito/total conta membros no zip e bytes compactados lidos no tar. No
+    tar (modo de fluxo) cada membro tem de ser lido antes de pedir o próximo.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            members = archive.infolist()
+            yield 'zip', archive, ((m, done, len(members)) for done, m in enumerate(members, 1))
+    elif tarfile.is_tarfile(archive_path):
+        with open(archive_path, 'rb') as raw:
+            size = os.fstat(raw.fileno()).st_size
+            with tarfile.open(fileobj=raw, mode='r|*') as archive:
+                yield 'tar', archive, ((m, raw.tell(), size) for m in archive)
+    else:
+        raise ValueError(f"Not a zip or tar archive: {archive_path}")
+
+
+def _member_name(kind, member):
+    return member.filename if kind == 'zip' else member.name
+
+
+def _open_member(kind, archive, member):
+    """Fluxo de leitura de um membro (None para pastas e entradas especiais)"""
+    if kind == 'zip':
+        return None if member.is_dir() else archive.open(member)
+    return archive.extractfile(member) if member.isfile() else None
+
+
+def scan_archive(archive_path, steamids=None, encodings=locator.ALL_ENCODINGS,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """SteamIDs de cada .sav do arquivo compactado; retorna [{'member', 'size', 'hits'}]"""
+    results = []
+    with _open_archive(archive_path) as (kind, archive, members), \
+            trace.span('archive_scan', file=archive_path) as info:
+        for member, done, total in members:
+            stream = _open_member(kind, archive, member) if is_save_member(_member_name(kind, member)) else None
+            if stream is not None:
+                with stream:
+                    hits = scan_stream(stream, steamids, encodings, chunk_size)
+                size = member.file_size if kind == 'zip' else member.size
+                results.append({'member': _member_name(kind, member), 'size': size, 'hits': hits})
+            if progress:
+                progress(done, total)
+        info['bytes'] = sum(r['size'] for r in results)
+    return results
+
+
+def _tar_write_mode(archive_path):
+    with open(archive_path, 'rb') as f:
+        magic = f.read(6)
+    for signature, compression in _TAR_COMPRESSION:
+        if magic.startswith(signature):
+            return f"w:{compression}"
+    return 'w'
+
+
+def patch_archive(archive_path, output_path, new_steamid, old_steamid=None, rename=True,
+                  encodings=locator.ALL_ENCODINGS, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Grava uma cópia do arquivo compactado com o SteamID trocado nos .sav
+
+    Sem old_steamid, cada .sav usa o SteamID dono encontrado nele (uma
+    passada de varredura antes do patch; ver locator.owner_steamid). Com
+    rename, a pasta de SteamID dentro do arquivo também muda de nome: sem
+    old_steamid, só as pastas com o nome do dono do save que contêm. A saída é gravada num
+    temporário e só substitui output_path no final.
+    Retorna [{'member', 'new_member', 'old_steamid', 'replacements'}].
+    """
+    new_steamid = core.parse_steamid(new_steamid)
+    # O fluxo não passa pelo GVAS, então o ID de conta (core.patchable_hits) fica como está
+    encodings = tuple(e for e in encodings if e != locator.ENCODING_ACCOUNT_ID)
+    if os.path.abspath(output_path) == os.path.abspath(archive_path):
+        raise ValueError("Output must be a different file than the archive")
+
+    owners = {}
+    if old_steamid is None:
+        for result in scan_archive(archive_path, encodings=encodings, chunk_size=chunk_size):
+            if result['hits']:
+                owners[result['member']] = locator.owner_steamid(result['hits'],
+                                                                 member_folder_steamid(result['member']))
+
+    folders = owner_folders(owners)
+    tmp_path = core.temp_path_for(output_path)
+    results = []
+    try:
+        with _open_archive(archive_path) as (kind, archive, members), \
+                trace.span('archive_patch', file=archive_path) as info:
+            if kind == 'zip':
+                writer = zipfile.ZipFile(tmp_path, 'w', allowZip64=True)
+            else:
+                writer = tarfile.open(tmp_path, _tar_write_mode(archive_path), format=archive.format)
+            with writer:
+                for member, done, total in members:
+                    results.append(_copy_member(kind, archive, writer, member, new_steamid,
+                                                old_steamid, owners, folders, rename, encodings,
+                                                chunk_size))
+                    if progress:
+                        progress(done, total)
+            info['bytes'] = os.path.getsize(tmp_path)
+        core.fsync_path(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return [r for r in results if r is not None]
+
+
+def _copy_member(kind, archive, writer, member, new_steamid, old_steamid, owners, folders, rename,
+                 encodings, chunk_size):
+    """Copia um membro para o novo arquivo, trocando o SteamID se for um .sav"""
+    name = _member_name(kind, member)
+    member_old = old_steamid if old_steamid is not None else owners.get(name)
+    is_save = is_save_member(name) and member_old is not None and int(member_old) != new_steamid
+
+    new_name = name
+    if rename and old_steamid is not None:
+        new_name = rename_member(name, old_steamid, new_steamid)
+    elif rename:
+        new_name = rename_in_folders(name, folders, new_steamid)
+
+    stream = _open_member(kind, archive, member)
+    reader = None
+    if stream is not None and is_save:
+        reader = PatchingReader(stream, member_old, new_steamid, encodings, chunk_size)
+
+    try:
+        if kind == 'zip':
+            info = zipfile.ZipInfo(new_name, member.date_time)
+            info.compress_type = member.compress_type
+            info.external_attr = member.external_attr
+            info.comment = member.comment
+            if stream is None:
+                writer.writestr(info, b'')
+            else:
+                with writer.open(info, 'w', force_zip64=member.file_size >= zipfile.ZIP64_LIMIT) as dst:
+                    shutil.copyfileobj(reader or stream, dst, chunk_size)
+        else:
+            info = tarfile.TarInfo(new_name)
+            for attribute in ('size', 'mtime', 'mode', 'type', 'linkname', 'uid', 'gid', 'uname', 'gname'):
+                setattr(info, attribute, getattr(member, attribute))
+            writer.addfile(info, reader or stream)
+    finally:
+        if stream is not None:
+            stream.close()
+
+    if not is_save_member(name):
+        return None
+    return {
+        'member': name,
+        'new_member': new_name,
+        'old_steamid': member_old,
+        'replacements': reader.replacements if reader is not None else 0,
+    }
@@ -0,0 +1,216 @@
+"""Repositório de backups deduplicado: blocos endereçados por hash e comprimidos
+
+Cada snapshot de um save é dividido em blocos de tamanho fixo; cada bloco
+é gravado uma única vez em objects/, comprimido com zlib ou lzma e
+identificado pelo SHA-256 do conteúdo original. O índice de cada save
+(snapshots/<chave>.json) lista os snapshots e a sequência de blocos de
+cada um. Como a troca de SteamID altera poucos bytes, um novo snapshot
+custa apenas os blocos que mudaram.
+"""
+import hashlib
+import json
+import lzma
+import os
+import time
+import zlib
+
+from . import core, trace
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+COMPRESSORS = {
+    'zlib': ('.z', lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': ('.xz', lzma.compress, lzma.decompress),
+}
+
+
+def default_store_dir():
+    """Pasta do repositório de backups (SBEDITOR_BACKUP_DIR, LOCALAPPDATA ou ~/.local/share)"""
+    if os.getenv('SBEDITOR_BACKUP_DIR'):
+        return os.getenv('SBEDITOR_BACKUP_DIR')
+    if os.getenv('LOCALAPPDATA'):
+        return os.path.join(os.getenv('LOCALAPPDATA'), 'SBSteamIDEditor', 'backups')
+    base = os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'sbeditor', 'backups')
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BackupStore:
+    """Repositório de snapshots deduplicados de arquivos .sav"""
+
+    def __init__(self, root=None, chunk_size=DEFAULT_CHUNK_SIZE, compression='zlib'):
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.root = root or default_store_dir()
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.snapshots_dir = os.path.join(self.root, 'snapshots')
+
+    def __reduce__(self):
+        # Permite enviar o repositório para processos filhos (migração em lote)
+        return (BackupStore, (self.root, self.chunk_size, self.compression))
+
+    def _index_path(self, file_path):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(file_path)).encode('utf-8')).hexdigest()
+        return os.path.join(self.snapshots_dir, f"{key[:20]}.json")
+
+    def _object_path(self, chunk_hash, compression):
+        extension = COMPRESSORS[compression][0]
+        return os.path.join(self.objects_dir, chunk_hash[:2], chunk_hash[2:] + extension)
+
+    def _load_index(self, file_path):
+        try:
+            with open(self._index_path(file_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'path': os.path.abspath(file_path), 'snapshots': []}
+
+    def _save_index(self, file_path, index):
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        index['path'] = os.path.abspath(file_path)
+        _write_atomic(self._index_path(file_path),
+                      json.dumps(index, indent=1).encode('utf-8'))
+
+    def _put_chunk(self, chunk):
+        """Grava o bloco se ainda não existir; retorna (hash, bytes gravados)"""
+        chunk_hash = hashlib.sha256(chunk).hexdigest()
+        object_path = self._object_path(chunk_hash, self.compression)
+        if os.path.exists(object_path):
+            return chunk_hash, 0
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        compressed = COMPRESSORS[self.compression][1](chunk)
+        _write_atomic(object_path, compressed)
+        return chunk_hash, len(compressed)
+
+    def _get_chunk(self, chunk_hash, compression):
+        with open(self._object_path(chunk_hash, compression), 'rb') as f:
+            chunk = COMPRESSORS[compression][2](f.read())
+        if hashlib.sha256(chunk).hexdigest() != chunk_hash:
+            raise Exception(f"Corrupted backup chunk: {chunk_hash}")
+        return chunk
+
+    def snapshot(self, file_path, note='', progress=None, cancel=None, steamid=None):
+        """Guarda um snapshot do arquivo; só blocos novos ocupam espaço
+
+        steamid só rotula o snapshot; sem ele vale o SteamID do nome da pasta,
+        para não ler o arquivo uma segunda vez só para isso.
+        """
+        with trace.span('snapshot', file=file_path) as info:
+            snapshot = self._snapshot(file_path, note, progress, cancel, steamid)
+            info['bytes'] = snapshot['size']
+            info['stored_bytes'] = snapshot['stored_bytes']
+        return snapshot
+
+    def _snapshot(self, file_path, note, progress, cancel, steamid):
+        check_cancel = core.make_cancel_check(cancel)
+        st = os.stat(file_path)
+        file_hash = hashlib.sha256()
+        chunks = []
+        stored_bytes = 0
+        new_chunks = 0
+        done = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                if check_cancel:
+                    check_cancel()
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                file_hash.update(chunk)
+                chunk_hash, written = self._put_chunk(chunk)
+                chunks.append(chunk_hash)
+                if written:
+                    new_chunks += 1
+                    stored_bytes += written
+                done += len(chunk)
+                if progress:
+                    progress(done, st.st_size)
+
+        digest = file_hash.hexdigest()
+        created = time.time()
+        snapshot = {
+            'id': f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}-{digest[:8]}",
+            'created': created,
+            'size': done,
+            'mtime': st.st_mtime,
+            'sha256': digest,
+            'steamid': steamid if steamid is not None else core.folder_steamid_of(file_path),
+            'note': note,
+            'chunk_size': self.chunk_size,
+            'compression': self.compression,
+            'chunks': chunks,
+            'new_chunks': new_chunks,
+            'stored_bytes': stored_bytes,
+        }
+        index = self._load_index(file_path)
+        index['snapshots'].append(snapshot)
+        self._save_index(file_path, index)
+        return snapshot
+
+    def list_snapshots(self, file_path):
+        """Snapshots do arquivo, do mais antigo ao mais recente"""
+        return self._load_index(file_path)['snapshots']
+
+    def get_snapshot(self, file_path, snapshot_id=None):
+        """Snapshot pelo id (ou prefixo do id); sem id, o mais recente"""
+        snapshots = self.list_snapshots(file_path)
+        if not snapshots:
+            raise Exception(f"No snapshots for {file_path}")
+        if snapshot_id is None:
+            return snapshots[-1]
+        matches = [s for s in snapshots if s['id'].startswith(snapshot_id)]
+        if len(matches) != 1:
+            raise Exception(f"Snapshot not found or ambiguous: {snapshot_id}")
+        return matches[0]
+
+    def restore(self, file_path, snapshot_id=None, target_path=None):
+        """Reconstrói o snapshot e substitui o arquivo de forma atômica"""
+        snapshot = self.get_snapshot(file_path, snapshot_id)
+        target_path = target_path or file_path
+        tmp_path = core.temp_path_for(target_path)
+        file_hash = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk_hash in snapshot['chunks']:
+                    chunk = self._get_chunk(chunk_hash, snapshot['compression'])
+                    file_hash.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if file_hash.hexdigest() != snapshot['sha256']:
+                raise Exception(f"Snapshot {snapshot['id']} failed verification")
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return snapshot
+
+    def move_history(self, old_path, new_path):
+        """Transfere o histórico quando o save muda de caminho (pasta renomeada)"""
+        old_index_path = self._index_path(old_path)
+        if not os.path.exists(old_index_path):
+            return
+        index = self._load_index(old_path)
+        existing = self._load_index(new_path)
+        index['snapshots'] = existing['snapshots'] + index['snapshots']
+        index['snapshots'].sort(key=lambda s: s['created'])
+        self._save_index(new_path, index)
+        os.remove(old_index_path)
+
+    def stats(self):
+        """Número de objetos e bytes ocupados no repositório"""
+        objects = 0
+        stored_bytes = 0
+        for folder, _, files in os.walk(self.objects_dir):
+            for name in files:
+                objects += 1
+                stored_bytes += os.path.getsize(os.path.join(folder, name))
+        return {'objects': objects, 'stored_bytes': stored_bytes}
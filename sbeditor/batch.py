@@ -0,0 +1,185 @@
+"""Migração em lote de uma árvore SaveGames inteira usando vários processos"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import core, locator, trace
+from .migrate import patch_save
+from .transaction import STATE_PATCHING, Transaction
+
+
+def read_steamid_map(map_path):
+    """Lê um arquivo de mapeamento 'SteamID_antigo SteamID_novo' (ou separado por vírgula)"""
+    mapping = {}
+    with open(map_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].replace(',', ' ').strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise ValueError(f"{map_path}:{line_number}: expected 'OLD NEW'")
+            mapping[str(core.parse_steamid(parts[0]))] = core.parse_steamid(parts[1])
+    return mapping
+
+
+def collect_saves(save_root, targets=None):
+    """Lista (pasta, arquivos .sav) de cada pasta de SteamID a migrar"""
+    folders = []
+    for folder in core.find_steamid_folders(save_root):
+        name = os.path.basename(folder)
+        if targets is not None and name not in targets:
+            continue
+        folders.append((folder, core.find_sav_files(folder)))
+    return folders
+
+
+def patch_file_job(file_path, new_steamid, fallback_steamid=None, backup=False, old_steamid=None,
+                   store=None, journal=True):
+    """Executa a troca de SteamID de um único arquivo (roda em um processo filho)
+
+    old_steamid, quando já conhecido (cache de varredura), evita varrer o arquivo.
+    O diário de patches é sempre gravado (salvo journal=False); backup
+    acrescenta o .bak completo, ou um snapshot quando há store.
+    """
+    result = {
+        'file': file_path,
+        'old_steamid': None,
+        'new_steamid': new_steamid,
+        'backup': None,
+        'backup_strategy': None,
+        'snapshot': None,
+        'journaled': False,
+        'replacements': 0,
+        'error': None,
+        'spans': [],
+    }
+    try:
+        old_steamid = old_steamid or core.scan_file(file_path) or fallback_steamid
+        if not old_steamid:
+            raise Exception("Current SteamID not found in file!")
+        result['old_steamid'] = old_steamid
+
+        if old_steamid == new_steamid:
+            return result
+
+        result.update(patch_save(file_path, old_steamid, new_steamid, backup=backup,
+                                 store=store, journal=journal))
+        if result['replacements'] == 0:
+            raise Exception("Failed to find SteamID in file for replacement!")
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        # Os spans do processo filho voltam para o tracer do processo principal
+        result['spans'] = trace.get_tracer().drain()
+    return result
+
+
+def migrate_tree(save_root, targets, workers=None, rename=True, backup=False, progress=None,
+                 cache=None, store=None, journal=True):
+    """Migra todas as pastas de SteamID de save_root conforme o mapeamento targets
+
+    targets mapeia o nome da pasta antiga (str) para o novo SteamID (int).
+    Os .sav são processados em paralelo. Cada pasta é uma transação: se
+    algum arquivo falhar ou a renomeação não for possível, os patches já
+    gravados na pasta são desfeitos; se o processo morrer no meio, a
+    próxima execução completa ou desfaz a pasta (transaction.recover).
+    Com cache, o SteamID atual de arquivos não modificados vem do cache
+    em vez de uma nova varredura.
+    Retorna (resultados por arquivo, resultados por pasta).
+    """
+    folders = collect_saves(save_root, targets)
+    file_results = []
+    folder_files = {}
+    transactions = {}
+    folder_errors = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for folder, sav_files in folders:
+            name = os.path.basename(folder)
+            folder_files[folder] = []
+            try:
+                transaction = Transaction.begin(sav_files, int(name), targets[name], folder=folder,
+                                                rename=rename, backup=backup, store=store,
+                                                journal=journal)
+                transaction.set_state(STATE_PATCHING)
+            except Exception as e:
+                folder_errors[folder] = str(e)
+                continue
+            transactions[folder] = transaction
+            for sav_file in sav_files:
+                hits = cache.get_hits(sav_file) if cache is not None else None
+                known_steamid = locator.owner_steamid(hits, int(name)) if hits else None
+                future = executor.submit(patch_file_job, sav_file, targets[name],
+                                         int(name), backup, known_steamid, store, journal)
+                futures[future] = folder
+
+        for future in as_completed(futures):
+            result = future.result()
+            trace.get_tracer().extend(result.pop('spans'))
+            if cache is not None and result['replacements']:
+                cache.invalidate(result['file'])
+            folder_files[futures[future]].append(result)
+            file_results.append(result)
+            if progress:
+                progress(result)
+
+    folder_results = []
+    for folder, sav_files in folders:
+        name = os.path.basename(folder)
+        results = folder_files[folder]
+        folder_result = {
+            'folder': folder,
+            'new_steamid': targets[name],
+            'files': len(sav_files),
+            'renamed': False,
+            'message': '',
+        }
+        folder_results.append(folder_result)
+
+        if folder in folder_errors:
+            # Nada foi gravado: a pasta inteira é recusada antes do patch
+            folder_result['message'] = folder_errors[folder]
+            for sav_file in sav_files:
+                result = {'file': sav_file, 'old_steamid': None, 'new_steamid': targets[name],
+                          'backup': None, 'snapshot': None, 'journaled': False,
+                          'replacements': 0, 'error': folder_errors[folder]}
+                file_results.append(result)
+                if progress:
+                    progress(result)
+            continue
+
+        transaction = transactions[folder]
+        reason = None
+        if any(r['error'] for r in results):
+            reason = "some files failed"
+        else:
+            success, message, new_folder = transaction.rename_folder()
+            if success:
+                folder_result['renamed'] = new_folder != folder
+                folder_result['message'] = message
+            else:
+                reason = message
+
+        if reason is None:
+            transaction.commit()
+            if folder_result['renamed']:
+                for result in results:
+                    result['file'] = os.path.join(new_folder, os.path.basename(result['file']))
+                    if result['backup']:
+                        result['backup'] = os.path.join(new_folder, os.path.basename(result['backup']))
+            continue
+
+        try:
+            transaction.roll_back()
+            folder_result['message'] = f"Rolled back: {reason}"
+        except Exception as e:
+            folder_result['message'] = f"{reason}; rollback failed (retried on next run): {e}"
+        for result in results:
+            if cache is not None:
+                cache.invalidate(result['file'])
+            if not result['error'] and result['replacements']:
+                result['error'] = folder_result['message']
+
+    file_results.sort(key=lambda r: r['file'])
+    return file_results, folder_results
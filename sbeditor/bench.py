@@ -0,0 +1,179 @@
+"""Benchmark de varredura, patch e backup sobre saves sintéticos
+
+Cada etapa roda num processo novo, para que o pico de memória (RSS) seja
+só dela. Para cada tamanho de arquivo e etapa são medidos o tempo (o
+melhor de N repetições, com o cache de páginas já aquecido), a vazão em
+MB/s, o pico de RSS e, no Linux, o número de chamadas de sistema de
+leitura e escrita (/proc/self/io). Os resultados podem ser gravados como
+linha de base e comparados nas execuções seguintes.
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import core, synthetic
+from .cache import default_cache_dir, scan_file_cached
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ('scan', 'locate', 'backup', 'patch', 'full_write')
+DEFAULT_SIZES = ('1M', '64M', '256M')
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+BASELINE_VERSION = 1
+NEW_STEAMID = 76561198000000099
+
+
+def default_baseline_path():
+    """Arquivo da linha de base (na pasta de cache do editor)"""
+    return os.path.join(default_cache_dir(), 'benchmark-baseline.json')
+
+
+def _io_counters():
+    """Chamadas de sistema de leitura/escrita do processo (só no Linux)"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['syscr']), int(counters['syscw'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _peak_rss():
+    """Pico de memória residente do processo, em bytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_stage(stage, file_path, steamid):
+    """Executa uma etapa (em um processo filho) e devolve as medidas"""
+    io_before = _io_counters()
+    start = time.perf_counter()
+    strategy = None
+    if stage == 'scan':
+        scan_file_cached(file_path)
+    elif stage == 'locate':
+        with core.map_save(file_path) as data:
+            core.find_steamid_offsets(data, steamid)
+    elif stage == 'backup':
+        strategy = core.backup_file(file_path)[1]
+    elif stage == 'patch':
+        core.replace_steamid_in_file(file_path, steamid, NEW_STEAMID)
+    elif stage == 'full_write':
+        core.replace_steamid_in_file(file_path, steamid, NEW_STEAMID, in_place=False)
+    else:
+        raise ValueError(f"Unknown benchmark stage: {stage}")
+    elapsed = time.perf_counter() - start
+    io_after = _io_counters()
+
+    # Volta o arquivo ao estado inicial fora da medição
+    if stage == 'backup':
+        os.remove(core.backup_path_for(file_path))
+    elif stage in ('patch', 'full_write'):
+        core.replace_steamid_in_file(file_path, NEW_STEAMID, steamid)
+
+    syscalls = None
+    if io_before and io_after:
+        syscalls = {'read': io_after[0] - io_before[0], 'write': io_after[1] - io_before[1]}
+    return {'seconds': elapsed, 'peak_rss': _peak_rss(), 'syscalls': syscalls, 'strategy': strategy}
+
+
+def measure_stage(stage, file_path, steamid, repeat=DEFAULT_REPEAT):
+    """Melhor de repeat execuções da etapa, cada uma em um processo novo"""
+    best = None
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(_run_stage, stage, file_path, steamid).result()
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    size = os.path.getsize(file_path)
+    best['bytes'] = size
+    best['mb_s'] = size / (1024 * 1024) / best['seconds'] if best['seconds'] > 0 else None
+    return best
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, density=synthetic.DEFAULT_DENSITY,
+                   repeat=DEFAULT_REPEAT, work_dir=None, progress=None):
+    """Gera os saves sintéticos e mede cada etapa; retorna {'<tamanho>/<etapa>': medidas}
+
+    progress(chave, medidas) é chamado a cada etapa concluída.
+    """
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown benchmark stage: {stage}")
+    own_dir = work_dir is None
+    if own_dir:
+        work_dir = tempfile.mkdtemp(prefix='sbeditor-bench-')
+    else:
+        os.makedirs(work_dir, exist_ok=True)
+    results = {}
+    try:
+        for size_text in sizes:
+            size = synthetic.parse_size(size_text)
+            file_path = os.path.join(work_dir, f"bench-{synthetic.format_size(size)}.sav")
+            synthetic.generate_save(file_path, size, density=density)
+            for stage in stages:
+                key = f"{synthetic.format_size(size)}/{stage}"
+                results[key] = measure_stage(stage, file_path, synthetic.DEFAULT_STEAMID, repeat)
+                if progress:
+                    progress(key, results[key])
+            os.remove(file_path)
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def save_baseline(results, path=None, density=synthetic.DEFAULT_DENSITY):
+    """Grava os resultados como linha de base, com a identificação da máquina"""
+    path = path or default_baseline_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    content = {
+        'version': BASELINE_VERSION,
+        'created': time.time(),
+        'machine': platform.node(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'density': density,
+        'results': results,
+    }
+    core.atomic_write(path, json.dumps(content, indent=1).encode('utf-8'))
+    return path
+
+
+def load_baseline(path=None):
+    """Lê a linha de base; None se não existir"""
+    try:
+        with open(path or default_baseline_path(), 'r', encoding='utf-8') as f:
+            content = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if content.get('version') != BASELINE_VERSION:
+        return None
+    return content
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Lista as regressões: vazão menor ou pico de RSS maior que a base além da tolerância"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline['results'].get(key)
+        if not base:
+            continue
+        if base.get('mb_s') and current.get('mb_s') and current['mb_s'] < base['mb_s'] * (1 - tolerance):
+            regressions.append(f"{key}: {current['mb_s']:.1f} MB/s vs {base['mb_s']:.1f} MB/s baseline")
+        if base.get('peak_rss') and current.get('peak_rss') \
+                and current['peak_rss'] > base['peak_rss'] * (1 + tolerance):
+            regressions.append(f"{key}: peak RSS {current['peak_rss'] // 1024} KiB vs "
+                               f"{base['peak_rss'] // 1024} KiB baseline")
+    return regressions
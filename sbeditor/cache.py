@@ -0,0 +1,301 @@
+"""Cache persistente dos resultados de varredura, indexado pela identidade do arquivo
+
+Cada entrada guarda também um hash curto por bloco de 1 MiB. Quando o
+arquivo muda, só os blocos cujo hash mudou (com MAX_HIT_LENGTH - 1 bytes
+de cada lado, para as ocorrências que cruzam a fronteira) são varridos de
+novo; as ocorrências dos outros blocos vêm da entrada anterior.
+
+Descobrir quais blocos mudaram exige ler e hashear o arquivo inteiro, então
+a varredura incremental economiza a busca, não a leitura. Qualquer mudança
+de identidade (inclusive só de inode, com tamanho e mtime iguais) passa
+por essa leitura completa: uma amostra de blocos não garante que o resto
+do arquivo é o mesmo.
+"""
+import bisect
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, locator, trace
+from .locator import SteamIDHit
+
+CACHE_VERSION = 1
+CACHE_FILE_NAME = 'scan_cache.json'
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_SCAN_WORKERS = 4
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+_OVERLAP = locator.MAX_HIT_LENGTH - 1
+# Acima desta fração de blocos alterados, a varredura completa sai mais barata
+_MAX_CHANGED_FRACTION = 0.5
+
+
+def default_cache_dir():
+    """Pasta de cache do editor (SBEDITOR_CACHE_DIR, LOCALAPPDATA ou ~/.cache)"""
+    if os.getenv('SBEDITOR_CACHE_DIR'):
+        return os.getenv('SBEDITOR_CACHE_DIR')
+    if os.getenv('LOCALAPPDATA'):
+        return os.path.join(os.getenv('LOCALAPPDATA'), 'SBSteamIDEditor')
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sbeditor')
+
+
+def file_identity(st):
+    """Identidade do arquivo: tamanho, mtime e inode/dispositivo"""
+    return [st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev]
+
+
+def hash_buffer(data):
+    """Hash de conteúdo usado no cache (BLAKE2b)"""
+    with trace.span('hash', bytes=len(data)):
+        return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+def hash_blocks(data, block_size=DEFAULT_BLOCK_SIZE):
+    """Hash do conteúdo (o mesmo de hash_buffer) e hashes curtos de cada bloco, numa só leitura"""
+    with trace.span('hash', bytes=len(data), blocks=True):
+        digest = hashlib.blake2b(digest_size=32)
+        blocks = []
+        for start in range(0, len(data), block_size):
+            block = data[start:start + block_size]
+            digest.update(block)
+            blocks.append(hashlib.blake2b(block, digest_size=8).hexdigest())
+        return digest.hexdigest(), blocks
+
+
+def changed_ranges(blocks, previous_blocks, size, block_size=DEFAULT_BLOCK_SIZE):
+    """Intervalos (início, fim) a varrer de novo: blocos alterados mais a sobreposição, unidos"""
+    ranges = []
+    for i, block_hash in enumerate(blocks):
+        if i < len(previous_blocks) and previous_blocks[i] == block_hash:
+            continue
+        start = max(0, i * block_size - _OVERLAP)
+        end = min(size, (i + 1) * block_size + _OVERLAP)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return [tuple(r) for r in ranges]
+
+
+def rescan_ranges(data, previous_hits, ranges, progress=None, cancel=None):
+    """Ocorrências de data: as de previous_hits fora de ranges, mais a nova varredura de ranges
+
+    Uma ocorrência que começa fora dos intervalos não toca nenhum bloco
+    alterado (cada intervalo tem MAX_HIT_LENGTH - 1 bytes de folga), então
+    continua valendo se ainda couber no arquivo.
+    """
+    total = sum(end - start for start, end in ranges)
+    starts = [start for start, _ in ranges]
+
+    def outside(offset):
+        i = bisect.bisect_right(starts, offset) - 1
+        return i < 0 or offset >= ranges[i][1]
+
+    hits = [hit for hit in previous_hits
+            if outside(hit.offset)
+            and hit.offset + len(locator.encode_steamid(hit.steamid, hit.encoding)) <= len(data)]
+    done = 0
+    with memoryview(data) as view:
+        for start, end in ranges:
+            # Lê um pouco além do fim para achar as que começam antes dele
+            with view[start:min(len(data), end + _OVERLAP)] as part:
+                found = core.find_steamid_offsets(part, cancel=cancel)
+            hits.extend(hit._replace(offset=hit.offset + start) for hit in found
+                        if hit.offset + start < end)
+            done += end - start
+            if progress:
+                progress(done, total)
+    hits.sort(key=lambda hit: hit.offset)
+    return hits
+
+
+class ScanCache:
+    """Cache LRU em disco: caminho → identidade, hash e ocorrências de SteamID"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.path.join(default_cache_dir(), CACHE_FILE_NAME)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == CACHE_VERSION:
+                self._entries.update(content.get('entries', {}))
+        except (OSError, ValueError, AttributeError):
+            # Cache ausente ou corrompido: começa vazio
+            pass
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def get(self, file_path, st=None):
+        """Retorna a entrada do arquivo se a identidade não mudou, senão None"""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            try:
+                st = st or os.stat(key)
+            except OSError:
+                st = None
+            if st is None or entry['identity'] != file_identity(st):
+                # Fica para previous(): o mapa de blocos serve à varredura incremental
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+            return entry
+
+    def previous(self, file_path):
+        """Última entrada do arquivo, mesmo que ele tenha mudado depois (ou None)"""
+        with self._lock:
+            self._load()
+            return self._entries.get(os.path.abspath(file_path))
+
+    def get_hits(self, file_path, st=None):
+        """Ocorrências em cache do arquivo (lista de SteamIDHit) ou None"""
+        entry = self.get(file_path, st)
+        if entry is None:
+            return None
+        return [SteamIDHit(*hit) for hit in entry['hits']]
+
+    def put(self, file_path, st, hits, content_hash, **extra):
+        """Guarda o resultado da varredura para a identidade atual do arquivo"""
+        key = os.path.abspath(file_path)
+        entry = {
+            'identity': file_identity(st),
+            'hash': content_hash,
+            'hits': [list(hit) for hit in hits],
+        }
+        entry.update(extra)
+        with self._lock:
+            self._load()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        return entry
+
+    def invalidate(self, file_path):
+        """Força nova varredura do arquivo (o mapa de blocos continua valendo para a incremental)"""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and entry['identity'] is not None:
+                entry['identity'] = None
+                self._dirty = True
+
+    def clear(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = True
+
+    def save(self):
+        """Grava o cache em disco de forma atômica, respeitando o limite de tamanho"""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            while True:
+                content = json.dumps({'version': CACHE_VERSION, 'entries': self._entries},
+                                     separators=(',', ':'))
+                if len(content) <= self.max_bytes or not self._entries:
+                    break
+                # Descarta o quarto menos usado recentemente e tenta de novo
+                for _ in range(max(1, len(self._entries) // 4)):
+                    self._entries.popitem(last=False)
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def scan_file_cached(file_path, cache=None, progress=None, cancel=None):
+    """Varre o arquivo (ou usa o cache); retorna (ocorrências, hash, veio_do_cache)
+
+    Se o arquivo mudou desde a entrada guardada, só os blocos alterados
+    são varridos de novo (veio_do_cache continua False), mas o arquivo
+    inteiro ainda é lido para achar esses blocos.
+    """
+    st = os.stat(file_path)
+    with trace.span('scan', file=file_path, size=st.st_size) as info:
+        info['from_cache'] = False
+        previous = None
+        if cache is not None:
+            entry = cache.get(file_path, st)
+            if entry is not None:
+                info['from_cache'] = True
+                return [SteamIDHit(*hit) for hit in entry['hits']], entry['hash'], True
+            previous = cache.previous(file_path)
+
+        with core.map_save(file_path) as data:
+            if cache is None:
+                hits = core.find_steamid_offsets(data, progress=progress, cancel=cancel)
+                content_hash = hash_buffer(data)
+                blocks = None
+            else:
+                content_hash, blocks = hash_blocks(data)
+                ranges = None
+                if previous is not None and previous.get('block_size') == DEFAULT_BLOCK_SIZE:
+                    ranges = changed_ranges(blocks, previous['blocks'], len(data))
+                    if sum(end - start for start, end in ranges) > len(data) * _MAX_CHANGED_FRACTION:
+                        ranges = None
+                if ranges is None:
+                    hits = core.find_steamid_offsets(data, progress=progress, cancel=cancel)
+                else:
+                    hits = rescan_ranges(data, [SteamIDHit(*hit) for hit in previous['hits']], ranges,
+                                         progress, cancel)
+                    info['rescanned'] = sum(end - start for start, end in ranges)
+        info['bytes'] = st.st_size
+
+    # Só guarda se o arquivo não mudou durante a varredura
+    if cache is not None and file_identity(os.stat(file_path)) == file_identity(st):
+        cache.put(file_path, st, hits, content_hash, block_size=DEFAULT_BLOCK_SIZE, blocks=blocks)
+    return hits, content_hash, False
+
+
+def scan_files_cached(paths, cache=None, workers=DEFAULT_SCAN_WORKERS):
+    """Varre vários arquivos em paralelo; gera (caminho, resultado de scan_file_cached ou OSError)
+
+    O hash libera o GIL, então as threads ocupam vários núcleos; nas
+    buscas do locator, ainda sobrepõem a leitura do disco. Os resultados saem na ordem de paths.
+    """
+    def scan(path):
+        try:
+            return scan_file_cached(path, cache)
+        except OSError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from zip(paths, executor.map(scan, paths))
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Instância compartilhada do cache padrão"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ScanCache()
+    return _default_cache
@@ -0,0 +1,933 @@
+"""Linha de comando do editor (sem interface gráfica)
+
+Cada comando importa só os módulos de que precisa: o servidor HTTP, os
+arquivos zip/tar, o pool de processos etc. não pesam na partida de quem
+não os usa (nem no --help).
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+from datetime import datetime
+
+from . import core, trace
+
+# Comandos que gravam saves: antes deles, as migrações interrompidas são concluídas ou desfeitas
+MUTATING_COMMANDS = {'patch', 'restore', 'undo', 'redo', 'batch', 'apply', 'clone', 'archive-patch',
+                     'watch', 'serve'}
+
+
+class LazyDefault:
+    """Valor padrão de uma opção lido da constante de um módulo só quando é usado
+
+    Assim o --help (que mostra o valor) e o comando escolhido importam o
+    módulo, e os outros comandos não.
+    """
+
+    def __init__(self, module, name, convert=None):
+        self.module = module
+        self.name = name
+        self.convert = convert
+
+    def resolve(self):
+        value = getattr(importlib.import_module(f'.{self.module}', __package__), self.name)
+        return self.convert(value) if self.convert else value
+
+    def __str__(self):
+        return str(self.resolve())
+
+
+def steamid_arg(value):
+    """Tipo das opções de SteamID: um valor inválido vira erro de uso antes de qualquer trabalho"""
+    try:
+        return core.parse_steamid(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def resolve_defaults(args):
+    """Troca os LazyDefault que sobraram em args pelos valores reais"""
+    for name, value in vars(args).items():
+        if isinstance(value, LazyDefault):
+            setattr(args, name, value.resolve())
+    return args
+
+
+def open_cache(args):
+    """Cache de varredura conforme --no-cache/--cache"""
+    if getattr(args, 'no_cache', False):
+        return None
+    from .cache import ScanCache
+    return ScanCache(getattr(args, 'cache', None))
+
+
+def open_store(args):
+    """Repositório de backups deduplicado, se --store/--store-dir foi pedido"""
+    from .backup_store import BackupStore
+    if getattr(args, 'store_dir', None):
+        return BackupStore(args.store_dir, compression=args.compression)
+    if getattr(args, 'store', False):
+        return BackupStore(compression=args.compression)
+    return None
+
+
+def add_store_arguments(parser):
+    """Opções do repositório de backups"""
+    parser.add_argument('--store', action='store_true',
+                        help="keep backups as deduplicated snapshots instead of .bak files")
+    parser.add_argument('--store-dir', help="backup store folder (implies --store)")
+    parser.add_argument('--compression', choices=('zlib', 'lzma'), default='zlib',
+                        help="compression for new snapshot chunks (default: zlib)")
+
+
+def collect_sav_paths(paths):
+    """Expande pastas (SaveGames ou pasta de SteamID) na lista de .sav"""
+    sav_paths = []
+    for path in paths or [core.default_save_root()]:
+        if os.path.isdir(path):
+            folders = core.find_steamid_folders(path) or [path]
+            for folder in folders:
+                sav_paths.extend(core.find_sav_files(folder))
+        else:
+            sav_paths.append(path)
+    return sav_paths
+
+
+def cmd_scan(args):
+    """Mostra o SteamID encontrado em cada arquivo"""
+    from . import gvas, locator
+    from .cache import scan_files_cached
+    paths = collect_sav_paths(args.paths)
+    if not paths:
+        print("No .sav files found", file=sys.stderr)
+        return 1
+
+    cache = open_cache(args)
+    status = 0
+    for path, scanned in scan_files_cached(paths, cache, workers=args.workers):
+        try:
+            if isinstance(scanned, OSError):
+                raise scanned
+            hits, _, _ = scanned
+            owners = [''] * len(hits)
+            if args.all and hits:
+                with core.map_save(path) as data:
+                    save = gvas.open_gvas(data)
+                    if save is not None:
+                        owners = [save.leaf_at(hit.offset) for hit in hits]
+                        owners = [prop.path if prop else '(outside known property)'
+                                  for prop in owners]
+        except OSError as e:
+            print(f"{path}: error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        steamid = locator.owner_steamid(hits, core.folder_steamid_of(path))
+        print(f"{path}: {steamid if steamid else 'not found'}")
+        if args.all:
+            for hit, owner in zip(hits, owners):
+                print(f"  0x{hit.offset:08x} {hit.encoding:<10} {hit.steamid} {owner}".rstrip())
+    if cache is not None:
+        cache.save()
+    return status
+
+
+def warn_unsafe_hits(file_path, old_steamid):
+    """Avisa quando a troca tocaria bytes fora de propriedades string/int do GVAS"""
+    from . import gvas
+    with core.map_save(file_path) as data:
+        save = gvas.open_gvas(data)
+        if save is None:
+            return
+        old_steamid = old_steamid or core.find_steamid(data, core.folder_steamid_of(file_path))
+        if not old_steamid:
+            return
+        unsafe = save.unsafe_hits(core.find_steamid_offsets(data, old_steamid))
+    for hit in unsafe:
+        print(f"warning: {hit.encoding} occurrence at 0x{hit.offset:08x} is outside "
+              "any known string/int property", file=sys.stderr)
+
+
+def cmd_patch(args):
+    """Substitui o SteamID em um arquivo e renomeia a pasta"""
+    from .migrate import migrate_save
+    try:
+        new_steamid = core.read_config_steamid(args.config) if args.config else args.new
+        warn_unsafe_hits(args.file, args.old)
+        store = open_store(args)
+        result = migrate_save(args.file, new_steamid,
+                              old_steamid=args.old,
+                              rename=not args.no_rename,
+                              backup=args.bak or store is not None,
+                              in_place=not args.full_write,
+                              store=store,
+                              journal=not args.no_journal,
+                              verify=not args.no_verify)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"SteamID {result['old_steamid']} -> {result['new_steamid']}: "
+          f"{result['replacements']} occurrence(s)")
+    if result['backup']:
+        print(f"Backup: {result['backup']} ({result['backup_strategy']})")
+    if result['snapshot']:
+        print(f"Snapshot: {result['snapshot']}")
+    if result['journaled']:
+        print(f"Undo with: python -m sbeditor undo \"{result['file']}\"")
+    if result['folder_message']:
+        print(f"Folder: {result['folder_message']}")
+    return 0
+
+
+def cmd_restore(args):
+    """Restaura um arquivo a partir do backup .bak ou de um snapshot"""
+    from .backup_store import BackupStore
+    try:
+        store = open_store(args)
+        if store is not None or args.snapshot is not None:
+            store = store or BackupStore()
+            snapshot = store.restore(args.file, args.snapshot or None)
+            print(f"Restored {args.file} from snapshot {snapshot['id']}")
+            return 0
+        backup_path = core.restore_backup(args.file, args.backup)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"Restored {args.file} from {backup_path}")
+    return 0
+
+
+def cmd_undo(args):
+    """Desfaz (ou refaz) patches registrados no diário do save"""
+    from .journal import PatchJournal
+    journal = PatchJournal(args.file)
+    file_path = args.file
+    try:
+        for _ in range(args.steps):
+            if args.redo:
+                entry, file_path = journal.redo()
+                action = "Redone"
+            else:
+                entry, file_path = journal.undo()
+                action = "Undone"
+            print(f"{action}: {entry['old_steamid']} -> {entry['new_steamid']} "
+                  f"({len(entry['patches'])} offset(s))")
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if file_path != args.file:
+        print(f"Save is now at: {file_path}")
+    return 0
+
+
+def cmd_verify(args):
+    """Confere o save contra o último patch do diário (bytes novos, SteamID antigo, hash)"""
+    from . import verify
+    from .journal import PatchJournal
+    journal = PatchJournal(args.file)
+    if not journal.can_undo:
+        print(f"No journaled patch for {args.file}", file=sys.stderr)
+        return 1
+    entry = journal.entries[journal.position - 1]
+    try:
+        result = verify.verify_file(args.file, entry['patches'], entry['old_steamid'], entry['hash_after'])
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if not result['ok']:
+        print(f"{args.file}: FAILED: {verify.describe_failure(result)}")
+        return 1
+    print(f"{args.file}: OK ({len(entry['patches'])} offset(s) hold {entry['new_steamid']}, "
+          f"no {entry['old_steamid']} left, hash {result['hash'][:16]})")
+    return 0
+
+
+def cmd_diff(args):
+    """Mostra os trechos diferentes entre dois saves (por padrão, o save e seu .bak)"""
+    from . import diff
+    old_path = args.old or core.backup_path_for(args.file)
+    try:
+        result = diff.diff_files(old_path, args.file, block_size=args.block_size)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    ranges = [r for r in result['ranges'] if not (args.ignore_steamid and r['steamid'])]
+    for entry in ranges[:args.limit or None]:
+        print(diff.describe_range(entry))
+    if args.limit and len(ranges) > args.limit:
+        print(f"... {len(ranges) - args.limit} more range(s)")
+    print(f"{old_path} ({result['old_size']:,} bytes) -> {args.file} ({result['new_size']:,} bytes): "
+          f"{len(result['ranges'])} changed range(s), {result['equal_bytes']:,} bytes unchanged")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=1)
+    return 0
+
+
+def cmd_history(args):
+    """Lista os snapshots guardados de um save"""
+    from .backup_store import BackupStore
+    store = open_store(args) or BackupStore()
+    snapshots = store.list_snapshots(args.file)
+    if not snapshots:
+        print(f"No snapshots for {args.file}", file=sys.stderr)
+        return 1
+    for snapshot in snapshots:
+        created = datetime.fromtimestamp(snapshot['created']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"{snapshot['id']}  {created}  {snapshot['size']:>12,}  "
+              f"+{snapshot['stored_bytes']:,} stored  {snapshot['steamid']}  {snapshot['note']}")
+    stats = store.stats()
+    print(f"Store: {stats['objects']} chunk(s), {stats['stored_bytes']:,} bytes")
+    return 0
+
+
+def read_targets(args, save_root):
+    """Mapeamento pasta antiga -> novo SteamID a partir de --map ou --new (None se faltar)"""
+    from . import batch
+    if args.map:
+        return batch.read_steamid_map(args.map)
+    if args.new:
+        folders = core.find_steamid_folders(save_root)
+        if len(folders) > 1:
+            raise ValueError("more than one SteamID folder found, use --map")
+        return {os.path.basename(folder): args.new for folder in folders}
+    return None
+
+
+def cmd_batch(args):
+    """Migra todas as pastas de SteamID de uma árvore SaveGames"""
+    from . import batch
+    save_root = args.root or core.default_save_root()
+    try:
+        targets = read_targets(args, save_root)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if targets is None:
+        print("error: --new or --map is required", file=sys.stderr)
+        return 2
+
+    cache = open_cache(args)
+    store = open_store(args)
+    file_results, folder_results = batch.migrate_tree(save_root, targets,
+                                                      workers=args.workers,
+                                                      rename=not args.no_rename,
+                                                      backup=args.bak or store is not None,
+                                                      cache=cache,
+                                                      store=store,
+                                                      journal=not args.no_journal)
+    if cache is not None:
+        cache.save()
+    if not file_results:
+        print("No .sav files found", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for result in file_results:
+        if result['error']:
+            failed += 1
+            print(f"FAIL {result['file']}: {result['error']}")
+        elif result['replacements']:
+            print(f"OK   {result['file']}: {result['old_steamid']} -> "
+                  f"{result['new_steamid']} ({result['replacements']} occurrence(s))")
+        else:
+            print(f"SKIP {result['file']}: already {result['new_steamid']}")
+    for folder_result in folder_results:
+        print(f"Folder {folder_result['folder']}: {folder_result['message']}")
+
+    strategies = {}
+    for result in file_results:
+        if result.get('backup_strategy'):
+            strategies[result['backup_strategy']] = strategies.get(result['backup_strategy'], 0) + 1
+    if strategies:
+        print("Backups: " + ", ".join(f"{count} by {name}" for name, count in strategies.items()))
+    print(f"{len(file_results)} file(s), {failed} failed, "
+          f"{sum(r['renamed'] for r in folder_results)} folder(s) renamed")
+    return 1 if failed else 0
+
+
+def cmd_plan(args):
+    """Varre a árvore SaveGames e grava o plano de migração, sem alterar nenhum save"""
+    from . import plan
+    save_root = args.root or core.default_save_root()
+    try:
+        targets = read_targets(args, save_root)
+        if targets is None:
+            print("error: --new or --map is required", file=sys.stderr)
+            return 2
+        migration_plan = plan.make_plan(save_root, targets, rename=not args.no_rename,
+                                        workers=args.workers)
+        plan.save_plan(migration_plan, args.output)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    for folder_plan in migration_plan['folders']:
+        target = f" -> {folder_plan['new_steamid']}" if folder_plan['rename'] else ""
+        print(f"Folder {folder_plan['name']}{target}")
+        for entry in folder_plan['files']:
+            print(f"  {entry['name']:<28} {entry['old_steamid']} -> {entry['new_steamid']}: "
+                  f"{len(entry['patches'])} offset(s)")
+    summary = plan.plan_summary(migration_plan)
+    print(f"Plan written to {args.output}: {summary['files']} file(s), {summary['changed_files']} "
+          f"to patch, {summary['patches']} offset(s), {summary['renames']} folder rename(s)")
+    return 0 if summary['files'] else 1
+
+
+def cmd_apply(args):
+    """Aplica planos gravados por 'plan', conferindo o hash de cada save antes"""
+    from . import plan
+    try:
+        plans = [plan.load_plan(path) for path in args.plans]
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for folder_result in plan.apply_plans(plans, args.root, workers=args.workers):
+        for result in folder_result['files']:
+            if result['error']:
+                failed += 1
+                print(f"FAIL {result['file']}: {result['error']}")
+            elif result['skipped']:
+                print(f"SKIP {result['file']}: already applied")
+            elif result['replacements']:
+                print(f"OK   {result['file']}: {result['old_steamid']} -> "
+                      f"{folder_result['new_steamid']} ({result['replacements']} occurrence(s))")
+        print(f"Folder {folder_result['folder']}: {folder_result['message']}")
+    return 1 if failed else 0
+
+
+def cmd_archive_scan(args):
+    """Mostra o SteamID de cada .sav dentro de um zip/tar, sem extrair"""
+    from . import archive, locator
+    try:
+        results = archive.scan_archive(args.archive)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if not results:
+        print("No .sav files found in the archive", file=sys.stderr)
+        return 1
+    for result in results:
+        hits = result['hits']
+        steamid = locator.owner_steamid(hits, archive.member_folder_steamid(result['member']))
+        print(f"{args.archive}:{result['member']}: {steamid or 'not found'}")
+        if args.all:
+            for hit in hits:
+                print(f"  0x{hit.offset:08x} {hit.encoding:<10} {hit.steamid}")
+    return 0
+
+
+def cmd_archive_patch(args):
+    """Grava uma cópia do zip/tar com o SteamID trocado nos .sav"""
+    from . import archive
+    try:
+        new_steamid = core.read_config_steamid(args.config) if args.config else args.new
+        results = archive.patch_archive(args.archive, args.output, new_steamid,
+                                        old_steamid=args.old,
+                                        rename=not args.no_rename)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    for result in results:
+        target = f" -> {result['new_member']}" if result['new_member'] != result['member'] else ""
+        if result['old_steamid'] is None:
+            print(f"SKIP {result['member']}: no SteamID found")
+        else:
+            print(f"OK   {result['member']}{target}: {result['old_steamid']} "
+                  f"({result['replacements']} occurrence(s))")
+    print(f"Patched archive: {args.output}")
+    return 0
+
+
+def cmd_watch(args):
+    """Vigia a pasta SaveGames e corrige o SteamID dos saves gravados depois da migração"""
+    from . import batch, watch
+    try:
+        targets = batch.read_steamid_map(args.map) if args.map else None
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    def show(result):
+        stamp = datetime.now().strftime('%H:%M:%S')
+        if result['action'] == 'patched':
+            print(f"{stamp} PATCH {result['file']}: {result['old_steamid']} -> "
+                  f"{result['new_steamid']} ({result['replacements']} occurrence(s))", flush=True)
+        elif result['action'] == 'error':
+            print(f"{stamp} FAIL  {result['file']}: {result['message']}", flush=True)
+        elif args.verbose:
+            print(f"{stamp} OK    {result['file']}: {result['old_steamid'] or result['message']}", flush=True)
+
+    watcher = watch.SaveWatcher(args.root, targets, settle=args.settle, interval=args.interval,
+                                polling=args.polling, backup=args.bak, journal=not args.no_journal,
+                                on_result=show, cache=open_cache(args))
+    try:
+        print(f"Watching {watcher.save_root} (Ctrl+C to stop)", flush=True)
+        watcher.run(initial=not args.no_initial)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_clone(args):
+    """Copia um save modelo para várias pastas de SteamID, lendo a origem uma vez"""
+    from . import clone
+    try:
+        steamids = list(args.to or [])
+        if args.list:
+            steamids.extend(clone.read_steamid_list(args.list))
+        if not steamids:
+            print("error: --to or --list is required", file=sys.stderr)
+            return 2
+        results = clone.clone_save(args.file, steamids, save_root=args.root,
+                                   source_steamid=args.old,
+                                   overwrite=args.overwrite, workers=args.workers)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    failed = 0
+    for result in results:
+        if result['error']:
+            failed += 1
+            print(f"FAIL {result['steamid']}: {result['error']}")
+        else:
+            print(f"OK   {result['file']} ({result['replacements']} occurrence(s))")
+    print(f"{len(results)} copies, {failed} failed")
+    return 1 if failed else 0
+
+
+def cmd_serve(args):
+    """Atende scan/patch/clone/restore por HTTP/JSON na máquina local"""
+    from . import server
+    def ready(http_server):
+        host, port = http_server.server_address[:2]
+        print(f"Listening on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+
+    try:
+        server.serve(args.host, args.port, cache=open_cache(args), workers=args.workers,
+                     verbose=args.verbose, ready=ready)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_generate(args):
+    """Gera um save sintético para testes de desempenho"""
+    from . import synthetic
+    try:
+        size = synthetic.parse_size(args.size)
+        encodings = tuple(e.strip() for e in args.encodings.split(',') if e.strip())
+        planted = synthetic.generate_save(args.file, size,
+                                          steamid=core.parse_steamid(args.steamid),
+                                          density=args.density,
+                                          encodings=encodings,
+                                          seed=args.seed)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.file}: {os.path.getsize(args.file):,} bytes, "
+          + ", ".join(f"{count} {encoding}" for encoding, count in planted.items()))
+    return 0
+
+
+def format_measure(key, measure):
+    """Linha de resultado do benchmark"""
+    rss = f"{measure['peak_rss'] // (1024 * 1024):>6} MiB" if measure['peak_rss'] else "     n/a"
+    syscalls = measure['syscalls']
+    calls = f"{syscalls['read']:>7} r {syscalls['write']:>7} w" if syscalls else "  syscalls n/a"
+    strategy = f"  ({measure['strategy']})" if measure.get('strategy') else ""
+    return f"{key:<18} {measure['mb_s']:>9.1f} MB/s  {measure['seconds']:>8.3f} s  {rss}  {calls}{strategy}"
+
+
+def cmd_bench(args):
+    """Mede varredura, patch e backup sobre saves sintéticos e compara com a linha de base"""
+    from . import bench
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    print(f"{'size/stage':<18} {'throughput':>14}  {'time':>10}  {'peak RSS':>10}  syscalls")
+    try:
+        results = bench.run_benchmarks(sizes, stages, density=args.density, repeat=args.repeat,
+                                       work_dir=args.work_dir,
+                                       progress=lambda key, measure: print(format_measure(key, measure)))
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if args.save_baseline:
+        path = bench.save_baseline(results, args.baseline, args.density)
+        print(f"Baseline saved: {path}")
+        return 0
+
+    baseline = bench.load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline to compare with (use --save-baseline)")
+        return 0
+    regressions = bench.compare_results(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regression(s) against baseline from "
+          f"{datetime.fromtimestamp(baseline['created']).strftime('%Y-%m-%d %H:%M')}")
+    return 1 if regressions else 0
+
+
+def report_recovery(results):
+    """Mostra o que foi feito com as migrações interrompidas"""
+    for result in results:
+        target = result['folder'] or ', '.join(result['files'])
+        print(f"recovered {result['id']} ({target}): {result['action']}: {result['message']}",
+              file=sys.stderr)
+    return 1 if any(r['action'] == 'failed' for r in results) else 0
+
+
+def write_profile(path):
+    """Exporta os spans (--profile) e mostra os totais por etapa"""
+    spans = trace.get_tracer().snapshot()
+    trace.export(path, spans)
+    print(f"\nProfile: {len(spans)} span(s) written to {path}", file=sys.stderr)
+    print(f"{'stage':<22} {'count':>6} {'wall ms':>10} {'cpu ms':>10} {'MB/s':>9}", file=sys.stderr)
+    for total in trace.summarize(spans):
+        mb_s = (f"{total['bytes'] / (1024 * 1024) / total['wall']:>9.1f}"
+                if total['bytes'] and total['wall'] else f"{'':>9}")
+        print(f"{total['name']:<22} {total['count']:>6} {total['wall'] * 1000:>10.1f} "
+              f"{total['cpu'] * 1000:>10.1f} {mb_s}", file=sys.stderr)
+
+
+def cmd_recover(args):
+    """Completa ou desfaz migrações interrompidas"""
+    from . import transaction
+    results = transaction.recover()
+    if not results:
+        print("No interrupted migrations")
+    return report_recovery(results)
+
+
+def cmd_inspect(args):
+    """Mostra o cabeçalho GVAS e o índice de propriedades"""
+    from . import gvas
+    try:
+        with core.map_save(args.file) as data:
+            save = gvas.GvasFile(data)
+            header = save.header
+            print(f"SaveGame class: {header.save_game_class}")
+            print(f"Engine: {'.'.join(map(str, header.engine_version[:3]))} "
+                  f"(CL {header.engine_version[3]}, {header.engine_branch})")
+            print(f"Save version {header.save_game_version}, package version "
+                  f"{header.package_version}, {len(header.custom_versions)} custom version(s)")
+            properties = save.steamid_properties() if args.steamid else save.iter_properties()
+            for prop in properties:
+                print(f"  0x{prop.value_start:08x}-0x{prop.value_end:08x} "
+                      f"{prop.type:<16} {prop.path}")
+    except (OSError, gvas.GvasError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def add_cache_arguments(parser):
+    """Opções do cache de varredura"""
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always rescan files, ignoring the scan cache")
+    parser.add_argument('--cache', help="scan cache file (default: per-user cache folder)")
+
+
+def cmd_list(args):
+    """Lista as pastas de SteamID e os saves de cada uma"""
+    from .inventory import Inventory
+    cache = open_cache(args)
+    rows = Inventory(args.root, cache, workers=args.workers).refresh()
+    if not rows:
+        print("No .sav files found", file=sys.stderr)
+        return 1
+
+    for row in rows:
+        if row['error']:
+            found = f"error: {row['error']}"
+        elif row['steamid'] is None:
+            found = "not found"
+        else:
+            found = str(row['steamid'])
+            if found != row['folder_steamid']:
+                found += " (folder mismatch)"
+        modified = datetime.fromtimestamp(row['mtime']).strftime('%Y-%m-%d %H:%M')
+        print(f"{row['folder_steamid']}  {row['name']:<28} {row['size']:>12,}  {modified}  {found}")
+    return 0
+
+
+def cmd_discover(args):
+    """Lista as pastas SaveGames e os configs.user.ini encontrados (Windows, Proton, Wine)"""
+    from . import discovery
+    cache = None if args.no_cache else discovery.DiscoveryCache()
+    try:
+        entries = discovery.discover(args.steam_root or None, cache=cache, workers=args.workers)
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=1)
+    if not entries:
+        print("No SaveGames folder or configs.user.ini found", file=sys.stderr)
+        return 1
+    for entry in entries:
+        source = entry['source'] + (f" {entry['prefix']}" if entry['prefix'] else '')
+        steamids = ', '.join(entry['steamids']) or '-'
+        print(f"{entry['kind']:<6} {source:<14} {entry['path']}  [{steamids}]")
+    return 0
+
+
+def add_backup_arguments(parser):
+    """Opções de backup: diário de patches (padrão) e cópia completa .bak"""
+    parser.add_argument('--bak', action='store_true',
+                        help="also keep a full .bak copy (the patch journal is always written)")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="do not record the patch in the undo journal")
+
+
+def build_parser():
+    """Monta o parser de argumentos"""
+    parser = argparse.ArgumentParser(
+        prog='sbeditor',
+        description="Stellar Blade SteamID Editor (command line)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="write per-stage timings to FILE (.jsonl: JSON lines, "
+                             "otherwise a Chrome trace) and print a summary")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scan = sub.add_parser('scan', help="show the SteamID stored in save files")
+    scan.add_argument('paths', nargs='*',
+                      help=".sav files or folders (default: SaveGames folder)")
+    scan.add_argument('--all', action='store_true',
+                      help="list every occurrence with its offset and encoding")
+    scan.add_argument('--workers', type=int, default=4, help="number of files scanned at once")
+    add_cache_arguments(scan)
+    scan.set_defaults(func=cmd_scan)
+
+    patch = sub.add_parser('patch', help="replace the SteamID in a save file")
+    patch.add_argument('file', help=".sav file to patch")
+    new_source = patch.add_mutually_exclusive_group(required=True)
+    new_source.add_argument('--new', type=steamid_arg, help="new 17-digit SteamID")
+    new_source.add_argument('--config', help="read the new SteamID from configs.user.ini")
+    patch.add_argument('--old', type=steamid_arg, help="SteamID to replace (default: detected from file)")
+    patch.add_argument('--no-rename', action='store_true',
+                       help="do not rename the SteamID folder")
+    add_backup_arguments(patch)
+    patch.add_argument('--full-write', action='store_true',
+                       help="rewrite the whole file atomically instead of patching bytes in place")
+    patch.add_argument('--no-verify', action='store_true',
+                       help="skip re-reading the patched file to check the written bytes and hash")
+    add_store_arguments(patch)
+    patch.set_defaults(func=cmd_patch)
+
+    restore = sub.add_parser('restore', help="restore a save file from its backup")
+    restore.add_argument('file', help=".sav file to restore")
+    restore.add_argument('--backup', help="backup file (default: <file>.bak)")
+    restore.add_argument('--snapshot', nargs='?', const='',
+                         help="restore a snapshot from the backup store (default: latest)")
+    add_store_arguments(restore)
+    restore.set_defaults(func=cmd_restore)
+
+    for name, redo in (('undo', False), ('redo', True)):
+        undo = sub.add_parser(name, help=f"{name} the last journaled SteamID patch of a save")
+        undo.add_argument('file', help=".sav file")
+        undo.add_argument('-n', '--steps', type=int, default=1, help="number of patches")
+        undo.set_defaults(func=cmd_undo, redo=redo)
+
+    verify_cmd = sub.add_parser('verify', help="check a save against its last journaled patch")
+    verify_cmd.add_argument('file', help=".sav file")
+    verify_cmd.set_defaults(func=cmd_verify)
+
+    diff_cmd = sub.add_parser('diff', help="show the byte ranges that differ between two saves")
+    diff_cmd.add_argument('file', help=".sav file (the new side)")
+    diff_cmd.add_argument('old', nargs='?', help="save to compare against (default: FILE.bak)")
+    diff_cmd.add_argument('--block-size', type=int, default=LazyDefault('diff', 'DEFAULT_BLOCK_SIZE'),
+                          help="anchor block size in bytes (default: %(default)s)")
+    diff_cmd.add_argument('--ignore-steamid', action='store_true',
+                          help="hide ranges that are only a SteamID change")
+    diff_cmd.add_argument('--limit', type=int, default=200,
+                          help="print at most N ranges (0: all; default: 200)")
+    diff_cmd.add_argument('--json', help="also write the full result to this JSON file")
+    diff_cmd.set_defaults(func=cmd_diff)
+
+    history = sub.add_parser('history', help="list the snapshots kept for a save file")
+    history.add_argument('file', help=".sav file")
+    add_store_arguments(history)
+    history.set_defaults(func=cmd_history)
+
+    list_cmd = sub.add_parser('list', help="list SteamID folders and their save files")
+    list_cmd.add_argument('root', nargs='?', help="SaveGames folder (default: game folder)")
+    list_cmd.add_argument('--workers', type=int, default=8, help="number of scanning threads")
+    add_cache_arguments(list_cmd)
+    list_cmd.set_defaults(func=cmd_list)
+
+    discover_cmd = sub.add_parser('discover', help="find SaveGames folders and configs.user.ini files "
+                                                   "(Steam libraries, Proton and Wine prefixes)")
+    discover_cmd.add_argument('--steam-root', action='append',
+                              help="Steam installation to search (repeatable; default: the usual places)")
+    discover_cmd.add_argument('--workers', type=int, default=LazyDefault('discovery', 'DEFAULT_WORKERS'),
+                              help="number of prefixes searched at once")
+    discover_cmd.add_argument('--no-cache', action='store_true',
+                              help="search every folder again instead of reusing unchanged results")
+    discover_cmd.add_argument('--json', help="also write the list to this JSON file")
+    discover_cmd.set_defaults(func=cmd_discover)
+
+    inspect = sub.add_parser('inspect', help="show the GVAS header and property index")
+    inspect.add_argument('file', help=".sav file to inspect")
+    inspect.add_argument('--steamid', action='store_true',
+                         help="only list properties whose name suggests a SteamID")
+    inspect.set_defaults(func=cmd_inspect)
+
+    batch_cmd = sub.add_parser('batch', help="migrate every SteamID folder of a SaveGames tree")
+    batch_cmd.add_argument('root', nargs='?', help="SaveGames folder (default: game folder)")
+    batch_cmd.add_argument('--new', type=steamid_arg,
+                           help="new SteamID (only when there is a single folder)")
+    batch_cmd.add_argument('--map', help="file with 'OLD NEW' SteamID pairs, one per line")
+    batch_cmd.add_argument('--workers', type=int, help="number of worker processes")
+    batch_cmd.add_argument('--no-rename', action='store_true',
+                           help="do not rename the SteamID folders")
+    add_backup_arguments(batch_cmd)
+    add_cache_arguments(batch_cmd)
+    add_store_arguments(batch_cmd)
+    batch_cmd.set_defaults(func=cmd_batch)
+
+    plan_cmd = sub.add_parser('plan', help="scan a SaveGames tree and write a migration plan "
+                                            "without changing anything")
+    plan_cmd.add_argument('root', nargs='?', help="SaveGames folder (default: game folder)")
+    plan_cmd.add_argument('-o', '--output', required=True,
+                          help="plan file to write (.json, or .json.gz to compress it)")
+    plan_cmd.add_argument('--new', type=steamid_arg,
+                          help="new SteamID (only when there is a single folder)")
+    plan_cmd.add_argument('--map', help="file with 'OLD NEW' SteamID pairs, one per line")
+    plan_cmd.add_argument('--no-rename', action='store_true', help="do not rename the SteamID folders")
+    plan_cmd.add_argument('--workers', type=int, default=LazyDefault('plan', 'DEFAULT_WORKERS'),
+                          help="number of saves scanned at once")
+    plan_cmd.set_defaults(func=cmd_plan)
+
+    apply_cmd = sub.add_parser('apply', help="apply migration plans written by 'plan'")
+    apply_cmd.add_argument('plans', nargs='+', help="plan files")
+    apply_cmd.add_argument('--root', help="SaveGames folder (default: the one recorded in the plan)")
+    apply_cmd.add_argument('--workers', type=int, default=LazyDefault('plan', 'DEFAULT_WORKERS'),
+                           help="number of folders applied at once")
+    apply_cmd.set_defaults(func=cmd_apply)
+
+    archive_scan = sub.add_parser('archive-scan', help="show the SteamID of each save inside a zip/tar "
+                                                        "archive without extracting it")
+    archive_scan.add_argument('archive', help="zip or tar archive (.tar.gz/.tar.bz2/.tar.xz too)")
+    archive_scan.add_argument('--all', action='store_true',
+                              help="list every occurrence with its offset and encoding")
+    archive_scan.set_defaults(func=cmd_archive_scan)
+
+    archive_patch = sub.add_parser('archive-patch', help="write a copy of a zip/tar archive with the "
+                                                          "SteamID replaced in its saves")
+    archive_patch.add_argument('archive', help="zip or tar archive")
+    archive_patch.add_argument('-o', '--output', required=True, help="patched archive to write")
+    new_source = archive_patch.add_mutually_exclusive_group(required=True)
+    new_source.add_argument('--new', type=steamid_arg, help="new 17-digit SteamID")
+    new_source.add_argument('--config', help="read the new SteamID from configs.user.ini")
+    archive_patch.add_argument('--old', type=steamid_arg, help="SteamID to replace (default: detected per save)")
+    archive_patch.add_argument('--no-rename', action='store_true',
+                               help="keep the SteamID folder names inside the archive")
+    archive_patch.set_defaults(func=cmd_archive_patch)
+
+    clone_cmd = sub.add_parser('clone', help="copy one save to several SteamID folders")
+    clone_cmd.add_argument('file', help="source .sav file")
+    clone_cmd.add_argument('--to', nargs='+', type=steamid_arg, metavar='STEAMID', help="target SteamIDs")
+    clone_cmd.add_argument('--list', help="file with target SteamIDs, one per line")
+    clone_cmd.add_argument('--old', type=steamid_arg, help="SteamID to replace (default: detected from file)")
+    clone_cmd.add_argument('--root', help="SaveGames folder for the copies "
+                                          "(default: the one holding the source)")
+    clone_cmd.add_argument('--overwrite', action='store_true', help="replace saves that already exist")
+    clone_cmd.add_argument('--workers', type=int, default=LazyDefault('clone', 'DEFAULT_WORKERS'),
+                           help="number of copies written at once")
+    clone_cmd.set_defaults(func=cmd_clone)
+
+    watch_cmd = sub.add_parser('watch', help="keep fixing the SteamID of saves written after a migration")
+    watch_cmd.add_argument('root', nargs='?', help="SaveGames folder (default: game folder)")
+    watch_cmd.add_argument('--map', help="file with 'OLD NEW' SteamID pairs "
+                                         "(default: each save must match its folder name)")
+    watch_cmd.add_argument('--settle', type=float, default=LazyDefault('watch', 'DEFAULT_SETTLE'),
+                           help="seconds a save must stay unchanged before it is checked "
+                                "(default: %(default)s)")
+    watch_cmd.add_argument('--polling', action='store_true',
+                           help="poll file metadata instead of using inotify")
+    watch_cmd.add_argument('--interval', type=float, default=LazyDefault('watch', 'DEFAULT_POLL_INTERVAL'),
+                           help="polling interval in seconds (default: %(default)s)")
+    watch_cmd.add_argument('--no-initial', action='store_true',
+                           help="do not check the existing saves when starting")
+    watch_cmd.add_argument('-v', '--verbose', action='store_true', help="also report saves that were fine")
+    add_cache_arguments(watch_cmd)
+    add_backup_arguments(watch_cmd)
+    watch_cmd.set_defaults(func=cmd_watch)
+
+    serve_cmd = sub.add_parser('serve', help="answer scan/patch/clone/restore requests over local HTTP/JSON")
+    serve_cmd.add_argument('--host', default=LazyDefault('server', 'DEFAULT_HOST'), help="address to listen on (default: %(default)s)")
+    serve_cmd.add_argument('--port', type=int, default=LazyDefault('server', 'DEFAULT_PORT'),
+                           help="port to listen on, 0 for any free port (default: %(default)s)")
+    serve_cmd.add_argument('--workers', type=int, default=LazyDefault('server', 'DEFAULT_WORKERS'),
+                           help="threads kept for scanning and cloning (default: %(default)s)")
+    serve_cmd.add_argument('-v', '--verbose', action='store_true', help="log every request")
+    add_cache_arguments(serve_cmd)
+    serve_cmd.set_defaults(func=cmd_serve)
+
+    generate = sub.add_parser('generate', help="write a synthetic GVAS save for benchmarking")
+    generate.add_argument('file', help="output .sav file")
+    generate.add_argument('--size', default='64M', help="file size, e.g. 1M, 512M, 4G (default: 64M)")
+    generate.add_argument('--steamid', default=LazyDefault('synthetic', 'DEFAULT_STEAMID', str),
+                          help="SteamID to plant")
+    generate.add_argument('--density', type=float, default=LazyDefault('synthetic', 'DEFAULT_DENSITY'),
+                          help="planted SteamIDs per MiB (default: %(default)s)")
+    generate.add_argument('--encodings', default=LazyDefault('synthetic', 'PLANT_ENCODINGS', ','.join),
+                          help="comma-separated encodings to plant (default: %(default)s)")
+    generate.add_argument('--seed', type=int, default=0, help="seed for the filler bytes")
+    generate.set_defaults(func=cmd_generate)
+
+    bench_cmd = sub.add_parser('bench', help="benchmark scan/patch/backup on synthetic saves")
+    bench_cmd.add_argument('--sizes', default=LazyDefault('bench', 'DEFAULT_SIZES', ','.join),
+                           help="comma-separated file sizes (default: %(default)s)")
+    bench_cmd.add_argument('--stages', default=LazyDefault('bench', 'STAGES', ','.join),
+                           help="comma-separated stages (default: %(default)s)")
+    bench_cmd.add_argument('--density', type=float, default=LazyDefault('synthetic', 'DEFAULT_DENSITY'),
+                           help="planted SteamIDs per MiB (default: %(default)s)")
+    bench_cmd.add_argument('--repeat', type=int, default=LazyDefault('bench', 'DEFAULT_REPEAT'),
+                           help="runs per stage, best one counts (default: %(default)s)")
+    bench_cmd.add_argument('--work-dir', help="folder for the generated saves (default: temporary)")
+    bench_cmd.add_argument('--baseline', help="baseline file (default: in the cache folder)")
+    bench_cmd.add_argument('--save-baseline', action='store_true',
+                           help="store these results as the new baseline")
+    bench_cmd.add_argument('--tolerance', type=float, default=LazyDefault('bench', 'DEFAULT_TOLERANCE'),
+                           help="allowed slowdown/RSS growth before reporting a regression "
+                                "(default: %(default)s)")
+    bench_cmd.add_argument('--json', help="also write the results to this JSON file")
+    bench_cmd.set_defaults(func=cmd_bench)
+
+    recover_cmd = sub.add_parser('recover', help="finish or undo interrupted migrations "
+                                                  "(also done before every command that writes saves)")
+    recover_cmd.set_defaults(func=cmd_recover)
+
+    return parser
+
+
+def main(argv=None):
+    args = resolve_defaults(build_parser().parse_args(argv))
+    if args.command in MUTATING_COMMANDS:
+        from . import transaction
+        report_recovery(transaction.recover())
+    if not args.profile:
+        return args.func(args)
+    try:
+        with trace.span(f"sbeditor {args.command}"):
+            return args.func(args)
+    finally:
+        write_profile(args.profile)
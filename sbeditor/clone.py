@@ -0,0 +1,110 @@
+"""Clonagem de um save modelo para várias contas (um SteamID novo por pasta)
+
+O save de origem é mapeado e varrido uma única vez; cada cópia é gravada
+direto do mapeamento, trocando só os trechos das ocorrências já
+localizadas, sem copiar o arquivo na memória. As cópias são gravadas em
+paralelo (threads: o tempo é quase todo de E/S), cada uma num temporário
+com fsync e rename atômico para <SaveGames>/<SteamID>/<nome do save>.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import core, locator, trace
+
+DEFAULT_WORKERS = 4
+
+
+def read_steamid_list(list_path):
+    """Lê um arquivo com um SteamID por linha (ou separados por vírgula/espaço)"""
+    steamids = []
+    with open(list_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            for value in line.split('#', 1)[0].replace(',', ' ').split():
+                try:
+                    steamids.append(core.parse_steamid(value))
+                except ValueError as e:
+                    raise ValueError(f"{list_path}:{line_number}: {e}")
+    return steamids
+
+
+def clone_target_path(source_path, steamid, save_root=None):
+    """Caminho da cópia: pasta do SteamID ao lado da pasta de origem (ou em save_root)"""
+    if save_root is None:
+        folder = core.steamid_folder_of(source_path)
+        save_root = os.path.dirname(folder) if folder else os.path.dirname(os.path.abspath(source_path))
+    return os.path.join(save_root, str(steamid), os.path.basename(source_path))
+
+
+def write_patched_copy(data, hits, new_steamid, target_path):
+    """Grava data com as ocorrências trocadas por new_steamid (temporário, fsync e rename)"""
+    tmp_path = core.temp_path_for(target_path)
+    view = memoryview(data)
+    with trace.span('write', file=target_path, bytes=len(data), atomic=True):
+        try:
+            with open(tmp_path, 'wb') as f:
+                position = 0
+                for hit in hits:
+                    new_bytes = locator.encode_steamid(new_steamid, hit.encoding)
+                    f.write(view[position:hit.offset])
+                    f.write(new_bytes)
+                    position = hit.offset + len(new_bytes)
+                f.write(view[position:])
+                f.flush()
+                with trace.span('fsync', file=target_path):
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, target_path)
+        finally:
+            view.release()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        core.fsync_dir(os.path.dirname(os.path.abspath(target_path)))
+
+
+def clone_save(source_path, steamids, save_root=None, source_steamid=None, overwrite=False,
+               workers=DEFAULT_WORKERS, progress=None, executor=None):
+    """Grava uma cópia do save para cada SteamID, numa pasta com o nome do SteamID
+
+    A origem é lida e varrida uma vez; o SteamID de origem é detectado se
+    não for informado. Uma cópia que já existe é recusada, salvo com
+    overwrite. progress(resultado) é chamado a cada cópia concluída.
+    executor permite reaproveitar um pool de threads já criado.
+    Retorna [{'steamid', 'file', 'replacements', 'error'}] na ordem de steamids.
+    """
+    steamids = list(dict.fromkeys(core.parse_steamid(s) for s in steamids))
+    with trace.span('clone', file=source_path, copies=len(steamids)) as info, \
+            core.map_save(source_path) as data:
+        source_steamid = source_steamid or core.find_steamid(data, core.folder_steamid_of(source_path))
+        if not source_steamid:
+            raise Exception("Current SteamID not found in file!")
+        hits = core.find_steamid_offsets(data, source_steamid)
+        info['bytes'] = len(data) * (len(steamids) + 1)
+
+        def clone_one(steamid):
+            result = {'steamid': steamid, 'file': clone_target_path(source_path, steamid, save_root),
+                      'replacements': 0, 'error': None}
+            try:
+                if steamid == int(source_steamid):
+                    raise Exception("Target SteamID is the source SteamID")
+                if os.path.exists(result['file']) and not overwrite:
+                    raise Exception("Save already exists (use overwrite to replace it)")
+                os.makedirs(os.path.dirname(result['file']), exist_ok=True)
+                write_patched_copy(data, hits, steamid, result['file'])
+                result['replacements'] = len(hits)
+            except Exception as e:
+                result['error'] = str(e)
+            return result
+
+        results = {}
+        own_executor = executor is None
+        executor = executor or ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = [executor.submit(clone_one, steamid) for steamid in steamids]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['steamid']] = result
+                if progress:
+                    progress(result)
+        finally:
+            if own_executor:
+                executor.shutdown()
+    return [results[steamid] for steamid in steamids]
@@ -0,0 +1,518 @@
+"""Motor de análise e edição de saves do Stellar Blade (sem tkinter)"""
+import errno
+import mmap
+import os
+import re
+import shutil
+import sys
+from contextlib import contextmanager
+
+from . import locator, trace
+from .gvas import open_gvas
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Padrão para SteamID (17 dígitos começando com 7656)
+STEAMID_LENGTH = 17
+STEAMID_PREFIX = '7656'
+STEAMID_PATTERN = rb'7656\d{13}'
+
+CONFIG_STEAMID_PATTERN = r'account_steamid\s*=\s*(\d+)'
+BACKUP_SUFFIX = '.bak'
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Formas de cópia, da mais barata para a mais cara (SBEDITOR_COPY restringe a lista)
+COPY_STRATEGIES = ('reflink', 'copy_file_range', 'sendfile', 'buffered')
+# Bytes por chamada de copy_file_range/sendfile (entre elas: progresso e cancelamento)
+KERNEL_COPY_CHUNK = 16 * 1024 * 1024
+# ioctl FICLONE do Linux: _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+# Erros que só dizem que a forma de cópia não serve aqui (sistema de arquivos, kernel);
+# qualquer outro (EPERM, EBADF, EIO...) é falha de verdade e sobe para quem chamou
+_COPY_UNSUPPORTED = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY}
+
+
+class OperationCancelled(Exception):
+    """Operação cancelada pelo usuário antes de gravar qualquer byte"""
+
+
+def make_cancel_check(cancel):
+    """Transforma um threading.Event (ou None) numa função que lança OperationCancelled"""
+    if cancel is None:
+        return None
+
+    def check_cancel():
+        if cancel.is_set():
+            raise OperationCancelled("Operation cancelled")
+    return check_cancel
+
+
+def default_save_root():
+    """Retorna a pasta SaveGames padrão do jogo
+
+    Sem LOCALAPPDATA (Linux, Steam Deck) procura nos prefixos do Proton e do Wine.
+    """
+    native = os.path.join(os.getenv('LOCALAPPDATA', ''), 'SB', 'Saved', 'SaveGames')
+    if os.getenv('LOCALAPPDATA') or os.path.isdir(native):
+        return native
+    from . import discovery
+    return discovery.find_save_root() or native
+
+
+def is_steamid_folder_name(name):
+    """Verifica se o nome da pasta é um SteamID (17 dígitos)"""
+    return name.isdigit() and len(name) == STEAMID_LENGTH
+
+
+def parse_steamid(value):
+    """Converte texto em SteamID, aceitando apenas 17 dígitos"""
+    digits = ''.join(filter(str.isdigit, str(value).strip()))
+    if len(digits) != STEAMID_LENGTH:
+        raise ValueError(f"SteamID must be exactly 17 digits (got {len(digits)})")
+    return int(digits)
+
+
+def read_config_steamid(config_path):
+    """Lê o account_steamid de um configs.user.ini"""
+    with open(config_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+
+    steamid_match = re.search(CONFIG_STEAMID_PATTERN, content)
+    if not steamid_match:
+        raise ValueError("account_steamid not found in config file!")
+
+    steamid_str = steamid_match.group(1)
+    if len(steamid_str) != STEAMID_LENGTH or not steamid_str.startswith(STEAMID_PREFIX):
+        raise ValueError(f"Invalid SteamID in config:\n"
+                         f"Must be 17 digits starting with 7656\n"
+                         f"Found: {steamid_str}")
+    return steamid_str
+
+
+def find_sav_files(folder_path):
+    """Lista todos os arquivos .sav de uma pasta, em ordem"""
+    if not os.path.isdir(folder_path):
+        return []
+    return [os.path.join(folder_path, name)
+            for name in sorted(os.listdir(folder_path))
+            if name.lower().endswith('.sav')]
+
+
+def find_sav_file_in_folder(folder_path):
+    """Encontra o primeiro arquivo .sav em uma pasta"""
+    sav_files = find_sav_files(folder_path)
+    return sav_files[0] if sav_files else None
+
+
+def find_steamid_folders(save_root=None):
+    """Lista as pastas de SteamID dentro de SaveGames"""
+    save_root = save_root or default_save_root()
+    if not os.path.isdir(save_root):
+        return []
+    return [os.path.join(save_root, name)
+            for name in sorted(os.listdir(save_root))
+            if is_steamid_folder_name(name)
+            and os.path.isdir(os.path.join(save_root, name))]
+
+
+def steamid_folder_of(file_path):
+    """Retorna a pasta de SteamID que contém o arquivo, se houver"""
+    parent_dir = os.path.dirname(os.path.abspath(file_path))
+    if is_steamid_folder_name(os.path.basename(parent_dir)):
+        return parent_dir
+    return None
+
+
+def folder_steamid_of(file_path):
+    """SteamID do nome da pasta que contém o arquivo (ou None)"""
+    folder = steamid_folder_of(file_path)
+    return int(os.path.basename(folder)) if folder else None
+
+
+def find_steamid(data, folder_steamid=None):
+    """SteamID dono do save nos dados (bytes, bytearray ou mmap); ver locator.owner_steamid
+
+    O SteamID da pasta é procurado primeiro; a varredura genérica para no
+    primeiro SteamID em texto e só vai até o fim se houver apenas binários.
+    """
+    if not data:
+        return None
+    if folder_steamid is not None:
+        for _ in locator.iter_steamids(data, [folder_steamid], locator.OWNER_ENCODINGS):
+            return int(folder_steamid)
+
+    # Busca de bytes direto no buffer: sem cópia decodificada e com offsets reais
+    binary = None
+    for hit in locator.iter_steamids(data):
+        if hit.encoding in locator.TEXT_ENCODINGS:
+            return hit.steamid
+        binary = binary or hit.steamid
+    return binary
+
+
+def find_steamid_offsets(data, steamid=None, encodings=locator.ALL_ENCODINGS,
+                         progress=None, cancel=None):
+    """Lista as ocorrências (SteamIDHit) de um SteamID, ou de qualquer um, no buffer
+
+    Com progress(feito, total) ou cancel (threading.Event), varre em blocos.
+    Ocorrências de ID de conta passam por patchable_hits.
+    """
+    steamids = [steamid] if steamid else None
+    with trace.span('locate', bytes=len(data), steamid=steamid) as info:
+        if progress is None and cancel is None:
+            hits = locator.locate_steamids(data, steamids, encodings)
+        else:
+            hits = locator.locate_steamids_chunked(data, steamids, encodings, progress=progress,
+                                                   check_cancel=make_cancel_check(cancel))
+        hits = patchable_hits(data, hits)
+        info['hits'] = len(hits)
+    return hits
+
+
+def patchable_hits(data, hits):
+    """Descarta as ocorrências de ID de conta fora de uma propriedade int do GVAS
+
+    O ID de conta tem só 4 bytes e aparece por acaso em dados binários; ele
+    só conta (e só é trocado) quando o GVAS o coloca dentro de uma
+    propriedade int. Num arquivo que não é GVAS legível, nenhum conta.
+    """
+    if not any(hit.encoding == locator.ENCODING_ACCOUNT_ID for hit in hits):
+        return hits
+    save = open_gvas(data)
+
+    def inside_int(hit):
+        prop = save.leaf_at(hit.offset, 4) if save is not None else None
+        return prop is not None and prop.kind == 'int'
+
+    return [hit for hit in hits if hit.encoding != locator.ENCODING_ACCOUNT_ID or inside_int(hit)]
+
+
+@contextmanager
+def map_save(file_path):
+    """Mapeia o arquivo em memória somente leitura (arquivo vazio vira b'')"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def read_save(file_path):
+    """Lê o conteúdo completo de um arquivo .sav"""
+    with trace.span('read', file=file_path) as info, open(file_path, 'rb') as f:
+        data = bytearray(f.read())
+        info['bytes'] = len(data)
+        return data
+
+
+def scan_file(file_path):
+    """Procura o SteamID dono de um arquivo .sav via mmap, sem carregá-lo inteiro"""
+    with trace.span('scan', file=file_path) as info, map_save(file_path) as data:
+        info['bytes'] = len(data)
+        return find_steamid(data, folder_steamid_of(file_path))
+
+
+def backup_path_for(file_path):
+    """Caminho do backup .bak de um arquivo"""
+    return f"{file_path}{BACKUP_SUFFIX}"
+
+
+def copy_strategies():
+    """Formas de cópia a tentar, em ordem (SBEDITOR_COPY=sendfile,buffered restringe)"""
+    wanted = os.getenv('SBEDITOR_COPY', '').lower().replace(' ', '').split(',')
+    strategies = tuple(s for s in COPY_STRATEGIES if s in wanted)
+    return strategies or COPY_STRATEGIES
+
+
+def _copy_reflink(fsrc, fdst):
+    """Clona os blocos de fsrc em fdst (btrfs, XFS...); False se não houver suporte"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno in _COPY_UNSUPPORTED:
+            return False
+        raise
+    return True
+
+
+def _copy_in_kernel(copy_range, fsrc, fdst, total, progress, check_cancel):
+    """Copia com copy_range(src, dst, offset, count) em blocos; False se recusada de início"""
+    done = 0
+    while done < total:
+        if check_cancel:
+            check_cancel()
+        try:
+            count = copy_range(fsrc.fileno(), fdst.fileno(), done, min(KERNEL_COPY_CHUNK, total - done))
+        except OSError as e:
+            if done == 0 and e.errno in _COPY_UNSUPPORTED:
+                return False
+            raise
+        if count == 0:
+            # O arquivo encolheu durante a cópia
+            break
+        done += count
+        if progress:
+            progress(done, total)
+    return True
+
+
+def _copy_buffered(fsrc, fdst, total, progress, check_cancel):
+    done = 0
+    while True:
+        if check_cancel:
+            check_cancel()
+        chunk = fsrc.read(COPY_BUFFER_SIZE)
+        if not chunk:
+            break
+        fdst.write(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return True
+
+
+def copy_file(src, dst, progress=None, cancel=None, strategies=None):
+    """Copia src para dst pelo caminho mais barato disponível; retorna a forma usada
+
+    Tenta, em ordem: reflink (ioctl FICLONE: instantâneo, os dois arquivos
+    dividem os blocos até um deles mudar), os.copy_file_range e
+    os.sendfile (os bytes não passam pelo processo) e, por fim, leitura e
+    escrita em blocos. Grava num temporário e só substitui dst no final,
+    então cancelar não apaga um backup anterior.
+    """
+    check_cancel = make_cancel_check(cancel)
+    strategies = strategies or copy_strategies()
+    total = os.path.getsize(src)
+    tmp_path = temp_path_for(dst)
+    try:
+        with open(src, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+            for strategy in strategies:
+                if strategy == 'reflink':
+                    done = _copy_reflink(fsrc, fdst)
+                    if done and progress:
+                        progress(total, total)
+                elif strategy == 'copy_file_range' and hasattr(os, 'copy_file_range'):
+                    done = _copy_in_kernel(lambda src_fd, dst_fd, offset, count:
+                                           os.copy_file_range(src_fd, dst_fd, count, offset, offset),
+                                           fsrc, fdst, total, progress, check_cancel)
+                elif strategy == 'sendfile' and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+                    done = _copy_in_kernel(lambda src_fd, dst_fd, offset, count:
+                                           os.sendfile(dst_fd, src_fd, offset, count),
+                                           fsrc, fdst, total, progress, check_cancel)
+                elif strategy == 'buffered':
+                    done = _copy_buffered(fsrc, fdst, total, progress, check_cancel)
+                else:
+                    done = False
+                if done:
+                    break
+            else:
+                raise ValueError(f"No usable copy strategy among: {', '.join(strategies)}")
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return strategy
+
+
+def copy_with_progress(src, dst, progress=None, cancel=None):
+    """Copia um arquivo informando progresso e permitindo cancelar (ver copy_file)"""
+    return copy_file(src, dst, progress, cancel)
+
+
+def backup_file(file_path, progress=None, cancel=None):
+    """Cria o backup .bak do arquivo; retorna (caminho do backup, forma de cópia usada)"""
+    backup_path = backup_path_for(file_path)
+    try:
+        with trace.span('backup', file=file_path, bytes=os.path.getsize(file_path)) as info:
+            info['strategy'] = copy_file(file_path, backup_path, progress, cancel)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to create backup: {str(e)}")
+    return backup_path, info['strategy']
+
+
+def create_backup(file_path, progress=None, cancel=None):
+    """Cria backup do arquivo atual"""
+    return backup_file(file_path, progress, cancel)[0]
+
+
+def restore_backup(file_path, backup_path=None):
+    """Restaura o arquivo a partir do backup .bak"""
+    backup_path = backup_path or backup_path_for(file_path)
+    if not os.path.exists(backup_path):
+        raise Exception(f"Backup not found: {backup_path}")
+    try:
+        # Copia para um temporário e troca de forma atômica
+        tmp_path = temp_path_for(file_path)
+        with trace.span('restore', file=file_path, bytes=os.path.getsize(backup_path)):
+            try:
+                copy_file(backup_path, tmp_path)
+                fsync_path(tmp_path)
+                os.replace(tmp_path, file_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            fsync_dir(os.path.dirname(os.path.abspath(file_path)))
+    except Exception as e:
+        raise Exception(f"Failed to restore backup: {str(e)}")
+    return backup_path
+
+
+def temp_path_for(file_path):
+    """Caminho temporário na mesma pasta (para o rename atômico)"""
+    folder, name = os.path.split(os.path.abspath(file_path))
+    return os.path.join(folder, f".{name}.{os.getpid()}.tmp")
+
+
+def fsync_path(file_path):
+    """Força a gravação de um arquivo em disco"""
+    with open(file_path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(folder_path):
+    """Força a gravação da entrada de diretório (ignorado no Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(folder_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(file_path, data):
+    """Grava o conteúdo inteiro num temporário, faz fsync e renomeia por cima do original"""
+    tmp_path = temp_path_for(file_path)
+    with trace.span('write', file=file_path, bytes=len(data), atomic=True):
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                with trace.span('fsync', file=file_path):
+                    os.fsync(f.fileno())
+            if os.path.exists(file_path):
+                shutil.copystat(file_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        fsync_dir(os.path.dirname(os.path.abspath(file_path)))
+
+
+def _pwrite(f, data, offset):
+    if hasattr(os, 'pwrite'):
+        os.pwrite(f.fileno(), data, offset)
+    else:
+        f.seek(offset)
+        f.write(data)
+
+
+def _pread(f, length, offset):
+    if hasattr(os, 'pread'):
+        return os.pread(f.fileno(), length, offset)
+    f.seek(offset)
+    return f.read(length)
+
+
+def patch_hits_in_place(file_path, hits, old_steamid, new_steamid):
+    """Reescreve só os bytes de cada ocorrência, direto no arquivo, e faz fsync
+
+    Antes de gravar confere que cada offset ainda contém o SteamID antigo,
+    para não corromper o arquivo com offsets desatualizados.
+    """
+    with trace.span('write', file=file_path, atomic=False) as info, open(file_path, 'r+b') as f:
+        for hit in hits:
+            old_bytes = locator.encode_steamid(old_steamid, hit.encoding)
+            if _pread(f, len(old_bytes), hit.offset) != old_bytes:
+                raise Exception(f"File changed: 0x{hit.offset:x} no longer holds SteamID {old_steamid}")
+        written = 0
+        for hit in hits:
+            new_bytes = locator.encode_steamid(new_steamid, hit.encoding)
+            _pwrite(f, new_bytes, hit.offset)
+            written += len(new_bytes)
+        info['bytes'] = written
+        f.flush()
+        with trace.span('fsync', file=file_path):
+            os.fsync(f.fileno())
+    return len(hits)
+
+
+def apply_hits(data, hits, new_steamid):
+    """Reescreve no bytearray cada ocorrência localizada com o novo SteamID"""
+    for hit in hits:
+        new_bytes = locator.encode_steamid(new_steamid, hit.encoding)
+        data[hit.offset:hit.offset + len(new_bytes)] = new_bytes
+    return len(hits)
+
+
+def replace_steamid_in_data(data, old_steamid, new_steamid, encodings=locator.ALL_ENCODINGS):
+    """Substitui o SteamID (em todas as codificações) e retorna o número de trocas"""
+    hits = find_steamid_offsets(data, old_steamid, encodings)
+    return apply_hits(data, hits, new_steamid)
+
+
+def replace_steamid_in_file(file_path, old_steamid, new_steamid, encodings=locator.ALL_ENCODINGS,
+                            hits=None, in_place=True, progress=None, cancel=None):
+    """Substitui SteamID em um arquivo
+
+    Por padrão grava só os bytes alterados (o SteamID tem sempre o mesmo
+    tamanho). Com in_place=False, regrava o arquivo inteiro de forma
+    atômica (temporário + fsync + rename). hits permite reaproveitar
+    offsets já localizados. cancel (threading.Event) é consultado até o
+    último instante antes da gravação.
+    """
+    try:
+        with trace.span('patch', file=file_path, size=os.path.getsize(file_path), in_place=in_place) as info:
+            if not in_place:
+                data = read_save(file_path)
+                hits = find_steamid_offsets(data, old_steamid, encodings, progress, cancel)
+                apply_hits(data, hits, new_steamid)
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled("Operation cancelled")
+                if hits:
+                    atomic_write(file_path, data)
+                info['replacements'] = len(hits)
+                return len(hits)
+
+            if hits is None:
+                with map_save(file_path) as data:
+                    hits = find_steamid_offsets(data, old_steamid, encodings, progress, cancel)
+            info['replacements'] = len(hits)
+            if not hits:
+                return 0
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Operation cancelled")
+            return patch_hits_in_place(file_path, hits, old_steamid, new_steamid)
+
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to replace SteamID in file: {str(e)}")
+
+
+def rename_save_folder(folder_path, new_steamid):
+    """Renomeia a pasta do save game; retorna (sucesso, mensagem, novo caminho)"""
+    if not folder_path:
+        return False, "No save folder found to rename", None
+
+    parent_dir = os.path.dirname(folder_path)
+    new_folder_path = os.path.join(parent_dir, str(new_steamid))
+
+    if os.path.exists(new_folder_path):
+        return False, f"Folder already exists: {new_steamid}", None
+
+    try:
+        with trace.span('rename', folder=folder_path, target=new_folder_path):
+            os.rename(folder_path, new_folder_path)
+        return True, f"Folder renamed to: {new_steamid}", new_folder_path
+    except Exception as e:
+        return False, f"Failed to rename folder: {str(e)}", None
@@ -0,0 +1,368 @@
+"""Diferença binária entre dois saves (o save e seu .bak, ou dois slots)
+
+Como no rsync: o arquivo antigo é dividido em blocos de tamanho fixo,
+indexados pelo Adler-32 de cada bloco, e o novo é percorrido com o mesmo
+Adler-32 rolante; uma posição cujo hash está no índice é confirmada
+comparando os bytes do bloco. Um trecho inserido ou removido só
+desalinha os blocos em volta dele: a âncora seguinte é reencontrada e o
+resto volta a casar. Enquanto os blocos seguem casando em sequência a
+comparação é direta, sem hash; depois de uma diferença, os blocos
+alinhados seguintes são testados antes (troca do mesmo tamanho, como a
+do SteamID) e só então o hash rolante percorre a região, vetorizado com
+NumPy quando disponível. Cada byte do arquivo novo entra no máximo uma
+vez no hash rolante, então o tempo é linear no tamanho dos arquivos.
+
+Os trechos diferentes são aparados (prefixo e sufixo comuns), os curtos
+de mesmo tamanho são quebrados nos bytes que de fato mudaram, e cada um é
+anotado com a propriedade GVAS que o contém e se é uma troca de SteamID.
+"""
+import bisect
+import os
+import zlib
+
+from . import core, locator, trace
+from .gvas import open_gvas
+
+# Importado só no primeiro diff grande: a importação do NumPy custaria mais
+# que a partida inteira de um comando que não o usa
+np = None
+_numpy_checked = False
+
+DEFAULT_BLOCK_SIZE = 4096
+_ADLER_MOD = 65521
+# Blocos comparados por candidato (blocos repetidos, como os zerados, têm o mesmo hash)
+_MAX_BLOCKS_PER_HASH = 16
+# Blocos alinhados testados depois de uma diferença, antes do hash rolante
+_ALIGNED_PROBES = 8
+# Primeira região vetorizada; dobra a cada região sem âncora
+_FIRST_REGION = 64 * 1024
+_MAX_REGION = 8 * 1024 * 1024
+# Trechos de mesmo tamanho até este limite são quebrados byte a byte
+_SPLIT_LIMIT = 64 * 1024
+# Bytes iguais que separam dois trechos alterados (abaixo disso, um trecho só)
+_MIN_EQUAL_RUN = 8
+_PROGRESS_STEP = 4 * 1024 * 1024
+# Abaixo disso o custo fixo do NumPy não compensa
+NUMPY_MIN_SIZE = 256 * 1024
+
+
+def numpy_available():
+    """NumPy instalado e não desativado por SBEDITOR_BACKEND=python"""
+    global np, _numpy_checked
+    if os.getenv('SBEDITOR_BACKEND', '').lower() == 'python':
+        return False
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+        _numpy_checked = True
+    return np is not None
+
+
+def index_blocks(data, block_size=DEFAULT_BLOCK_SIZE):
+    """Índice Adler-32 → offsets (crescentes) dos blocos inteiros de data"""
+    index = {}
+    for start in range(0, len(data) - block_size + 1, block_size):
+        index.setdefault(zlib.adler32(data[start:start + block_size]), []).append(start)
+    return index
+
+
+def _nearest(starts, target):
+    """Até _MAX_BLOCKS_PER_HASH offsets de starts, do mais próximo de target ao mais distante"""
+    i = bisect.bisect_left(starts, target)
+    before, after = i - 1, i
+    for _ in range(_MAX_BLOCKS_PER_HASH):
+        if before < 0 and after >= len(starts):
+            return
+        if after >= len(starts) or (before >= 0 and target - starts[before] <= starts[after] - target):
+            yield starts[before]
+            before -= 1
+        else:
+            yield starts[after]
+            after += 1
+
+
+def _rolling_candidates(data, start, stop, block_size, index, check_cancel=None):
+    """Posições em [start, stop) cujo Adler-32 do bloco está no índice (Python puro)"""
+    weak = zlib.adler32(data[start:start + block_size])
+    a, b = weak & 0xffff, weak >> 16
+    position = start
+    while True:
+        if (b << 16 | a) in index:
+            yield position
+        if position + 1 >= stop:
+            return
+        out = data[position]
+        a = (a - out + data[position + block_size]) % _ADLER_MOD
+        b = (b - block_size * out + a - 1) % _ADLER_MOD
+        position += 1
+        if check_cancel and not position & 0xfffff:
+            check_cancel()
+
+
+def _vector_index(index):
+    """(tabela de 2**24 booleanos indexada por 24 bits do Adler-32, hashes do índice) para o NumPy"""
+    table = np.zeros(1 << 24, dtype=np.bool_)
+    keys = np.fromiter(index, dtype=np.int64, count=len(index))
+    table[_filter_key(keys)] = True
+    return table, keys
+
+
+def _filter_key(weak):
+    return ((weak >> 16) & 0xff) << 16 | (weak & 0xffff)
+
+
+def _vectorized_candidates(data, start, stop, block_size, vector_index, check_cancel=None):
+    """Como _rolling_candidates, com o Adler-32 de cada posição calculado por somas prefixas
+
+    Para a janela em p: a = 1 + S[p+L] - S[p] e
+    b = L + (L + p) (S[p+L] - S[p]) - (T[p+L] - T[p]), com S a soma prefixa
+    dos bytes e T a de i * byte (índices locais à região, sem estouro em int64).
+    A tabela descarta de uma vez quase todas as posições; as poucas que
+    sobram são conferidas contra os hashes do índice.
+    """
+    table, keys = vector_index
+    region = _FIRST_REGION
+    while start < stop:
+        count = min(region, stop - start)
+        # Cópia da região: nenhum array fica apontando para o mmap
+        window = np.frombuffer(data[start:start + count + block_size - 1], dtype=np.uint8).astype(np.int64)
+        sums = np.zeros(len(window) + 1, dtype=np.int64)
+        np.cumsum(window, out=sums[1:])
+        weighted = np.zeros(len(window) + 1, dtype=np.int64)
+        np.cumsum(window * np.arange(len(window), dtype=np.int64), out=weighted[1:])
+        block_sums = sums[block_size:block_size + count] - sums[:count]
+        a = (1 + block_sums) % _ADLER_MOD
+        b = (block_size + (block_size + np.arange(count, dtype=np.int64)) * block_sums
+             - (weighted[block_size:block_size + count] - weighted[:count])) % _ADLER_MOD
+        weak = (b << 16) | a
+        found = np.flatnonzero(table[_filter_key(weak)])
+        found = found[np.isin(weak[found], keys)]
+        for position in (found + start).tolist():
+            yield position
+        start += count
+        region = min(region * 2, _MAX_REGION)
+        if check_cancel:
+            check_cancel()
+
+
+def match_blocks(old, new, block_size=DEFAULT_BLOCK_SIZE, progress=None, cancel=None):
+    """Trechos iguais entre old e new: lista de (início em new, início em old, tamanho)
+
+    Os trechos estão em ordem no arquivo novo e são no mínimo do tamanho
+    de um bloco. progress(feito, total) é chamado ao longo do arquivo novo.
+    """
+    check_cancel = core.make_cancel_check(cancel)
+    index = index_blocks(old, block_size)
+    use_numpy = len(new) >= NUMPY_MIN_SIZE and numpy_available() and bool(index)
+    vector_index = _vector_index(index) if use_numpy else None
+    old_size, last = len(old), len(new) - block_size
+    matches = []
+    position = expected = 0
+    next_report = _PROGRESS_STEP
+
+    def same(new_start, old_start):
+        return (old_start + block_size <= old_size
+                and new[new_start:new_start + block_size] == old[old_start:old_start + block_size])
+
+    def resync(position, expected):
+        """Próxima âncora (posição em new, posição em old) depois de uma diferença"""
+        for k in range(1, _ALIGNED_PROBES + 1):
+            if position + k * block_size > last:
+                break
+            if same(position + k * block_size, expected + k * block_size):
+                return position + k * block_size, expected + k * block_size
+        if not index:
+            return None
+        if use_numpy:
+            candidates = _vectorized_candidates(new, position, last + 1, block_size, vector_index, check_cancel)
+        else:
+            candidates = _rolling_candidates(new, position, last + 1, block_size, index, check_cancel)
+        # Conteúdo repetido pode casar longe daqui: depois da primeira âncora,
+        # o bloco seguinte ainda é percorrido atrás de uma mais próxima do
+        # alinhamento atual (a de uma inserção ou remoção aparece nesse trecho)
+        best = None
+        for candidate in candidates:
+            if best is not None and candidate >= best[0] + block_size:
+                break
+            block = new[candidate:candidate + block_size]
+            target = expected + candidate - position
+            for start in _nearest(index.get(zlib.adler32(block), []), target):
+                if old[start:start + block_size] == block:
+                    if best is None or abs(start - target) < best[2]:
+                        best = (candidate, start, abs(start - target))
+                    break
+            if best is not None and best[2] == 0:
+                break
+        return best[:2] if best else None
+
+    while position <= last:
+        if same(position, expected):
+            previous = matches[-1] if matches else None
+            if previous and previous[0] + previous[2] == position and previous[1] + previous[2] == expected:
+                matches[-1] = (previous[0], previous[1], previous[2] + block_size)
+            else:
+                matches.append((position, expected, block_size))
+            position += block_size
+            expected += block_size
+        else:
+            anchor = resync(position, expected)
+            if anchor is None:
+                break
+            position, expected = anchor
+        if position >= next_report:
+            next_report += _PROGRESS_STEP
+            if check_cancel:
+                check_cancel()
+            if progress:
+                progress(min(position, len(new)), len(new))
+    if progress:
+        progress(len(new), len(new))
+    return matches
+
+
+def _gaps(matches, old_size, new_size):
+    """Intervalos (old_start, old_end, new_start, new_end) entre os trechos iguais"""
+    old_position = new_position = 0
+    for new_start, old_start, length in matches + [(new_size, old_size, 0)]:
+        # Bloco que voltou para trás no arquivo antigo: nada foi removido antes dele
+        old_end = max(old_start, old_position)
+        if new_start > new_position or old_end > old_position:
+            yield old_position, old_end, new_position, new_start
+        old_position = max(old_position, old_start + length)
+        new_position = new_start + length
+
+
+def _trim(old, new, old_start, old_end, new_start, new_end):
+    """Apara o prefixo e o sufixo comuns do intervalo"""
+    step = 64
+    while (old_start + step <= old_end and new_start + step <= new_end
+           and old[old_start:old_start + step] == new[new_start:new_start + step]):
+        old_start += step
+        new_start += step
+    while old_start < old_end and new_start < new_end and old[old_start] == new[new_start]:
+        old_start += 1
+        new_start += 1
+    while (old_end - step >= old_start and new_end - step >= new_start
+           and old[old_end - step:old_end] == new[new_end - step:new_end]):
+        old_end -= step
+        new_end -= step
+    while old_end > old_start and new_end > new_start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return old_start, old_end, new_start, new_end
+
+
+def _split(old_bytes, new_bytes):
+    """Trechos (início, fim) que diferem entre dois blocos do mesmo tamanho"""
+    runs = []
+    for i, (x, y) in enumerate(zip(old_bytes, new_bytes)):
+        if x == y:
+            continue
+        if runs and i - runs[-1][1] < _MIN_EQUAL_RUN:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return runs
+
+
+def changed_ranges(old, new, matches):
+    """Trechos diferentes: dicts com 'kind' ('changed', 'inserted' ou 'deleted') e os offsets"""
+    ranges = []
+    for gap in _gaps(matches, len(old), len(new)):
+        old_start, old_end, new_start, new_end = _trim(old, new, *gap)
+        if old_end - old_start == new_end - new_start:
+            if old_start == old_end:
+                continue
+            if old_end - old_start <= _SPLIT_LIMIT:
+                for start, end in _split(old[old_start:old_end], new[new_start:new_end]):
+                    ranges.append({'kind': 'changed', 'old_start': old_start + start,
+                                   'old_end': old_start + end, 'new_start': new_start + start,
+                                   'new_end': new_start + end})
+                continue
+        kind = 'inserted' if old_start == old_end else 'deleted' if new_start == new_end else 'changed'
+        ranges.append({'kind': kind, 'old_start': old_start, 'old_end': old_end,
+                       'new_start': new_start, 'new_end': new_end})
+    return ranges
+
+
+def _steamid_change(old, new, entry):
+    """(antigo, novo) se o trecho está dentro de um SteamID nos dois arquivos, senão None"""
+    length = entry['new_end'] - entry['new_start']
+    if length != entry['old_end'] - entry['old_start'] or not 0 < length <= locator.MAX_HIT_LENGTH:
+        return None
+    shift = entry['old_start'] - entry['new_start']
+    window_start = max(0, entry['new_start'] - locator.MAX_HIT_LENGTH)
+    for hit in locator.iter_steamids(new, start=window_start,
+                                     end=min(len(new), entry['new_end'] + locator.MAX_HIT_LENGTH)):
+        hit_end = hit.offset + len(locator.encode_steamid(hit.steamid, hit.encoding))
+        if hit.offset > entry['new_start'] or hit_end < entry['new_end']:
+            continue
+        old_start = hit.offset + shift
+        if old_start < 0 or hit_end + shift > len(old):
+            continue
+        for old_hit in locator.iter_steamids(old, encodings=(hit.encoding,), start=old_start,
+                                             end=hit_end + shift):
+            if old_hit.offset == old_start and old_hit.steamid != hit.steamid:
+                return old_hit.steamid, hit.steamid
+    return None
+
+
+def annotate_ranges(old, new, ranges):
+    """Acrescenta 'property' (caminho GVAS, ou None) e 'steamid' ((antigo, novo) ou None) a cada trecho"""
+    saves = {}
+
+    def property_path(data, offset):
+        if id(data) not in saves:
+            saves[id(data)] = open_gvas(data)
+        save = saves[id(data)]
+        prop = save.property_at(offset) if save is not None else None
+        return prop.path if prop is not None else None
+
+    for entry in ranges:
+        if entry['kind'] == 'deleted':
+            entry['property'] = property_path(old, entry['old_start'])
+        else:
+            entry['property'] = property_path(new, entry['new_start'])
+        entry['steamid'] = _steamid_change(old, new, entry) if entry['kind'] == 'changed' else None
+    return ranges
+
+
+def diff_files(old_path, new_path, block_size=DEFAULT_BLOCK_SIZE, progress=None, cancel=None):
+    """Compara dois saves; retorna {'old_file', 'new_file', 'old_size', 'new_size', 'equal_bytes', 'ranges'}
+
+    ranges vem de changed_ranges, anotados por annotate_ranges.
+    """
+    if block_size < 16:
+        raise ValueError("Block size must be at least 16 bytes")
+    with trace.span('diff', old=old_path, new=new_path) as info, \
+            core.map_save(old_path) as old, core.map_save(new_path) as new:
+        info['bytes'] = len(old) + len(new)
+        matches = match_blocks(old, new, block_size, progress, cancel)
+        ranges = annotate_ranges(old, new, changed_ranges(old, new, matches))
+        info['ranges'] = len(ranges)
+        return {
+            'old_file': old_path,
+            'new_file': new_path,
+            'old_size': len(old),
+            'new_size': len(new),
+            'equal_bytes': len(new) - sum(r['new_end'] - r['new_start'] for r in ranges),
+            'ranges': ranges,
+        }
+
+
+def describe_range(entry):
+    """Linha de texto de um trecho, para a CLI e a interface"""
+    if entry['kind'] == 'inserted':
+        where = f"new 0x{entry['new_start']:x}+{entry['new_end'] - entry['new_start']}"
+    elif entry['kind'] == 'deleted':
+        where = f"old 0x{entry['old_start']:x}+{entry['old_end'] - entry['old_start']}"
+    else:
+        where = (f"old 0x{entry['old_start']:x}+{entry['old_end'] - entry['old_start']}"
+                 f" -> new 0x{entry['new_start']:x}+{entry['new_end'] - entry['new_start']}")
+    text = f"{entry['kind']:<8} {where}"
+    if entry.get('steamid'):
+        text += f"  SteamID {entry['steamid'][0]} -> {entry['steamid'][1]}"
+    return text + f"  [{entry.get('property') or '(outside known property)'}]"
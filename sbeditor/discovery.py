@@ -0,0 +1,301 @@
+"""Descoberta das pastas SaveGames e dos configs.user.ini (Windows, Proton e Wine)
+
+No Linux o jogo roda num prefixo do Proton, e os saves ficam em
+<biblioteca>/steamapps/compatdata/<appid>/pfx/drive_c/users/steamuser/
+AppData/Local/SB/Saved/SaveGames. As bibliotecas vêm do
+libraryfolders.vdf de cada instalação do Steam; todos os prefixos de
+compatdata são percorridos (em paralelo), porque o jogo pode ter sido
+adicionado como atalho não-Steam, com um appid qualquer. Os
+configs.user.ini vêm das pastas steam_settings das instalações do jogo e
+das configurações globais do emulador dentro de cada prefixo.
+
+Cada busca guarda o mtime de toda pasta consultada; enquanto nenhum
+mudar, o resultado gravado em cache é reaproveitado sem listar nada.
+"""
+import fnmatch
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, trace
+from .cache import default_cache_dir
+
+CACHE_VERSION = 1
+CACHE_FILE_NAME = 'discovery.json'
+DEFAULT_WORKERS = 8
+
+# Caminhos relativos à raiz de um prefixo Wine (a pasta que contém drive_c)
+SAVE_PATTERN = ('drive_c', 'users', '*', 'AppData', 'Local', 'SB', 'Saved', 'SaveGames')
+PREFIX_CONFIG_PATTERNS = (
+    ('drive_c', 'users', '*', 'AppData', 'Roaming', 'Goldberg SteamEmu Saves', 'settings', 'configs.user.ini'),
+    ('drive_c', 'users', '*', 'AppData', 'Roaming', 'GSE Saves', 'settings', 'configs.user.ini'),
+)
+# Relativo a uma biblioteca do Steam
+GAME_CONFIG_PATTERN = ('steamapps', 'common', '*', 'Engine', 'Binaries', 'ThirdParty', 'Steamworks',
+                       'Steamv*', 'Win64', 'steam_settings', 'configs.user.ini')
+
+_VDF_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([{}])|//[^\n]*')
+_VDF_ESCAPE = re.compile(r'\\(.)')
+
+
+def parse_vdf(text):
+    """Lê o formato KeyValues do Steam (.vdf) como dicts aninhados"""
+    stack = [{}]
+    key = None
+    for match in _VDF_TOKEN.finditer(text):
+        string, brace = match.groups()
+        if brace == '{':
+            section = {}
+            stack[-1][key] = section
+            stack.append(section)
+            key = None
+        elif brace == '}':
+            if len(stack) > 1:
+                stack.pop()
+            key = None
+        elif string is not None:
+            value = _VDF_ESCAPE.sub(r'\1', string)
+            if key is None:
+                key = value
+            else:
+                stack[-1][key] = value
+                key = None
+    return stack[0]
+
+
+def steam_roots():
+    """Instalações do Steam existentes (SBEDITOR_STEAM_ROOT, separadas por os.pathsep, tem prioridade)"""
+    if os.getenv('SBEDITOR_STEAM_ROOT'):
+        candidates = os.getenv('SBEDITOR_STEAM_ROOT').split(os.pathsep)
+    elif sys.platform == 'win32':
+        candidates = [os.path.join(os.getenv(name, ''), 'Steam')
+                      for name in ('ProgramFiles(x86)', 'ProgramFiles') if os.getenv(name)]
+    else:
+        home = os.path.expanduser('~')
+        candidates = [
+            os.path.join(home, '.steam', 'steam'),
+            os.path.join(home, '.steam', 'root'),
+            os.path.join(home, '.local', 'share', 'Steam'),
+            os.path.join(home, '.var', 'app', 'com.valvesoftware.Steam', '.local', 'share', 'Steam'),
+            os.path.join(home, 'snap', 'steam', 'common', '.local', 'share', 'Steam'),
+        ]
+    roots = []
+    seen = set()
+    for candidate in candidates:
+        real = os.path.realpath(candidate)
+        if os.path.isdir(os.path.join(candidate, 'steamapps')) and real not in seen:
+            seen.add(real)
+            roots.append(candidate)
+    return roots
+
+
+def library_folders(steam_root):
+    """Bibliotecas do Steam: a própria instalação mais as do libraryfolders.vdf"""
+    libraries = [steam_root]
+    for vdf_path in (os.path.join(steam_root, 'steamapps', 'libraryfolders.vdf'),
+                     os.path.join(steam_root, 'config', 'libraryfolders.vdf')):
+        try:
+            with open(vdf_path, 'r', encoding='utf-8', errors='replace') as f:
+                content = parse_vdf(f.read())
+        except OSError:
+            continue
+        section = next((value for key, value in content.items() if key.lower() == 'libraryfolders'), {})
+        for key, value in section.items():
+            if not key.isdigit():
+                continue
+            # Formato novo: {"path": ...}; antigo: o caminho direto
+            path = value.get('path') if isinstance(value, dict) else value
+            if path:
+                libraries.append(path)
+    result = []
+    seen = set()
+    for library in libraries:
+        real = os.path.realpath(library)
+        if real not in seen and os.path.isdir(library):
+            seen.add(real)
+            result.append(library)
+    return result
+
+
+def wine_prefixes():
+    """Prefixos Wine fora do Steam: WINEPREFIX e ~/.wine"""
+    if sys.platform == 'win32':
+        return []
+    candidates = [os.getenv('WINEPREFIX'), os.path.join(os.path.expanduser('~'), '.wine')]
+    return [p for p in dict.fromkeys(c for c in candidates if c) if os.path.isdir(os.path.join(p, 'drive_c'))]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def find_matches(base, pattern, witnesses):
+    """Caminhos existentes base/pattern (componentes com curingas, todos menos o último são pastas)
+
+    Anota em witnesses o mtime de cada pasta consultada: criar ou apagar
+    qualquer coisa no caminho muda o mtime de uma delas.
+    """
+    paths = [base]
+    for depth, part in enumerate(pattern):
+        last = depth == len(pattern) - 1
+        found = []
+        for path in paths:
+            witnesses[path] = _mtime(path)
+            names = fnmatch.filter(_listdir(path), part) if any(c in part for c in '*?[') else [part]
+            for name in sorted(names):
+                candidate = os.path.join(path, name)
+                if os.path.exists(candidate) if last else os.path.isdir(candidate):
+                    found.append(candidate)
+        paths = found
+    return paths
+
+
+class DiscoveryCache:
+    """Resultados das buscas, válidos enquanto o mtime das pastas consultadas não muda"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir(), CACHE_FILE_NAME)
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == CACHE_VERSION:
+                self._entries = content.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def lookup(self, base, pattern):
+        """find_matches com cache: só consulta o disco se alguma pasta anotada mudou"""
+        key = '|'.join((base,) + tuple(pattern))
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        if entry is not None and all(_mtime(path) == mtime for path, mtime in entry['witnesses'].items()):
+            return entry['found']
+        witnesses = {}
+        found = find_matches(base, pattern, witnesses)
+        with self._lock:
+            self._entries[key] = {'witnesses': witnesses, 'found': found}
+            self._dirty = True
+        return found
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'entries': self._entries}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def _save_entry(path, source, prefix):
+    folders = core.find_steamid_folders(path)
+    return {'kind': 'saves', 'path': path, 'source': source, 'prefix': prefix,
+            'steamids': [os.path.basename(f) for f in folders], 'mtime': _mtime(path) or 0}
+
+
+def _config_entry(path, source, prefix):
+    try:
+        steamid = core.read_config_steamid(path)
+    except (OSError, ValueError):
+        steamid = None
+    return {'kind': 'config', 'path': path, 'source': source, 'prefix': prefix,
+            'steamids': [steamid] if steamid else [], 'mtime': _mtime(path) or 0}
+
+
+def discover(roots=None, cache=None, workers=DEFAULT_WORKERS):
+    """Lista única das pastas SaveGames e dos configs.user.ini encontrados
+
+    Cada item é {'kind': 'saves' ou 'config', 'path', 'source' ('windows',
+    'proton', 'wine' ou 'steam'), 'prefix' (appid do prefixo Proton, ou
+    None), 'steamids' (pastas de SteamID, ou o SteamID do config), 'mtime'}.
+    Os saves vêm primeiro, dos mais recentes aos mais antigos.
+    """
+    lookup = cache.lookup if cache is not None else (lambda base, pattern: find_matches(base, pattern, {}))
+    roots = steam_roots() if roots is None else roots
+    with trace.span('discover', roots=len(roots)) as info:
+        jobs = []
+        native = os.path.join(os.getenv('LOCALAPPDATA', ''), 'SB', 'Saved', 'SaveGames')
+        if os.getenv('LOCALAPPDATA') and os.path.isdir(native):
+            jobs.append(lambda: [_save_entry(native, 'windows', None)])
+
+        def prefix_job(prefix_root, source, prefix):
+            def job():
+                entries = [_save_entry(p, source, prefix) for p in lookup(prefix_root, SAVE_PATTERN)]
+                for pattern in PREFIX_CONFIG_PATTERNS:
+                    entries.extend(_config_entry(p, source, prefix) for p in lookup(prefix_root, pattern))
+                return entries
+            return job
+
+        def library_job(library):
+            def job():
+                return [_config_entry(p, 'steam', None) for p in lookup(library, GAME_CONFIG_PATTERN)]
+            return job
+
+        libraries = list(dict.fromkeys(library for root in roots for library in library_folders(root)))
+        for library in libraries:
+            jobs.append(library_job(library))
+            compatdata = os.path.join(library, 'steamapps', 'compatdata')
+            for appid in sorted(_listdir(compatdata)):
+                prefix_root = os.path.join(compatdata, appid, 'pfx')
+                if os.path.isdir(prefix_root):
+                    jobs.append(prefix_job(prefix_root, 'proton', appid))
+        for prefix_root in wine_prefixes():
+            jobs.append(prefix_job(prefix_root, 'wine', None))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            entries = [entry for result in executor.map(lambda job: job(), jobs) for entry in result]
+        info['libraries'] = len(libraries)
+        info['prefixes'] = len(jobs) - len(libraries)
+
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError:
+            pass
+    entries.sort(key=lambda e: (e['kind'] != 'saves', -e['mtime'], e['path']))
+    return entries
+
+
+_discovered = None
+
+
+def discovered(refresh=False):
+    """Resultado de discover() com o cache padrão, guardado para o resto do processo"""
+    global _discovered
+    if _discovered is None or refresh:
+        _discovered = discover(cache=DiscoveryCache())
+    return _discovered
+
+
+def find_save_root():
+    """SaveGames modificado mais recentemente, ou None"""
+    return next((e['path'] for e in discovered() if e['kind'] == 'saves'), None)
+
+
+def find_config():
+    """Primeiro configs.user.ini encontrado com um SteamID válido, ou None"""
+    return next((e['path'] for e in discovered() if e['kind'] == 'config' and e['steamids']), None)
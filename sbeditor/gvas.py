@@ -0,0 +1,369 @@
+"""Leitura preguiçosa do contêiner GVAS (SaveGame do Unreal) usado pelos saves do Stellar Blade
+
+Só o cabeçalho é decodificado na abertura. A árvore de propriedades é
+lida sob demanda: cada propriedade guarda apenas o nome, o tipo e o
+intervalo de bytes do valor, e os filhos de structs/arrays só são
+decodificados quando acessados.
+"""
+import bisect
+import struct
+
+from . import locator
+
+GVAS_MAGIC = b'GVAS'
+
+STRING_TYPES = ('StrProperty', 'NameProperty', 'TextProperty')
+INT_TYPES = ('IntProperty', 'UInt32Property', 'Int64Property', 'UInt64Property')
+
+# Structs serializados de forma nativa (sem lista de propriedades)
+NATIVE_STRUCTS = {
+    'Vector', 'Vector2D', 'Vector4', 'Rotator', 'Quat', 'Guid', 'DateTime',
+    'Timespan', 'LinearColor', 'Color', 'IntPoint', 'IntVector', 'Box',
+    'Box2D', 'Transform', 'SoftObjectPath', 'SoftClassPath', 'GameplayTag',
+    'GameplayTagContainer',
+}
+
+# Trechos de nome de propriedade que costumam guardar o SteamID
+STEAMID_NAME_HINTS = ('steamid', 'steam_id', 'userid', 'user_id', 'uniqueid',
+                      'unique_id', 'netid', 'accountid', 'account_id', 'playerid', 'owner')
+
+
+class GvasError(Exception):
+    """Arquivo não é um GVAS válido ou está truncado"""
+
+
+def read_fstring(buf, pos):
+    """Lê uma FString do Unreal; retorna (texto, próxima posição)"""
+    try:
+        length, = struct.unpack_from('<i', buf, pos)
+    except struct.error:
+        raise GvasError(f"Truncated string at 0x{pos:x}")
+    pos += 4
+    if length == 0:
+        return '', pos
+    if length > 0:
+        end = pos + length
+        raw = bytes(buf[pos:end - 1])
+        encoding = 'latin-1'
+    else:
+        end = pos - length * 2
+        raw = bytes(buf[pos:end - 2])
+        encoding = 'utf-16-le'
+    if end > len(buf) or end < pos:
+        raise GvasError(f"String out of bounds at 0x{pos - 4:x}")
+    return raw.decode(encoding, errors='replace'), end
+
+
+class GvasHeader:
+    """Cabeçalho do GVAS: versões, custom versions e classe do SaveGame"""
+
+    def __init__(self, buf):
+        if bytes(buf[:4]) != GVAS_MAGIC:
+            raise GvasError("Not a GVAS save file")
+        try:
+            pos = 4
+            self.save_game_version, self.package_version = struct.unpack_from('<ii', buf, pos)
+            pos += 8
+            self.package_ue5_version = None
+            if self.save_game_version >= 3:
+                self.package_ue5_version, = struct.unpack_from('<i', buf, pos)
+                pos += 4
+            major, minor, patch, changelist = struct.unpack_from('<HHHI', buf, pos)
+            pos += 10
+            self.engine_branch, pos = read_fstring(buf, pos)
+            self.engine_version = (major, minor, patch, changelist)
+
+            self.custom_version_format, count = struct.unpack_from('<ii', buf, pos)
+            pos += 8
+            if count < 0 or pos + count * 20 > len(buf):
+                raise GvasError("Invalid custom version table")
+            self.custom_versions = []
+            for _ in range(count):
+                guid = bytes(buf[pos:pos + 16]).hex()
+                version, = struct.unpack_from('<i', buf, pos + 16)
+                self.custom_versions.append((guid, version))
+                pos += 20
+
+            self.save_game_class, pos = read_fstring(buf, pos)
+        except struct.error:
+            raise GvasError("Truncated GVAS header")
+        self.properties_offset = pos
+
+
+class GvasProperty:
+    """Propriedade do GVAS; o valor e os filhos são lidos sob demanda"""
+
+    def __init__(self, buf, name, type_name, offset, value_start, value_end,
+                 path, sub_type=None, bool_value=None):
+        self._buf = buf
+        self.name = name
+        self.type = type_name
+        self.offset = offset
+        self.value_start = value_start
+        self.value_end = value_end
+        self.path = path
+        self.sub_type = sub_type
+        self.bool_value = bool_value
+        self._children = None
+
+    def __repr__(self):
+        return (f"<GvasProperty {self.path} {self.type}"
+                f" [0x{self.value_start:x}:0x{self.value_end:x}]>")
+
+    @property
+    def kind(self):
+        """Classifica o valor: 'string', 'int', 'struct', 'array' ou 'other'"""
+        if self.type in STRING_TYPES:
+            return 'string'
+        if self.type in INT_TYPES:
+            return 'int'
+        if self.type == 'ArrayProperty' and self.sub_type in INT_TYPES:
+            return 'int'
+        if self.type == 'StructProperty' and self.children:
+            return 'struct'
+        if self.type == 'ArrayProperty' and self.children:
+            return 'array'
+        return 'other'
+
+    @property
+    def children(self):
+        """Propriedades internas de structs e arrays (decodificadas no primeiro acesso)"""
+        if self._children is None:
+            try:
+                self._children = self._parse_children()
+            except (GvasError, struct.error):
+                self._children = []
+        return self._children
+
+    @property
+    def value(self):
+        """Decodifica o valor de propriedades simples"""
+        buf = self._buf
+        if self.type == 'BoolProperty':
+            return self.bool_value
+        if self.type in ('StrProperty', 'NameProperty'):
+            return read_fstring(buf, self.value_start)[0]
+        if self.type == 'IntProperty':
+            return struct.unpack_from('<i', buf, self.value_start)[0]
+        if self.type == 'UInt32Property':
+            return struct.unpack_from('<I', buf, self.value_start)[0]
+        if self.type == 'Int64Property':
+            return struct.unpack_from('<q', buf, self.value_start)[0]
+        if self.type == 'UInt64Property':
+            return struct.unpack_from('<Q', buf, self.value_start)[0]
+        return bytes(buf[self.value_start:self.value_end])
+
+    def _parse_children(self):
+        if self.type == 'StructProperty':
+            if self.sub_type in NATIVE_STRUCTS:
+                return []
+            return parse_property_list(self._buf, self.value_start, self.value_end, self.path)
+        if self.type == 'ArrayProperty':
+            return self._parse_array()
+        return []
+
+    def _parse_array(self):
+        buf = self._buf
+        pos = self.value_start
+        count, = struct.unpack_from('<i', buf, pos)
+        pos += 4
+        elements = []
+        if self.sub_type in ('StrProperty', 'NameProperty'):
+            for i in range(count):
+                start = pos
+                _, pos = read_fstring(buf, pos)
+                elements.append(GvasProperty(buf, f"{self.name}[{i}]", self.sub_type,
+                                             start, start, pos, f"{self.path}[{i}]"))
+        elif self.sub_type == 'StructProperty':
+            _, pos = read_fstring(buf, pos)
+            _, pos = read_fstring(buf, pos)
+            pos += 8
+            struct_type, pos = read_fstring(buf, pos)
+            pos += 16
+            if buf[pos]:
+                pos += 16
+            pos += 1
+            if struct_type in NATIVE_STRUCTS:
+                return []
+            for i in range(count):
+                start = pos
+                path = f"{self.path}[{i}]"
+                children, pos = _parse_until_none(buf, pos, self.value_end, path)
+                element = GvasProperty(buf, f"{self.name}[{i}]", 'StructProperty',
+                                       start, start, pos, path, struct_type)
+                element._children = children
+                elements.append(element)
+        if pos != self.value_end and elements:
+            raise GvasError(f"Array {self.path} size mismatch")
+        return elements
+
+
+def read_property(buf, pos, end, parent_path=''):
+    """Lê o cabeçalho de uma propriedade; retorna (propriedade ou None no 'None', próxima posição)"""
+    offset = pos
+    name, pos = read_fstring(buf, pos)
+    if name == 'None':
+        return None, pos
+    type_name, pos = read_fstring(buf, pos)
+    size, = struct.unpack_from('<q', buf, pos)
+    pos += 8
+
+    sub_type = None
+    bool_value = None
+    if type_name == 'StructProperty':
+        sub_type, pos = read_fstring(buf, pos)
+        pos += 16
+    elif type_name == 'BoolProperty':
+        bool_value = bool(buf[pos])
+        pos += 1
+    elif type_name in ('ArrayProperty', 'SetProperty', 'ByteProperty', 'EnumProperty'):
+        sub_type, pos = read_fstring(buf, pos)
+    elif type_name == 'MapProperty':
+        key_type, pos = read_fstring(buf, pos)
+        value_type, pos = read_fstring(buf, pos)
+        sub_type = (key_type, value_type)
+
+    if pos >= end:
+        raise GvasError(f"Truncated property {name} at 0x{offset:x}")
+    has_guid = buf[pos]
+    pos += 1
+    if has_guid:
+        pos += 16
+
+    value_end = pos + size
+    if size < 0 or value_end > end:
+        raise GvasError(f"Property {name} at 0x{offset:x} runs past its container")
+
+    path = f"{parent_path}.{name}" if parent_path else name
+    prop = GvasProperty(buf, name, type_name, offset, pos, value_end, path, sub_type, bool_value)
+    return prop, value_end
+
+
+def _parse_until_none(buf, pos, end, parent_path):
+    properties = []
+    while pos < end:
+        prop, pos = read_property(buf, pos, end, parent_path)
+        if prop is None:
+            return properties, pos
+        properties.append(prop)
+    raise GvasError(f"Missing 'None' terminator in {parent_path or 'root'}")
+
+
+def parse_property_list(buf, pos, end, parent_path=''):
+    """Lê uma lista de propriedades que deve ocupar exatamente [pos, end)"""
+    properties, pos = _parse_until_none(buf, pos, end, parent_path)
+    if pos != end:
+        raise GvasError(f"Struct {parent_path} size mismatch")
+    return properties
+
+
+class GvasFile:
+    """Save GVAS com árvore de propriedades preguiçosa e índice nome → intervalos"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.header = GvasHeader(buf)
+        self._properties = None
+        self._index = None
+        self._leaf_starts = None
+        self._leaves = None
+
+    @property
+    def properties(self):
+        """Propriedades de nível superior"""
+        if self._properties is None:
+            self._properties, self.properties_end = _parse_until_none(
+                self.buf, self.header.properties_offset, len(self.buf), '')
+        return self._properties
+
+    def iter_properties(self, properties=None):
+        """Percorre toda a árvore em profundidade"""
+        for prop in self.properties if properties is None else properties:
+            yield prop
+            if prop.type in ('StructProperty', 'ArrayProperty'):
+                yield from self.iter_properties(prop.children)
+
+    @property
+    def index(self):
+        """Mapa caminho da propriedade → lista de (início, fim) do valor"""
+        if self._index is None:
+            self._index = {}
+            leaves = []
+            for prop in self.iter_properties():
+                self._index.setdefault(prop.path, []).append((prop.value_start, prop.value_end))
+                if prop.kind in ('string', 'int'):
+                    leaves.append(prop)
+            leaves.sort(key=lambda p: p.value_start)
+            self._leaves = leaves
+            self._leaf_starts = [p.value_start for p in leaves]
+        return self._index
+
+    def find(self, name):
+        """Propriedades cujo nome (ou caminho) contém o texto, sem diferenciar maiúsculas"""
+        name = name.lower()
+        return [p for p in self.iter_properties() if name in p.path.lower()]
+
+    def leaf_at(self, offset, length=1):
+        """Propriedade string/int que contém inteiramente [offset, offset + length)"""
+        self.index
+        i = bisect.bisect_right(self._leaf_starts, offset) - 1
+        if i >= 0:
+            prop = self._leaves[i]
+            if offset + length <= prop.value_end:
+                return prop
+        return None
+
+    def property_at(self, offset):
+        """Propriedade mais interna (de qualquer tipo) cujo cabeçalho ou valor contém offset"""
+        found = None
+        properties = self.properties
+        while properties:
+            for prop in properties:
+                if prop.offset <= offset < prop.value_end:
+                    found = prop
+                    properties = prop.children if prop.type in ('StructProperty', 'ArrayProperty') else None
+                    break
+                if prop.offset > offset:
+                    return found
+            else:
+                break
+        return found
+
+    def steamid_properties(self):
+        """Propriedades string/int cujo nome sugere que guardam um SteamID"""
+        self.index
+        return [p for p in self._leaves
+                if any(hint in p.name.lower() for hint in STEAMID_NAME_HINTS)]
+
+    def locate_steamids(self, steamids=None, properties=None, encodings=locator.ALL_ENCODINGS):
+        """Procura SteamIDs só dentro dos valores das propriedades indicadas
+
+        Por padrão usa as propriedades com nome sugestivo (steamid_properties),
+        pulando direto para elas em vez de varrer o arquivo todo.
+        """
+        if properties is None:
+            properties = self.steamid_properties()
+        hits = []
+        for prop in properties:
+            hits.extend(locator.iter_steamids(self.buf, steamids, encodings,
+                                              prop.value_start, prop.value_end))
+        return hits
+
+    def unsafe_hits(self, hits):
+        """Ocorrências cuja troca tocaria bytes fora de propriedades string/int conhecidas"""
+        unsafe = []
+        for hit in hits:
+            length = len(locator.encode_steamid(hit.steamid, hit.encoding))
+            if self.leaf_at(hit.offset, length) is None:
+                unsafe.append(hit)
+        return unsafe
+
+
+def open_gvas(buf):
+    """Abre o buffer como GVAS; retorna None se não for um GVAS legível"""
+    try:
+        gvas = GvasFile(buf)
+        gvas.properties
+        return gvas
+    except (GvasError, struct.error):
+        return None
@@ -0,0 +1,103 @@
+"""Inventário das pastas de SteamID e dos saves de uma árvore SaveGames"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, locator
+from .cache import scan_file_cached
+
+DEFAULT_WORKERS = 8
+
+
+def _list_sav_entries(folder_path):
+    """Lista os .sav da pasta com os dados de stat já obtidos pelo os.scandir"""
+    entries = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            if entry.name.lower().endswith('.sav') and entry.is_file():
+                entries.append(entry)
+    entries.sort(key=lambda e: e.name)
+    return entries
+
+
+class Inventory:
+    """Inventário incremental: pastas sem mudança reaproveitam a listagem anterior
+
+    O SteamID de cada arquivo vem do cache de varredura enquanto a
+    identidade do arquivo (tamanho, mtime, inode) não muda, então uma
+    atualização só varre arquivos novos ou modificados.
+    """
+
+    def __init__(self, save_root=None, cache=None, workers=DEFAULT_WORKERS):
+        self.save_root = save_root or core.default_save_root()
+        self.cache = cache
+        self.workers = workers
+        self.rows = []
+        self._folders = {}
+
+    def _scan_folder(self, folder_path, folder_mtime_ns):
+        previous = self._folders.get(folder_path)
+        if previous and previous['mtime_ns'] == folder_mtime_ns:
+            # Listagem igual: só confere o stat de cada arquivo
+            paths = [row['file'] for row in previous['rows']]
+            stats = []
+            for path in paths:
+                try:
+                    stats.append((path, os.stat(path)))
+                except OSError:
+                    pass
+        else:
+            stats = [(entry.path, entry.stat()) for entry in _list_sav_entries(folder_path)]
+
+        rows = []
+        for path, st in stats:
+            row = {
+                'folder': folder_path,
+                'folder_steamid': os.path.basename(folder_path),
+                'file': path,
+                'name': os.path.basename(path),
+                'size': st.st_size,
+                'mtime': st.st_mtime,
+                'steamid': None,
+                'hits': 0,
+                'error': None,
+            }
+            try:
+                hits = self.cache.get_hits(path, st) if self.cache is not None else None
+                if hits is None:
+                    hits, _, _ = scan_file_cached(path, self.cache)
+                row['steamid'] = locator.owner_steamid(hits, core.folder_steamid_of(path))
+                row['hits'] = len(hits)
+            except OSError as e:
+                row['error'] = str(e)
+            rows.append(row)
+        return folder_path, folder_mtime_ns, rows
+
+    def refresh(self, progress=None):
+        """Atualiza o inventário varrendo as pastas de SteamID em paralelo"""
+        folders = []
+        try:
+            with os.scandir(self.save_root) as it:
+                for entry in it:
+                    if core.is_steamid_folder_name(entry.name) and entry.is_dir():
+                        folders.append((entry.path, entry.stat().st_mtime_ns))
+        except OSError:
+            folders = []
+        folders.sort()
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._scan_folder, path, mtime_ns) for path, mtime_ns in folders]
+            for done, future in enumerate(futures, 1):
+                folder_path, folder_mtime_ns, rows = future.result()
+                results[folder_path] = {'mtime_ns': folder_mtime_ns, 'rows': rows}
+                if progress:
+                    progress(done, len(futures))
+
+        self._folders = results
+        self.rows = [row for path, _ in folders for row in results[path]['rows']]
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except OSError:
+                pass
+        return self.rows
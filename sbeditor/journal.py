@@ -0,0 +1,238 @@
+"""Diário de patches reversíveis: guarda só os bytes trocados, para desfazer/refazer
+
+Cada troca de SteamID grava no diário (<save>.journal.json, ao lado do
+save) os bytes antigos e novos de cada offset alterado, o hash do
+arquivo antes e depois e, quando houver, a renomeação da pasta. Desfazer
+é regravar os bytes antigos no lugar: custa o mesmo que o patch, não uma
+cópia do arquivo inteiro.
+"""
+import hashlib
+import json
+import os
+import time
+
+from . import core, locator, trace
+from .cache import hash_buffer
+from .verify import verify_entry
+
+JOURNAL_SUFFIX = '.journal.json'
+JOURNAL_VERSION = 1
+
+
+def journal_path_for(file_path):
+    """Caminho do diário de um save"""
+    return f"{file_path}{JOURNAL_SUFFIX}"
+
+
+def hash_file(file_path):
+    """Hash do conteúdo do arquivo (mesmo algoritmo do cache de varredura)"""
+    with core.map_save(file_path) as data:
+        return hash_buffer(data)
+
+
+def hash_with_patches(data, patches):
+    """Hash que o buffer terá depois dos patches, sem copiar nem alterar o buffer"""
+    with trace.span('hash', bytes=len(data), patched=True):
+        content_hash = hashlib.blake2b(digest_size=32)
+        view = memoryview(data)
+        pos = 0
+        for offset, _, new_hex in sorted(patches):
+            content_hash.update(view[pos:offset])
+            new_bytes = bytes.fromhex(new_hex)
+            content_hash.update(new_bytes)
+            pos = offset + len(new_bytes)
+        content_hash.update(view[pos:])
+        view.release()
+        return content_hash.hexdigest()
+
+
+class PatchJournal:
+    """Pilha de desfazer/refazer de um save, persistida ao lado do arquivo"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.path = journal_path_for(file_path)
+        self.entries = []
+        self.position = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+            if content.get('version') == JOURNAL_VERSION:
+                self.entries = content['entries']
+                self.position = content['position']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self):
+        """Grava o diário de forma atômica"""
+        content = json.dumps({'version': JOURNAL_VERSION,
+                              'position': self.position,
+                              'entries': self.entries}, indent=1)
+        core.atomic_write(self.path, content.encode('utf-8'))
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.entries)
+
+    def record(self, entry):
+        """Acrescenta um patch aplicado, descartando o que havia para refazer"""
+        del self.entries[self.position:]
+        self.entries.append(entry)
+        self.position = len(self.entries)
+        self.save()
+        return entry
+
+    def set_rename(self, old_folder_name, new_folder_name):
+        """Anota na última entrada a renomeação de pasta que acompanhou o patch"""
+        if self.can_undo:
+            self.entries[self.position - 1]['rename'] = [old_folder_name, new_folder_name]
+            self.save()
+
+    def _apply(self, entry, forward):
+        """Aplica a entrada (ou o inverso), conferindo os bytes antes de gravar"""
+        patches = []
+        for offset, old_hex, new_hex in entry['patches']:
+            old_bytes, new_bytes = bytes.fromhex(old_hex), bytes.fromhex(new_hex)
+            patches.append((offset, old_bytes, new_bytes) if forward else (offset, new_bytes, old_bytes))
+
+        if os.path.getsize(self.file_path) != entry['size']:
+            raise Exception("File size changed since the patch was recorded")
+        with open(self.file_path, 'r+b') as f:
+            pending = []
+            for offset, expected, new_bytes in patches:
+                f.seek(offset)
+                current = f.read(len(expected))
+                if current == expected:
+                    pending.append((offset, expected, new_bytes))
+                elif not (entry.get('incomplete') and current == new_bytes):
+                    # Num patch incompleto, offsets que nunca foram gravados já estão no destino
+                    raise Exception(f"File changed since the patch was recorded (offset 0x{offset:x})")
+            for offset, _, new_bytes in pending:
+                f.seek(offset)
+                f.write(new_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        entry.pop('incomplete', None)
+
+        return self._apply_rename(entry, forward)
+
+    def _apply_rename(self, entry, forward):
+        """Desfaz/refaz a renomeação da pasta; retorna o caminho atual do save"""
+        if not entry.get('rename'):
+            return self.file_path
+        source, target = entry['rename'] if forward else reversed(entry['rename'])
+        folder = os.path.dirname(os.path.abspath(self.file_path))
+        if os.path.basename(folder) != source:
+            return self.file_path
+        success, message, new_folder = core.rename_save_folder(folder, target)
+        if not success:
+            raise Exception(f"Bytes restored but {message}")
+        self.file_path = os.path.join(new_folder, os.path.basename(self.file_path))
+        self.path = journal_path_for(self.file_path)
+        return self.file_path
+
+    def _restore_written(self, entry):
+        """Volta aos bytes antigos, em ordem inversa, os offsets que já têm os bytes novos"""
+        with open(self.file_path, 'r+b') as f:
+            for offset, old_hex, new_hex in reversed(entry['patches']):
+                new_bytes = bytes.fromhex(new_hex)
+                f.seek(offset)
+                if f.read(len(new_bytes)) == new_bytes:
+                    f.seek(offset)
+                    f.write(bytes.fromhex(old_hex))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def discard_last(self):
+        """Retira a última entrada de um patch que falhou, desfazendo o que ele já gravou
+
+        Se nem isso der certo, a entrada fica no diário marcada como
+        incompleta: undo() volta só os offsets que chegaram a ser gravados.
+        """
+        entry = self.entries[self.position - 1]
+        try:
+            self._restore_written(entry)
+        except OSError:
+            entry['incomplete'] = True
+            self.save()
+            raise
+        del self.entries[self.position - 1:]
+        self.position = len(self.entries)
+        self.save()
+
+    def undo(self):
+        """Desfaz o último patch; retorna (entrada, caminho atual do save)"""
+        if not self.can_undo:
+            raise Exception("Nothing to undo")
+        entry = self.entries[self.position - 1]
+        file_path = self._apply(entry, forward=False)
+        self.position -= 1
+        self.save()
+        return entry, file_path
+
+    def redo(self):
+        """Refaz o próximo patch; retorna (entrada, caminho atual do save)"""
+        if not self.can_redo:
+            raise Exception("Nothing to redo")
+        entry = self.entries[self.position]
+        file_path = self._apply(entry, forward=True)
+        self.position += 1
+        self.save()
+        return entry, file_path
+
+
+def replace_steamid_journaled(file_path, old_steamid, new_steamid, encodings=locator.ALL_ENCODINGS,
+                              progress=None, cancel=None, verify=True):
+    """Troca o SteamID no lugar e registra o patch no diário; retorna (trocas, entrada)
+
+    A entrada é gravada no diário antes dos bytes do save, com os dois
+    hashes calculados na mesma leitura mapeada usada para localizar. Com
+    verify, o arquivo gravado é conferido contra a entrada (verify.verify_entry).
+    Se a gravação ou a conferência falhar, o patch é desfeito e a entrada sai
+    do diário.
+    """
+    with core.map_save(file_path) as data:
+        hits = core.find_steamid_offsets(data, old_steamid, encodings, progress, cancel)
+        if not hits:
+            return 0, None
+
+        patches = []
+        for hit in hits:
+            old_bytes = locator.encode_steamid(old_steamid, hit.encoding)
+            new_bytes = locator.encode_steamid(new_steamid, hit.encoding)
+            patches.append([hit.offset, old_bytes.hex(), new_bytes.hex()])
+
+        entry = {
+            'created': time.time(),
+            'old_steamid': int(old_steamid),
+            'new_steamid': int(new_steamid),
+            'size': len(data),
+            'hash_before': hash_buffer(data),
+            'hash_after': hash_with_patches(data, patches),
+            'patches': patches,
+            'rename': None,
+        }
+
+    if cancel is not None and cancel.is_set():
+        raise core.OperationCancelled("Operation cancelled")
+
+    with trace.span('journal', file=file_path, patches=len(patches)):
+        journal = PatchJournal(file_path)
+        journal.record(entry)
+    try:
+        count = core.replace_steamid_in_file(file_path, old_steamid, new_steamid, encodings, hits=hits)
+        if verify:
+            verify_entry(file_path, entry)
+    except Exception:
+        # A falha pode ter vindo no meio da gravação, com parte dos offsets já trocada,
+        # ou da conferência: nos dois casos os bytes gravados voltam ao que eram
+        try:
+            journal.discard_last()
+        except OSError:
+            pass
+        raise
+    return count, entry
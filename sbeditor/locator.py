@@ -0,0 +1,195 @@
+"""Localizador de SteamID em todas as codificações usadas pelo Unreal
+
+Cada codificação é procurada por um literal fixo (o SteamID conhecido, ou
+o prefixo '7656' e o dword alto do SteamID64 na busca genérica), bloco a
+bloco, e as ocorrências são intercaladas por offset.
+"""
+import re
+import struct
+from collections import namedtuple
+
+# Codificações suportadas
+ENCODING_ASCII = 'ascii'            # "7656119..." em texto
+ENCODING_UTF16 = 'utf16'            # FString UTF-16LE ("7\x006\x00...")
+ENCODING_UINT64 = 'uint64'          # SteamID64 binário little-endian
+ENCODING_ACCOUNT_ID = 'account_id'  # ID de conta de 32 bits (SteamID64 - base)
+
+ALL_ENCODINGS = (ENCODING_ASCII, ENCODING_UTF16, ENCODING_UINT64, ENCODING_ACCOUNT_ID)
+# Formas em texto: 17 dígitos com o prefixo 7656, difíceis de aparecer por acaso
+TEXT_ENCODINGS = (ENCODING_ASCII, ENCODING_UTF16)
+# Formas que identificam o dono do save (o ID de conta tem só 4 bytes)
+OWNER_ENCODINGS = (ENCODING_ASCII, ENCODING_UTF16, ENCODING_UINT64)
+
+# SteamID64 de conta individual: universo 1, tipo 1, instância 1
+STEAMID64_BASE = 76561197960265728
+STEAMID64_HIGH_DWORD = struct.pack('<I', STEAMID64_BASE >> 32)
+
+# Maior ocorrência possível (UTF-16: 17 dígitos x 2 bytes)
+MAX_HIT_LENGTH = 34
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+SteamIDHit = namedtuple('SteamIDHit', ['offset', 'encoding', 'steamid'])
+
+# Padrão de cada codificação na busca genérica (ordem = prioridade) e quantos
+# bytes a ocorrência começa antes dele: o uint64 é ancorado no dword alto
+_GENERIC_PATTERNS = (
+    (ENCODING_UINT64, re.escape(STEAMID64_HIGH_DWORD), 4),
+    (ENCODING_UTF16, rb'7\x006\x005\x006\x00(?:[0-9]\x00){13}', 0),
+    (ENCODING_ASCII, rb'7656[0-9]{13}', 0),
+)
+
+_locator_cache = {}
+
+
+def account_id_of(steamid):
+    """Converte SteamID64 no ID de conta de 32 bits"""
+    return int(steamid) - STEAMID64_BASE
+
+
+def steamid_from_account_id(account_id):
+    """Converte ID de conta de 32 bits em SteamID64"""
+    return int(account_id) + STEAMID64_BASE
+
+
+def encode_steamid(steamid, encoding):
+    """Retorna os bytes do SteamID na codificação pedida"""
+    steamid = int(steamid)
+    if encoding == ENCODING_ASCII:
+        return str(steamid).encode('ascii')
+    if encoding == ENCODING_UTF16:
+        return str(steamid).encode('utf-16-le')
+    if encoding == ENCODING_UINT64:
+        return struct.pack('<Q', steamid)
+    if encoding == ENCODING_ACCOUNT_ID:
+        return struct.pack('<I', account_id_of(steamid))
+    raise ValueError(f"Unknown SteamID encoding: {encoding}")
+
+
+def decode_steamid(raw, encoding):
+    """Converte os bytes encontrados de volta em SteamID64"""
+    if encoding == ENCODING_ASCII:
+        return int(raw)
+    if encoding == ENCODING_UTF16:
+        return int(raw.decode('utf-16-le'))
+    if encoding == ENCODING_UINT64:
+        return struct.unpack('<Q', raw)[0]
+    if encoding == ENCODING_ACCOUNT_ID:
+        return steamid_from_account_id(struct.unpack('<I', raw)[0])
+    raise ValueError(f"Unknown SteamID encoding: {encoding}")
+
+
+def owner_steamid(hits, folder_steamid=None):
+    """SteamID dono do save entre as ocorrências (ou None)
+
+    O SteamID da pasta vale se aparecer entre elas; senão, o primeiro em
+    texto (ASCII ou UTF-16). O binário (uint64) só vale sem nenhum em
+    texto: basta o dword alto do SteamID64 para uma ocorrência, e 8 bytes
+    quaisquer com esse formato podem aparecer por acaso nos dados.
+    """
+    if folder_steamid is not None and any(hit.steamid == int(folder_steamid) for hit in hits):
+        return int(folder_steamid)
+    for hit in hits:
+        if hit.encoding in TEXT_ENCODINGS:
+            return hit.steamid
+    return hits[0].steamid if hits else None
+
+
+def build_locator(steamids=None, encodings=ALL_ENCODINGS):
+    """Monta as buscas do localizador: (prioridade, codificação, regex, recuo, SteamID)
+
+    Sem steamids, procura qualquer SteamID nas formas ASCII, UTF-16 e
+    uint64. Com steamids, procura só esses valores, incluindo o ID de
+    conta de 32 bits (que não é reconhecível sem saber o valor). Cada
+    busca começa por um literal fixo, que o motor de regex encontra com
+    uma varredura rápida; uma alternativa única com todas as codificações
+    (e o '.{4}' do uint64 na frente) testaria cada ramo em cada byte.
+    """
+    key = (tuple(sorted(int(s) for s in steamids)) if steamids else None, tuple(encodings))
+    searches = _locator_cache.get(key)
+    if searches is not None:
+        return searches
+
+    # Ordem importa: o uint64 vem antes do ID de conta, que é seu prefixo
+    searches = []
+    if steamids:
+        for encoding in ALL_ENCODINGS:
+            if encoding in encodings:
+                for steamid in key[0]:
+                    pattern = re.compile(re.escape(encode_steamid(steamid, encoding)))
+                    searches.append((len(searches), encoding, pattern, 0, steamid))
+    else:
+        for encoding, pattern, lead in _GENERIC_PATTERNS:
+            if encoding in encodings:
+                searches.append((len(searches), encoding, re.compile(pattern), lead, None))
+
+    if not searches:
+        raise ValueError("No SteamID encodings selected")
+
+    _locator_cache[key] = searches
+    return searches
+
+
+def _window_candidates(data, searches, start, stop, end):
+    """Ocorrências de cada busca que começam em [start, stop), inclusive sobrepostas
+
+    Retorna (início, prioridade, codificação, fim, SteamID ou None) ordenados
+    por início e prioridade.
+    """
+    limit = min(stop + MAX_HIT_LENGTH - 1, end)
+    candidates = []
+    for priority, encoding, pattern, lead, steamid in searches:
+        position = start + lead
+        while True:
+            match = pattern.search(data, position, limit)
+            if match is None or match.start() - lead >= stop:
+                break
+            candidates.append((match.start() - lead, priority, encoding, match.end(), steamid))
+            position = match.start() + 1
+    candidates.sort(key=lambda candidate: candidate[:2])
+    return candidates
+
+
+def _iter_hits(data, searches, start, end, chunk_size, progress=None, check_cancel=None):
+    """Escolhe as ocorrências como o finditer de uma alternativa única faria
+
+    Mais à esquerda primeiro; na mesma posição vence a codificação de
+    menor prioridade; uma ocorrência nunca sobrepõe a anterior. Os blocos
+    limitam quanto é varrido antes da primeira ocorrência ser gerada.
+    """
+    last_end = start
+    for chunk_start in range(start, end, chunk_size):
+        if check_cancel:
+            check_cancel()
+        stop = min(chunk_start + chunk_size, end)
+        for offset, _, encoding, hit_end, steamid in _window_candidates(data, searches, chunk_start, stop, end):
+            if offset < last_end:
+                continue
+            if steamid is None:
+                steamid = decode_steamid(bytes(data[offset:hit_end]), encoding)
+            yield SteamIDHit(offset, encoding, steamid)
+            last_end = hit_end
+        if progress:
+            progress(stop, end)
+
+
+def iter_steamids(data, steamids=None, encodings=ALL_ENCODINGS, start=0, end=None):
+    """Gera SteamIDHit para cada ocorrência no buffer, em ordem de offset"""
+    searches = build_locator(steamids, encodings)
+    end = len(data) if end is None else end
+    return _iter_hits(data, searches, start, end, DEFAULT_CHUNK_SIZE)
+
+
+def locate_steamids(data, steamids=None, encodings=ALL_ENCODINGS, start=0, end=None):
+    """Lista todas as ocorrências de SteamID no buffer"""
+    return list(iter_steamids(data, steamids, encodings, start, end))
+
+
+def locate_steamids_chunked(data, steamids=None, encodings=ALL_ENCODINGS,
+                            chunk_size=DEFAULT_CHUNK_SIZE, progress=None, check_cancel=None):
+    """Como locate_steamids, mas informando progresso e permitindo cancelar
+
+    progress(feito, total) é chamado a cada bloco; check_cancel() é
+    chamado entre blocos e deve lançar exceção para interromper.
+    """
+    searches = build_locator(steamids, encodings)
+    return list(_iter_hits(data, searches, 0, len(data), chunk_size, progress, check_cancel))
@@ -0,0 +1,100 @@
+"""Migração de um save: backup opcional, troca de SteamID registrada no diário e renomeação da pasta"""
+import os
+
+from . import core, trace
+from .journal import replace_steamid_journaled
+from .transaction import STATE_PATCHING, Transaction
+
+
+def patch_save(file_path, old_steamid, new_steamid, backup=False, store=None, journal=True,
+               in_place=True, progress=None, cancel=None, verify=True):
+    """Faz o backup pedido e troca o SteamID no arquivo; retorna o resultado parcial
+
+    O diário de patches (journal) é o backup padrão: guarda só os bytes
+    trocados e permite desfazer. backup=True acrescenta a cópia completa
+    .bak, ou um snapshot deduplicado quando há store (BackupStore).
+    verify confere o arquivo gravado contra o diário (só com journal e in_place).
+    """
+    result = {
+        'file': file_path,
+        'old_steamid': int(old_steamid),
+        'new_steamid': int(new_steamid),
+        'backup': None,
+        'backup_strategy': None,
+        'snapshot': None,
+        'journaled': False,
+        'replacements': 0,
+    }
+
+    if backup and store is not None:
+        result['snapshot'] = store.snapshot(file_path, note=f"before {old_steamid} -> {new_steamid}",
+                                            cancel=cancel, steamid=old_steamid)['id']
+    elif backup:
+        result['backup'], result['backup_strategy'] = core.backup_file(file_path, cancel=cancel)
+
+    if journal and in_place:
+        result['replacements'], entry = replace_steamid_journaled(file_path, old_steamid, new_steamid,
+                                                                  progress=progress, cancel=cancel,
+                                                                  verify=verify)
+        result['journaled'] = entry is not None
+    else:
+        result['replacements'] = core.replace_steamid_in_file(file_path, old_steamid, new_steamid,
+                                                              in_place=in_place,
+                                                              progress=progress, cancel=cancel)
+    return result
+
+
+def migrate_save(file_path, new_steamid, old_steamid=None, rename=True, backup=False, in_place=True,
+                 store=None, journal=True, progress=None, cancel=None, verify=True):
+    """Troca o SteamID no arquivo (com diário e backup opcional) e renomeia a pasta
+
+    Tudo corre dentro de uma transação: se a renomeação falhar depois do
+    patch, o patch é desfeito; se o processo morrer no meio, a próxima
+    execução completa ou desfaz a migração (transaction.recover).
+    """
+    with trace.span('migrate', file=file_path, size=os.path.getsize(file_path)):
+        return _migrate_save(file_path, new_steamid, old_steamid, rename, backup, in_place,
+                             store, journal, progress, cancel, verify)
+
+
+def _migrate_save(file_path, new_steamid, old_steamid, rename, backup, in_place, store, journal,
+                  progress, cancel, verify):
+    new_steamid = core.parse_steamid(new_steamid)
+    if old_steamid is None:
+        old_steamid = core.scan_file(file_path)
+    if not old_steamid:
+        raise Exception("Current SteamID not found in file!")
+
+    folder = core.steamid_folder_of(file_path)
+    transaction = Transaction.begin([file_path], old_steamid, new_steamid, folder=folder,
+                                    rename=rename, backup=backup, store=store,
+                                    journal=journal and in_place)
+    try:
+        transaction.set_state(STATE_PATCHING)
+        result = patch_save(file_path, old_steamid, new_steamid, backup=backup, store=store,
+                            journal=journal, in_place=in_place, progress=progress, cancel=cancel,
+                            verify=verify)
+        result['renamed'] = False
+        result['folder_message'] = ''
+        if result['replacements'] == 0:
+            raise Exception("Failed to find SteamID in file for replacement!")
+
+        if rename and folder:
+            success, message, new_folder = transaction.rename_folder()
+            if not success:
+                raise Exception(f"{message} (SteamID change rolled back)")
+            result['renamed'] = new_folder != folder
+            result['folder_message'] = message
+            if result['renamed']:
+                result['file'] = os.path.join(new_folder, os.path.basename(file_path))
+                if result['backup']:
+                    result['backup'] = os.path.join(new_folder, os.path.basename(result['backup']))
+    except BaseException as e:
+        try:
+            transaction.roll_back()
+        except Exception as rollback_error:
+            # O registro fica no log e a próxima execução tenta de novo
+            raise Exception(f"{e}; rollback failed: {rollback_error}") from e
+        raise
+    transaction.commit()
+    return result
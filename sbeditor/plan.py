@@ -0,0 +1,239 @@
+"""Planos de migração: a varredura gera um plano serializável, aplicado depois (em outra máquina, se preciso)
+
+O plano guarda, para cada save, o tamanho, o hash do conteúdo, os
+patches no mesmo formato do diário (offset, bytes antigos, bytes novos)
+e o hash esperado depois deles, e para cada pasta de SteamID a
+renomeação. Os caminhos são relativos à pasta SaveGames, então o plano
+pode ser aplicado noutra raiz. Aplicar não varre nada: confere o hash de
+cada save (uma leitura sequencial), grava e confere os bytes e renomeia a pasta,
+dentro de uma transação por pasta, como no lote. Planos terminados em
+.gz são gravados comprimidos.
+"""
+import gzip
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, locator, trace
+from .batch import collect_saves
+from .cache import hash_buffer
+from .journal import PatchJournal, hash_file, hash_with_patches
+from .transaction import STATE_PATCHING, Transaction, rewrite_patches
+from .verify import verify_entry
+
+PLAN_VERSION = 1
+DEFAULT_WORKERS = 4
+
+
+def plan_file(file_path, new_steamid, fallback_steamid=None):
+    """Varre um save e devolve sua parte do plano (patches vazios se nada muda)"""
+    with trace.span('plan', file=file_path) as info, core.map_save(file_path) as data:
+        info['bytes'] = len(data)
+        old_steamid = core.find_steamid(data, fallback_steamid) or fallback_steamid
+        if not old_steamid:
+            raise Exception(f"Current SteamID not found in file: {file_path}")
+        patches = []
+        if int(old_steamid) != int(new_steamid):
+            for hit in core.find_steamid_offsets(data, old_steamid):
+                patches.append([hit.offset,
+                                locator.encode_steamid(old_steamid, hit.encoding).hex(),
+                                locator.encode_steamid(new_steamid, hit.encoding).hex()])
+        content_hash = hash_buffer(data)
+        return {
+            'name': os.path.basename(file_path),
+            'size': len(data),
+            'hash': content_hash,
+            'hash_after': hash_with_patches(data, patches) if patches else content_hash,
+            'old_steamid': int(old_steamid),
+            'new_steamid': int(new_steamid),
+            'patches': patches,
+        }
+
+
+def make_plan(save_root, targets, rename=True, workers=DEFAULT_WORKERS, progress=None):
+    """Plano para migrar as pastas de SteamID de save_root conforme targets
+
+    targets mapeia o nome da pasta antiga (str) para o novo SteamID (int),
+    como em batch.migrate_tree. Os saves são varridos em paralelo.
+    progress(feito, total) é chamado a cada save.
+    """
+    folders = collect_saves(save_root, targets)
+    jobs = [(folder, sav_file) for folder, sav_files in folders for sav_file in sav_files]
+    done = []
+
+    def plan_job(job):
+        folder, sav_file = job
+        name = os.path.basename(folder)
+        entry = plan_file(sav_file, targets[name], int(name))
+        done.append(sav_file)
+        if progress:
+            progress(len(done), len(jobs))
+        return entry
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        entries = dict(zip(jobs, executor.map(plan_job, jobs)))
+
+    return {
+        'version': PLAN_VERSION,
+        'created': time.time(),
+        'machine': platform.node(),
+        'root': os.path.abspath(save_root),
+        'folders': [{
+            'name': os.path.basename(folder),
+            'new_steamid': targets[os.path.basename(folder)],
+            'rename': rename and os.path.basename(folder) != str(targets[os.path.basename(folder)]),
+            'files': [entries[(folder, sav_file)] for sav_file in sav_files],
+        } for folder, sav_files in folders],
+    }
+
+
+def save_plan(plan, path):
+    """Grava o plano em JSON (comprimido com gzip se o nome terminar em .gz)"""
+    content = json.dumps(plan, separators=(',', ':')).encode('utf-8')
+    if path.lower().endswith('.gz'):
+        content = gzip.compress(content)
+    core.atomic_write(path, content)
+    return path
+
+
+def load_plan(path):
+    """Lê um plano gravado por save_plan"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+    plan = json.loads(content)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unknown plan version in {path}")
+    return plan
+
+
+def plan_summary(plan):
+    """Totais do plano: pastas, saves, saves com patches, offsets e renomeações"""
+    files = [f for folder in plan['folders'] for f in folder['files']]
+    return {
+        'folders': len(plan['folders']),
+        'files': len(files),
+        'changed_files': sum(1 for f in files if f['patches']),
+        'patches': sum(len(f['patches']) for f in files),
+        'renames': sum(1 for folder in plan['folders'] if folder['rename']),
+    }
+
+
+def _check_file(file_path, entry):
+    """Estado do save em relação ao plano: (já aplicado, motivo para recusar ou None)"""
+    try:
+        if os.path.getsize(file_path) != entry['size']:
+            return False, "size changed since the plan was made"
+        current = hash_file(file_path)
+    except OSError as e:
+        return False, str(e)
+    if current == entry['hash_after'] and entry['patches']:
+        return True, None
+    if current != entry['hash']:
+        return False, "content changed since the plan was made"
+    return False, None
+
+
+def apply_folder(save_root, folder_plan):
+    """Aplica a parte do plano de uma pasta numa transação; retorna o resultado da pasta"""
+    folder = os.path.join(save_root, folder_plan['name'])
+    files = folder_plan['files']
+    result = {
+        'folder': folder,
+        'new_steamid': folder_plan['new_steamid'],
+        'files': [{'file': os.path.join(folder, f['name']), 'old_steamid': f['old_steamid'],
+                   'replacements': 0, 'skipped': False, 'error': None} for f in files],
+        'renamed': False,
+        'message': '',
+    }
+    new_folder = os.path.join(save_root, str(folder_plan['new_steamid']))
+    if folder_plan['rename'] and not os.path.exists(folder) and os.path.isdir(new_folder):
+        result['message'] = "Already applied (folder already renamed)"
+        return result
+
+    with trace.span('apply', folder=folder, files=len(files)) as info:
+        # Todos os hashes conferem antes de qualquer gravação
+        problems = 0
+        for file_result, entry in zip(result['files'], files):
+            file_result['skipped'], file_result['error'] = _check_file(file_result['file'], entry)
+            problems += file_result['error'] is not None
+        info['bytes'] = sum(f['size'] for f in files)
+        if problems:
+            result['message'] = f"Skipped: {problems} save(s) differ from the plan"
+            return result
+
+        # Saves que já estão com o ID novo (apply anterior interrompido) ficam como estão
+        patched = [(r, e) for r, e in zip(result['files'], files) if e['patches']]
+        changed = [(r, e) for r, e in patched if not r['skipped']]
+        if not changed and not folder_plan['rename']:
+            result['message'] = "Already applied" if patched else "Nothing to do"
+            return result
+
+        old_steamid = patched[0][1]['old_steamid'] if patched else int(folder_plan['name'])
+        try:
+            transaction = Transaction.begin([r['file'] for r in result['files']], old_steamid,
+                                            folder_plan['new_steamid'], folder=folder,
+                                            rename=folder_plan['rename'], journal=True)
+        except Exception as e:
+            result['message'] = str(e)
+            for file_result in result['files']:
+                file_result['error'] = result['message']
+            return result
+        try:
+            transaction.set_state(STATE_PATCHING)
+            for file_result, entry in changed:
+                PatchJournal(file_result['file']).record({
+                    'created': time.time(),
+                    'old_steamid': entry['old_steamid'],
+                    'new_steamid': entry['new_steamid'],
+                    'size': entry['size'],
+                    'hash_before': entry['hash'],
+                    'hash_after': entry['hash_after'],
+                    'patches': entry['patches'],
+                    'rename': None,
+                })
+                rewrite_patches(file_result['file'], entry['patches'], forward=True)
+                verify_entry(file_result['file'], entry)
+                file_result['replacements'] = len(entry['patches'])
+            success, message, new_folder = transaction.rename_folder()
+            if not success:
+                raise Exception(message)
+        except Exception as e:
+            try:
+                transaction.roll_back()
+                result['message'] = f"Rolled back: {e}"
+            except Exception as rollback_error:
+                result['message'] = f"{e}; rollback failed (retried on next run): {rollback_error}"
+            for file_result in result['files']:
+                file_result['replacements'] = 0
+                file_result['error'] = file_result['error'] or result['message']
+            return result
+        transaction.commit()
+
+    result['message'] = message
+    result['renamed'] = new_folder != folder
+    if result['renamed']:
+        for file_result in result['files']:
+            file_result['file'] = os.path.join(new_folder, os.path.basename(file_result['file']))
+    return result
+
+
+def apply_plans(plans, save_root=None, workers=DEFAULT_WORKERS, progress=None):
+    """Aplica vários planos, uma pasta por thread; retorna os resultados por pasta
+
+    save_root substitui a pasta SaveGames gravada no plano.
+    progress(resultado da pasta) é chamado a cada pasta concluída.
+    """
+    jobs = [(save_root or plan['root'], folder_plan) for plan in plans for folder_plan in plan['folders']]
+
+    def apply_job(job):
+        folder_result = apply_folder(*job)
+        if progress:
+            progress(folder_result)
+        return folder_result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(apply_job, jobs))
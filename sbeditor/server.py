@@ -0,0 +1,217 @@
+"""Serviço HTTP/JSON local: scan, patch, clone e restore sem abrir um processo por save
+
+Cada operação é um POST em /<operação> com um objeto JSON; a resposta é
+JSON ({'error': ...} em caso de falha). O processo mantém entre as
+requisições o cache de varredura e um pool de threads já criado. Pedidos
+que tocam o mesmo save são serializados por um lock por save (a pasta de
+SteamID inteira quando o save está numa, já que o patch pode renomeá-la;
+o patch com rename segura também a pasta do novo SteamID, para que pedidos
+que já usem o caminho novo esperem a renomeação terminar).
+Nenhuma operação espera pelo pool de varredura segurando locks de save:
+as tarefas do pool pegam esses locks, e o pool poderia estar todo ocupado
+esperando por eles. As cópias do clone usam um pool próprio.
+Por padrão o servidor só escuta em 127.0.0.1.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import clone, core, locator, trace
+from .backup_store import BackupStore
+from .cache import scan_file_cached
+from .migrate import migrate_save
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+MAX_REQUEST_BYTES = 1024 * 1024
+
+
+class RequestError(ValueError):
+    """Pedido inválido (resposta 400)"""
+
+
+def _required(params, name):
+    value = params.get(name)
+    if value in (None, '', []):
+        raise RequestError(f"'{name}' is required")
+    return value
+
+
+def _hit_dict(hit):
+    return {'offset': hit.offset, 'encoding': hit.encoding, 'steamid': hit.steamid}
+
+
+class EditorService:
+    """Operações do serviço, com cache, pool de threads e locks por save compartilhados"""
+
+    def __init__(self, cache=None, workers=DEFAULT_WORKERS):
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sbeditor-worker')
+        # Tarefas sem lock de save: podem ser esperadas por quem segura os locks
+        self.copy_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sbeditor-copy')
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def lock_key(self, file_path):
+        """Chave do lock de um save: a pasta de SteamID, ou o próprio arquivo"""
+        path = core.steamid_folder_of(file_path) or os.path.abspath(file_path)
+        return os.path.normcase(os.path.realpath(path))
+
+    @contextmanager
+    def locked(self, *paths):
+        """Segura os locks dos saves (em ordem fixa, para não haver deadlock)"""
+        keys = sorted({self.lock_key(path) for path in paths})
+        with self._locks_guard:
+            locks = [self._locks.setdefault(key, threading.Lock()) for key in keys]
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+
+    def scan(self, params):
+        paths = _required(params, 'paths')
+        paths = [paths] if isinstance(paths, str) else paths
+
+        def scan_one(path):
+            try:
+                with self.locked(path):
+                    hits, content_hash, from_cache = scan_file_cached(path, self.cache)
+            except OSError as e:
+                return {'file': path, 'error': str(e)}
+            return {'file': path, 'steamid': locator.owner_steamid(hits, core.folder_steamid_of(path)),
+                    'hash': content_hash,
+                    'from_cache': from_cache,
+                    'hits': [_hit_dict(hit) for hit in hits] if params.get('all') else None}
+
+        results = list(self.pool.map(scan_one, paths))
+        if self.cache is not None:
+            self.cache.save()
+        return {'results': results}
+
+    def patch(self, params):
+        file_path = _required(params, 'file')
+        new_steamid = core.parse_steamid(_required(params, 'new'))
+        old_steamid = core.parse_steamid(params['old']) if params.get('old') else None
+        rename = params.get('rename', True)
+        paths = [file_path]
+        if rename and core.steamid_folder_of(file_path):
+            # A pasta pode virar a do novo SteamID: trava os dois caminhos
+            paths.append(clone.clone_target_path(file_path, new_steamid))
+        with self.locked(*paths):
+            result = migrate_save(file_path, new_steamid, old_steamid=old_steamid,
+                                  rename=rename,
+                                  backup=params.get('backup', False),
+                                  in_place=not params.get('full_write', False),
+                                  journal=params.get('journal', True))
+            if self.cache is not None:
+                self.cache.invalidate(file_path)
+        return result
+
+    def clone(self, params):
+        file_path = _required(params, 'file')
+        steamids = [core.parse_steamid(s) for s in _required(params, 'to')]
+        source_steamid = core.parse_steamid(params['old']) if params.get('old') else None
+        targets = [clone.clone_target_path(file_path, s, params.get('root')) for s in steamids]
+        with self.locked(file_path, *targets):
+            results = clone.clone_save(file_path, steamids, save_root=params.get('root'),
+                                       source_steamid=source_steamid,
+                                       overwrite=params.get('overwrite', False),
+                                       executor=self.copy_pool)
+        return {'results': results}
+
+    def restore(self, params):
+        file_path = _required(params, 'file')
+        with self.locked(file_path):
+            if params.get('snapshot') is not None:
+                store = BackupStore(params.get('store_dir'))
+                snapshot = store.restore(file_path, params['snapshot'] or None)
+                result = {'file': file_path, 'snapshot': snapshot['id'], 'backup': None}
+            else:
+                backup_path = core.restore_backup(file_path, params.get('backup'))
+                result = {'file': file_path, 'snapshot': None, 'backup': backup_path}
+            if self.cache is not None:
+                self.cache.invalidate(file_path)
+        return result
+
+    def dispatch(self, operation, params):
+        """Executa a operação pedida; RequestError se não existir"""
+        handler = {'scan': self.scan, 'patch': self.patch, 'clone': self.clone,
+                   'restore': self.restore}.get(operation)
+        if handler is None:
+            raise RequestError(f"Unknown operation: {operation}")
+        with trace.span(f"rpc {operation}"):
+            return handler(params)
+
+    def close(self):
+        self.pool.shutdown()
+        self.copy_pool.shutdown()
+        if self.cache is not None:
+            self.cache.save()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'sbeditor'
+
+    def _reply(self, status, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            self._reply(200, {'status': 'ok'})
+        else:
+            self._reply(404, {'error': f"Not found: {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_REQUEST_BYTES:
+                raise RequestError("Request too large")
+            params = json.loads(self.rfile.read(length) or b'{}') if length else {}
+            if not isinstance(params, dict):
+                raise RequestError("Request body must be a JSON object")
+            result = self.server.service.dispatch(self.path.strip('/'), params)
+        except ValueError as e:
+            # Pedido inválido, JSON malformado ou SteamID com formato errado
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            self._reply(500, {'error': str(e)})
+        else:
+            self._reply(200, result)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class EditorServer(ThreadingHTTPServer):
+    """Servidor HTTP (uma thread por conexão) ligado a um EditorService"""
+
+    daemon_threads = True
+
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+        self.service = service
+        self.verbose = verbose
+        super().__init__((host, port), _Handler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache=None, workers=DEFAULT_WORKERS, verbose=False,
+          ready=None):
+    """Atende até KeyboardInterrupt; ready(servidor) é chamado quando a porta está aberta"""
+    service = EditorService(cache, workers)
+    server = EditorServer(service, host, port, verbose)
+    try:
+        if ready:
+            ready(server)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,154 @@
+"""Gerador de saves sintéticos no formato GVAS, para medir desempenho
+
+O arquivo gerado tem um cabeçalho GVAS válido e uma lista de propriedades
+que o leitor de gvas.py entende: um OwnerSteamID no início e, depois,
+registros (StructProperty) com um SteamID plantado e um bloco de dados
+de enchimento. A densidade define quantos SteamIDs são plantados por MiB,
+alternando entre as codificações pedidas. A saída é gravada em fluxo, então
+arquivos de vários GB não precisam caber na memória.
+"""
+import random
+import struct
+
+from . import locator
+
+MIB = 1024 * 1024
+DEFAULT_STEAMID = 76561198000000001
+DEFAULT_DENSITY = 4.0
+PLANT_ENCODINGS = (locator.ENCODING_ASCII, locator.ENCODING_UTF16, locator.ENCODING_UINT64)
+
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': MIB, 'G': 1024 * MIB}
+
+
+def parse_size(text):
+    """Converte '512K', '64M', '2G' (ou um número de bytes) em bytes"""
+    text = str(text).strip().upper().rstrip('B').rstrip('I')
+    unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+    try:
+        value = float(text[:len(text) - len(unit)])
+    except ValueError:
+        raise ValueError(f"Invalid size: {text}")
+    if value <= 0:
+        raise ValueError(f"Invalid size: {text}")
+    return int(value * _SIZE_UNITS[unit])
+
+
+def format_size(size):
+    """Formata um tamanho em bytes como '64M', '2G'..."""
+    for unit in ('G', 'M', 'K'):
+        if size >= _SIZE_UNITS[unit] and size % _SIZE_UNITS[unit] == 0:
+            return f"{size // _SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def _fstring(text, wide=False):
+    if not text:
+        return struct.pack('<i', 0)
+    if wide:
+        raw = (text + '\0').encode('utf-16-le')
+        return struct.pack('<i', -(len(raw) // 2)) + raw
+    raw = (text + '\0').encode('latin-1')
+    return struct.pack('<i', len(raw)) + raw
+
+
+def _property(name, type_name, value, extra=b''):
+    return _fstring(name) + _fstring(type_name) + struct.pack('<q', len(value)) + extra + b'\0' + value
+
+
+def _header():
+    custom_versions = b''.join(bytes([i]) * 16 + struct.pack('<i', i) for i in range(1, 5))
+    return (b'GVAS' + struct.pack('<ii', 2, 522) + struct.pack('<HHHI', 4, 26, 2, 0)
+            + _fstring('++UE4+Release-4.26') + struct.pack('<ii', 3, 4) + custom_versions
+            + _fstring('/Script/SB.SBSaveGame'))
+
+
+def _steamid_property(steamid, encoding):
+    if encoding == locator.ENCODING_ASCII:
+        return _property('UserSteamId', 'StrProperty', _fstring(str(steamid)))
+    if encoding == locator.ENCODING_UTF16:
+        return _property('NetUniqueId', 'StrProperty', _fstring(str(steamid), wide=True))
+    if encoding == locator.ENCODING_UINT64:
+        return _property('PlatformUserId', 'UInt64Property', struct.pack('<Q', int(steamid)))
+    if encoding == locator.ENCODING_ACCOUNT_ID:
+        return _property('AccountId', 'UInt32Property', struct.pack('<I', locator.account_id_of(steamid)))
+    raise ValueError(f"Unknown SteamID encoding: {encoding}")
+
+
+def _write_record(f, name, inner, payload_length, filler, start):
+    """Grava um registro (StructProperty) com o SteamID e um Payload de bytes em fluxo"""
+    payload_header = (_fstring('Payload') + _fstring('ArrayProperty')
+                      + struct.pack('<q', 4 + payload_length) + _fstring('ByteProperty') + b'\0'
+                      + struct.pack('<i', payload_length))
+    terminator = _fstring('None')
+    size = len(inner) + len(payload_header) + payload_length + len(terminator)
+    head = (_fstring(name) + _fstring('StructProperty') + struct.pack('<q', size)
+            + _fstring('SaveRecord') + b'\0' * 16 + b'\0')
+    f.write(head + inner + payload_header)
+    window = len(filler) // 2
+    remaining = payload_length
+    while remaining:
+        length = min(remaining, window)
+        f.write(filler[start:start + length])
+        remaining -= length
+    f.write(terminator)
+    return len(head) + size
+
+
+class _NullWriter:
+    """Arquivo falso que descarta os bytes (para medir o cabeçalho de um registro)"""
+
+    def write(self, data):
+        return len(data)
+
+
+def _record_overhead(name, inner):
+    """Bytes do registro além do Payload"""
+    return _write_record(_NullWriter(), name, inner, 0, b'', 0)
+
+
+def _make_filler(seed, length):
+    """Bytes pseudoaleatórios sem nada que pareça um SteamID (sem o dword alto do uint64)"""
+    block = random.Random(seed).randbytes(length)
+    return block.replace(locator.STEAMID64_HIGH_DWORD, b'\0' + locator.STEAMID64_HIGH_DWORD[1:])
+
+
+def generate_save(path, size, steamid=DEFAULT_STEAMID, density=DEFAULT_DENSITY,
+                  encodings=PLANT_ENCODINGS, seed=0, progress=None):
+    """Grava um save sintético de aproximadamente size bytes; retorna {encoding: ocorrências}
+
+    density é o número de SteamIDs plantados por MiB (0 deixa só o
+    OwnerSteamID do início). O conteúdo depende apenas dos parâmetros.
+    """
+    if not encodings:
+        raise ValueError("No SteamID encodings selected")
+    record_size = int(MIB / density) if density > 0 else MIB
+    record_size = max(record_size, 256)
+    filler = _make_filler(seed, 2 * MIB)
+    window = len(filler) // 2
+
+    planted = {encoding: 0 for encoding in encodings}
+    written = 0
+    with open(path, 'wb') as f:
+        head = _header() + _property('OwnerSteamID', 'StrProperty', _fstring(str(steamid)))
+        f.write(head)
+        written += len(head)
+        planted[locator.ENCODING_ASCII] = planted.get(locator.ENCODING_ASCII, 0) + 1
+
+        tail = _fstring('None') + b'\0' * 4
+        number = 0
+        while True:
+            encoding = encodings[number % len(encodings)]
+            inner = _steamid_property(steamid, encoding) if density > 0 else b''
+            name = f"Record_{number}"
+            overhead = _record_overhead(name, inner)
+            length = min(record_size, size - written - len(tail)) - overhead
+            if length < 0:
+                break
+            written += _write_record(f, name, inner, length, filler, (number * 7919) % window)
+            if density > 0:
+                planted[encoding] += 1
+            number += 1
+            if progress:
+                progress(written, size)
+        f.write(tail)
+    return planted
@@ -0,0 +1,173 @@
+"""Medição por etapa (spans): tempo de parede, tempo de CPU, bytes e tamanho dos arquivos
+
+Cada etapa do motor (varredura, hash, backup, patch, renomeação...) roda
+dentro de um span. Os spans concluídos ficam num buffer circular em
+memória, de onde o painel de diagnóstico da interface os lê, e podem ser
+exportados em JSON lines ou no formato de trace do Chrome
+(chrome://tracing, Perfetto) com a opção --profile.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MAX_SPANS = 10000
+
+
+class Tracer:
+    """Coleta spans de todas as threads do processo"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.spans = deque(maxlen=max_spans)
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, **args):
+        """Mede o bloco; devolve o dicionário args para o chamador anotar bytes, contagens etc."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        record = {
+            'name': name,
+            'start': time.perf_counter() - self.origin,
+            'wall': None,
+            'cpu': None,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'depth': len(stack),
+            'args': args,
+            'error': None,
+        }
+        stack.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield args
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record['cpu'] = time.thread_time() - cpu_start
+            record['wall'] = time.perf_counter() - wall_start
+            stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    def snapshot(self):
+        """Cópia dos spans concluídos, em ordem de início"""
+        with self._lock:
+            spans = list(self.spans)
+        return sorted(spans, key=lambda s: (s['pid'], s['start']))
+
+    def drain(self):
+        """Retira e devolve os spans concluídos (para enviar de um processo filho ao pai)"""
+        with self._lock:
+            spans = list(self.spans)
+            self.spans.clear()
+        for span in spans:
+            span['start'] += self.origin_wall
+        return spans
+
+    def extend(self, spans):
+        """Acrescenta spans vindos de outro processo (com início em tempo absoluto)"""
+        with self._lock:
+            for span in spans:
+                span = dict(span, start=span['start'] - self.origin_wall)
+                self.spans.append(span)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Tracer do processo"""
+    return _tracer
+
+
+def span(name, **args):
+    """Span no tracer do processo: with trace.span('scan', file=path) as info: ..."""
+    return _tracer.span(name, **args)
+
+
+def throughput(record):
+    """MB/s do span, se ele informou bytes processados"""
+    size = record['args'].get('bytes')
+    if not size or not record['wall']:
+        return None
+    return size / (1024 * 1024) / record['wall']
+
+
+def summarize(spans):
+    """Totais por nome de etapa: número de spans, tempo de parede, CPU e bytes"""
+    totals = {}
+    for record in spans:
+        total = totals.setdefault(record['name'], {'name': record['name'], 'count': 0,
+                                                   'wall': 0.0, 'cpu': 0.0, 'bytes': 0})
+        total['count'] += 1
+        total['wall'] += record['wall']
+        total['cpu'] += record['cpu']
+        total['bytes'] += record['args'].get('bytes') or 0
+    return sorted(totals.values(), key=lambda t: t['wall'], reverse=True)
+
+
+def _json_args(args):
+    return {key: value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+            for key, value in args.items()}
+
+
+def export_jsonl(path, spans=None, tracer=None):
+    """Um span por linha, com tempos em segundos e início relativo ao começo do processo"""
+    tracer = tracer or _tracer
+    spans = tracer.snapshot() if spans is None else spans
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in spans:
+            line = dict(record, args=_json_args(record['args']), mb_s=throughput(record))
+            f.write(json.dumps(line) + '\n')
+    return len(spans)
+
+
+def export_chrome(path, spans=None, tracer=None):
+    """Trace no formato de eventos do Chrome (eventos completos 'X', tempos em µs)"""
+    tracer = tracer or _tracer
+    spans = tracer.snapshot() if spans is None else spans
+    events = []
+    threads = {}
+    for record in spans:
+        args = _json_args(record['args'])
+        args['cpu_ms'] = round(record['cpu'] * 1000, 3)
+        if record['error']:
+            args['error'] = record['error']
+        events.append({
+            'name': record['name'],
+            'cat': 'sbeditor',
+            'ph': 'X',
+            'ts': round(record['start'] * 1e6, 1),
+            'dur': round(record['wall'] * 1e6, 1),
+            'pid': record['pid'],
+            'tid': record['tid'],
+            'args': args,
+        })
+        threads[(record['pid'], record['tid'])] = record['thread']
+    for (pid, tid), name in threads.items():
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                   'otherData': {'started': tracer.origin_wall}}, f)
+    return len(spans)
+
+
+def export(path, spans=None, tracer=None):
+    """Exporta conforme a extensão: .jsonl em JSON lines, qualquer outra como trace do Chrome"""
+    if path.lower().endswith('.jsonl'):
+        return export_jsonl(path, spans, tracer)
+    return export_chrome(path, spans, tracer)
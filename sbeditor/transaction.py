@@ -0,0 +1,340 @@
+"""Log de transações (write-ahead) para migrações: backup, patch e renomeação da pasta
+
+Antes de tocar nos saves, a migração grava um registro com a intenção
+(arquivos, SteamID antigo e novo, pasta de destino) e avança o estado a
+cada etapa: 'begun' -> 'patching' -> 'renaming'. O registro só é apagado
+quando tudo terminou. Se o processo morrer no meio, recover() encontra o
+registro na próxima execução e completa a migração (roll forward) ou, se
+não for possível, desfaz o que foi gravado (roll back) usando o diário de
+patches e, na falta dele, o backup.
+"""
+import json
+import os
+import time
+import uuid
+
+from . import core, trace
+from .backup_store import BackupStore
+from .journal import PatchJournal, hash_file, replace_steamid_journaled
+
+TRANSACTION_VERSION = 1
+TRANSACTION_SUFFIX = '.json'
+
+STATE_BEGUN = 'begun'
+STATE_PATCHING = 'patching'
+STATE_RENAMING = 'renaming'
+
+
+def default_transaction_dir():
+    """Pasta do log de transações (SBEDITOR_TRANSACTION_DIR, LOCALAPPDATA ou ~/.local/share)"""
+    if os.getenv('SBEDITOR_TRANSACTION_DIR'):
+        return os.getenv('SBEDITOR_TRANSACTION_DIR')
+    if os.getenv('LOCALAPPDATA'):
+        return os.path.join(os.getenv('LOCALAPPDATA'), 'SBSteamIDEditor', 'transactions')
+    base = os.getenv('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'sbeditor', 'transactions')
+
+
+def _process_alive(pid):
+    """Indica se o processo dono da transação ainda está rodando"""
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _journal_entry(file_path, record, old_steamid, new_steamid):
+    """Entrada do diário gravada por esta transação para o arquivo, se houver"""
+    journal = PatchJournal(file_path)
+    if not journal.can_undo:
+        return journal, None
+    entry = journal.entries[journal.position - 1]
+    if (entry['old_steamid'] == int(old_steamid) and entry['new_steamid'] == int(new_steamid)
+            and entry['created'] >= record['created']):
+        return journal, entry
+    return journal, None
+
+
+def rewrite_patches(file_path, patches, forward):
+    """Completa (ou reverte) os patches do diário, pulando offsets já gravados"""
+    with open(file_path, 'r+b') as f:
+        pending = []
+        for offset, old_hex, new_hex in patches:
+            expected, target = bytes.fromhex(old_hex), bytes.fromhex(new_hex)
+            if not forward:
+                expected, target = target, expected
+            f.seek(offset)
+            current = f.read(len(target))
+            if current == target:
+                continue
+            if current != expected:
+                raise Exception(f"Unexpected bytes at offset 0x{offset:x} in {file_path}")
+            pending.append((offset, target))
+        for offset, target in pending:
+            f.seek(offset)
+            f.write(target)
+        if pending:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class Transaction:
+    """Uma migração em andamento: arquivos de uma pasta de SteamID e sua renomeação"""
+
+    def __init__(self, record, path):
+        self.record = record
+        self.path = path
+
+    @classmethod
+    def begin(cls, files, old_steamid, new_steamid, folder=None, rename=True, backup=False,
+              store=None, journal=True, tx_dir=None):
+        """Grava a intenção da migração antes de qualquer alteração nos saves
+
+        Falha logo, sem gravar nada, se a pasta de destino já existir.
+        """
+        new_folder = None
+        if rename and folder and os.path.basename(folder) != str(new_steamid):
+            new_folder = os.path.join(os.path.dirname(folder), str(new_steamid))
+            if os.path.exists(new_folder):
+                raise Exception(f"Folder already exists: {new_steamid}")
+
+        tx_dir = tx_dir or default_transaction_dir()
+        os.makedirs(tx_dir, exist_ok=True)
+        created = time.time()
+        record = {
+            'version': TRANSACTION_VERSION,
+            'id': f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}-{uuid.uuid4().hex[:8]}",
+            'created': created,
+            'pid': os.getpid(),
+            'state': STATE_BEGUN,
+            'old_steamid': int(old_steamid),
+            'new_steamid': int(new_steamid),
+            'files': [os.path.abspath(f) for f in files],
+            'folder': os.path.abspath(folder) if folder else None,
+            'new_folder': new_folder,
+            'backup': bool(backup),
+            'store': store.root if store is not None else None,
+            'journal': bool(journal),
+        }
+        transaction = cls(record, os.path.join(tx_dir, record['id'] + TRANSACTION_SUFFIX))
+        transaction.save()
+        return transaction
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get('version') != TRANSACTION_VERSION:
+            raise ValueError(f"Unknown transaction version in {path}")
+        return cls(record, path)
+
+    @property
+    def state(self):
+        return self.record['state']
+
+    def save(self):
+        core.atomic_write(self.path, json.dumps(self.record, indent=1).encode('utf-8'))
+
+    def set_state(self, state):
+        """Avança o estado; gravado (com fsync) antes da etapa correspondente"""
+        with trace.span('transaction', state=state):
+            self.record['state'] = state
+            self.save()
+
+    def commit(self):
+        """Encerra a transação apagando o registro"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        core.fsync_dir(os.path.dirname(self.path))
+
+    def current_folder(self):
+        """Pasta onde os saves estão agora (antiga ou já renomeada)"""
+        folder, new_folder = self.record['folder'], self.record['new_folder']
+        if new_folder and not os.path.exists(folder) and os.path.isdir(new_folder):
+            return new_folder
+        return folder
+
+    def current_files(self):
+        folder = self.current_folder()
+        if not folder:
+            return list(self.record['files'])
+        return [os.path.join(folder, os.path.basename(f)) for f in self.record['files']]
+
+    def rename_folder(self):
+        """Renomeia a pasta para o destino; retorna (sucesso, mensagem, novo caminho)"""
+        folder, new_folder = self.record['folder'], self.record['new_folder']
+        if not new_folder:
+            return True, "Folder kept", folder
+        if self.current_folder() == new_folder:
+            # Já renomeada antes da interrupção: só falta a anotação
+            self._after_rename(folder, new_folder)
+            return True, f"Folder renamed to: {self.record['new_steamid']}", new_folder
+        self.set_state(STATE_RENAMING)
+        success, message, renamed = core.rename_save_folder(folder, self.record['new_steamid'])
+        if success:
+            core.fsync_dir(os.path.dirname(folder))
+            self._after_rename(folder, renamed)
+        return success, message, renamed
+
+    def _after_rename(self, folder, new_folder):
+        """Anota a renomeação no diário e leva o histórico de snapshots"""
+        for file_path in self.current_files():
+            if not os.path.exists(file_path):
+                continue
+            journal, entry = _journal_entry(file_path, self.record, self._old_steamid_of(file_path),
+                                            self.record['new_steamid'])
+            if entry is not None:
+                journal.set_rename(os.path.basename(folder), os.path.basename(new_folder))
+            if self.record['store']:
+                BackupStore(self.record['store']).move_history(
+                    os.path.join(folder, os.path.basename(file_path)), file_path)
+
+    def _old_steamid_of(self, file_path):
+        """SteamID antigo do arquivo: o do diário, se houver, ou o da transação"""
+        journal = PatchJournal(file_path)
+        if journal.can_undo:
+            entry = journal.entries[journal.position - 1]
+            if entry['new_steamid'] == self.record['new_steamid'] and entry['created'] >= self.record['created']:
+                return entry['old_steamid']
+        return self.record['old_steamid']
+
+    def roll_forward(self):
+        """Completa os patches que faltam, confere o hash e renomeia a pasta"""
+        new_steamid = self.record['new_steamid']
+        for file_path in self.current_files():
+            old_steamid = self._old_steamid_of(file_path)
+            _, entry = _journal_entry(file_path, self.record, old_steamid, new_steamid)
+            if entry is not None:
+                rewrite_patches(file_path, entry['patches'], forward=True)
+                if hash_file(file_path) != entry['hash_after']:
+                    raise Exception(f"Hash mismatch after completing patch: {file_path}")
+            elif self.record['journal']:
+                replace_steamid_journaled(file_path, old_steamid, new_steamid)
+            else:
+                core.replace_steamid_in_file(file_path, old_steamid, new_steamid)
+
+        success, message, _ = self.rename_folder()
+        if not success:
+            raise Exception(message)
+        self.commit()
+
+    def roll_back(self):
+        """Desfaz a renomeação e os patches já gravados, deixando os saves como antes"""
+        folder, new_folder = self.record['folder'], self.record['new_folder']
+        if new_folder and self.current_folder() == new_folder:
+            success, message, _ = core.rename_save_folder(new_folder, os.path.basename(folder))
+            if not success:
+                raise Exception(f"Cannot rename folder back: {message}")
+            core.fsync_dir(os.path.dirname(folder))
+            if self.record['store']:
+                store = BackupStore(self.record['store'])
+                for file_path in self.current_files():
+                    store.move_history(os.path.join(new_folder, os.path.basename(file_path)), file_path)
+
+        for file_path in self.current_files():
+            if os.path.exists(file_path):
+                self._roll_back_file(file_path)
+        self.commit()
+
+    def _roll_back_file(self, file_path):
+        old_steamid = self._old_steamid_of(file_path)
+        journal, entry = _journal_entry(file_path, self.record, old_steamid, self.record['new_steamid'])
+        if entry is not None:
+            rewrite_patches(file_path, entry['patches'], forward=False)
+            if hash_file(file_path) != entry['hash_before']:
+                raise Exception(f"Hash mismatch after rolling back: {file_path}")
+            # A entrada deixa de existir: o patch nunca aconteceu
+            journal.position -= 1
+            del journal.entries[journal.position:]
+            journal.save()
+            return
+        if self.record['journal'] and self.state != STATE_BEGUN:
+            # O diário é gravado antes dos bytes: sem entrada, o save não foi tocado
+            return
+        if not self._touched(file_path):
+            return
+        if self.record['store']:
+            store = BackupStore(self.record['store'])
+            snapshots = [s for s in store.list_snapshots(file_path) if s['created'] >= self.record['created']]
+            if snapshots:
+                store.restore(file_path, snapshots[0]['id'])
+                return
+        # O .bak é criado antes do patch: se o save foi tocado, o .bak é desta transação
+        backup_path = core.backup_path_for(file_path)
+        if self.record['backup'] and os.path.exists(backup_path):
+            core.restore_backup(file_path, backup_path)
+            return
+        raise Exception(f"Cannot roll back {file_path}: no journal entry or backup")
+
+    def _touched(self, file_path):
+        """Sem diário: o arquivo contém o SteamID novo e não o antigo?"""
+        with core.map_save(file_path) as data:
+            old_hits = core.find_steamid_offsets(data, self._old_steamid_of(file_path))
+            new_hits = core.find_steamid_offsets(data, self.record['new_steamid'])
+        return bool(new_hits) and not old_hits
+
+
+def pending_transactions(tx_dir=None):
+    """Transações não concluídas cujo processo dono não está mais rodando"""
+    tx_dir = tx_dir or default_transaction_dir()
+    try:
+        names = sorted(n for n in os.listdir(tx_dir) if n.endswith(TRANSACTION_SUFFIX))
+    except OSError:
+        return []
+    transactions = []
+    for name in names:
+        try:
+            transaction = Transaction.load(os.path.join(tx_dir, name))
+        except (OSError, ValueError, KeyError):
+            continue
+        if not _process_alive(transaction.record['pid']):
+            transactions.append(transaction)
+    return transactions
+
+
+def recover(tx_dir=None):
+    """Resolve transações interrompidas: completa as que já gravaram algo, descarta as outras
+
+    Retorna uma lista de resultados com 'id', 'action' ('discarded',
+    'rolled_forward', 'rolled_back' ou 'failed') e 'message'.
+    """
+    results = []
+    for transaction in pending_transactions(tx_dir):
+        result = {'id': transaction.record['id'],
+                  'folder': transaction.record['folder'],
+                  'files': transaction.record['files'],
+                  'action': 'discarded',
+                  'message': ''}
+        if transaction.state == STATE_BEGUN:
+            transaction.commit()
+            result['message'] = "Interrupted before any change"
+            results.append(result)
+            continue
+        try:
+            transaction.roll_forward()
+            result['action'] = 'rolled_forward'
+            result['message'] = f"Migration to {transaction.record['new_steamid']} completed"
+        except Exception as forward_error:
+            try:
+                transaction.roll_back()
+                result['action'] = 'rolled_back'
+                result['message'] = f"Migration undone: {forward_error}"
+            except Exception as back_error:
+                result['action'] = 'failed'
+                result['message'] = f"{forward_error}; rollback failed: {back_error}"
+        results.append(result)
+    return results
@@ -0,0 +1,116 @@
+"""Verificação depois da gravação: os bytes novos estão no disco e o SteamID antigo sumiu
+
+Uma única passada sequencial pelo arquivo, com um buffer fixo reutilizado
+(readinto), faz as três conferências: cada offset do patch contém os
+bytes novos, não sobrou nenhuma ocorrência do SteamID antigo (em
+texto ou uint64) e o hash do arquivo inteiro é o esperado. Os
+últimos MAX_HIT_LENGTH - 1 bytes de cada bloco são reaproveitados no
+seguinte, para achar ocorrências que cruzam a fronteira. O SteamID
+antigo é procurado com bytearray.find, um literal por codificação.
+"""
+import hashlib
+
+from . import locator, trace
+from .locator import SteamIDHit
+
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+_OVERLAP = locator.MAX_HIT_LENGTH - 1
+
+
+def verify_file(file_path, patches, old_steamid, expected_hash=None, encodings=locator.ALL_ENCODINGS,
+                buffer_size=DEFAULT_BUFFER_SIZE):
+    """Confere o save depois do patch; retorna {'ok', 'hash', 'expected_hash', 'mismatched', 'stray', 'bytes'}
+
+    patches está no formato do diário ([offset, bytes antigos, bytes
+    novos] em hex); mismatched lista os offsets sem os bytes novos e
+    stray as ocorrências (SteamIDHit) do SteamID antigo que restaram.
+    Sem expected_hash, o hash é calculado mas não comparado.
+    """
+    pending = sorted(patches)
+    # O ID de conta só é trocado dentro de propriedades int (core.patchable_hits), então
+    # 4 bytes iguais a ele em outro lugar não são resto do patch; os trocados caem em mismatched
+    literals = [(encoding, locator.encode_steamid(old_steamid, encoding))
+                for encoding in locator.OWNER_ENCODINGS if encoding in encodings]
+    buffer = bytearray(buffer_size + _OVERLAP)
+    view = memoryview(buffer)
+    digest = hashlib.blake2b(digest_size=32)
+    mismatched = []
+    stray = []
+    base = 0    # offset no arquivo de buffer[0]
+    carry = 0   # bytes reaproveitados do bloco anterior
+    index = 0
+
+    with trace.span('verify', file=file_path, patches=len(pending)) as info, \
+            open(file_path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(view[carry:])
+            filled = carry + count
+            digest.update(view[carry:filled])
+            limit = filled if count == 0 else max(filled - _OVERLAP, 0)
+
+            window = view[:filled]
+            while index < len(pending) and pending[index][0] < base + limit:
+                offset, _, new_hex = pending[index]
+                new_bytes = bytes.fromhex(new_hex)
+                start = offset - base
+                if window[start:start + len(new_bytes)] != new_bytes:
+                    mismatched.append(offset)
+                index += 1
+
+            window.release()
+            stray.extend(_find_literals(buffer, literals, limit, filled, base, int(old_steamid)))
+            if count == 0:
+                break
+
+            # Os bytes depois de limit voltam para o início do buffer
+            buffer[:filled - limit] = buffer[limit:filled]
+            carry = filled - limit
+            base += limit
+
+        # Offsets depois do fim do arquivo
+        mismatched.extend(offset for offset, _, _ in pending[index:])
+        info['bytes'] = base + carry
+
+    view.release()
+    content_hash = digest.hexdigest()
+    return {
+        'ok': not mismatched and not stray and expected_hash in (None, content_hash),
+        'hash': content_hash,
+        'expected_hash': expected_hash,
+        'mismatched': mismatched,
+        'stray': stray,
+        'bytes': base + carry,
+    }
+
+
+def _find_literals(buffer, literals, limit, end, base, steamid):
+    """Ocorrências dos literais que começam antes de limit, uma por offset"""
+    found = {}
+    for encoding, literal in literals:
+        position = buffer.find(literal, 0, end)
+        while position != -1 and position < limit:
+            found.setdefault(position, encoding)
+            position = buffer.find(literal, position + 1, end)
+    return [SteamIDHit(base + offset, found[offset], steamid) for offset in sorted(found)]
+
+
+def describe_failure(result):
+    """Texto curto com os problemas encontrados por verify_file"""
+    problems = []
+    if result['mismatched']:
+        problems.append(f"{len(result['mismatched'])} patched offset(s) do not hold the new bytes "
+                        f"(first at 0x{result['mismatched'][0]:x})")
+    if result['stray']:
+        problems.append(f"{len(result['stray'])} occurrence(s) of the old SteamID left "
+                        f"(first at 0x{result['stray'][0].offset:x})")
+    if result['expected_hash'] not in (None, result['hash']):
+        problems.append("file hash differs from the expected one")
+    return "; ".join(problems)
+
+
+def verify_entry(file_path, entry):
+    """Verifica o save contra uma entrada do diário (ou de um plano); lança exceção se falhar"""
+    result = verify_file(file_path, entry['patches'], entry['old_steamid'], entry['hash_after'])
+    if not result['ok']:
+        raise Exception(f"Verification failed for {file_path}: {describe_failure(result)}")
+    return result
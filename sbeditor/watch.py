@@ -0,0 +1,312 @@
+"""Modo de vigia: corrige o SteamID dos saves que o jogo (ou a nuvem) grava depois da migração
+
+Os eventos vêm do inotify no Linux ou, nos outros sistemas (ou com
+polling=True), de fotografias periódicas do stat dos .sav. Uma sequência
+de escritas no mesmo arquivo vira uma única verificação: o arquivo só é
+lido depois de ficar settle segundos sem mudar. O hash do conteúdo vem
+primeiro: só arquivos cujo hash mudou desde a última verificação são
+varridos e, se o SteamID não for o esperado, corrigidos com patch_save
+(registrado no diário). Com um cache de varredura, o hash de um arquivo
+cuja identidade não mudou vem da entrada, sem ler o arquivo.
+
+O SteamID esperado é o nome da pasta do save, ou o mapeamento
+'antigo -> novo' passado em targets. Parado, o vigia fica bloqueado no
+select (inotify) ou dormindo entre fotografias (polling).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from . import core, trace
+from .cache import hash_buffer
+from .migrate import patch_save
+
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+# Intervalo máximo de bloqueio do inotify, para notar o pedido de parada
+_IDLE_WAKEUP = 1.0
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """libc com inotify (só no Linux); None se indisponível"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return libc
+
+
+def is_save_path(path):
+    return path.lower().endswith('.sav')
+
+
+class InotifySource:
+    """Eventos do inotify na pasta SaveGames e nas pastas de SteamID dentro dela"""
+
+    name = 'inotify'
+
+    def __init__(self, save_root, libc):
+        self.save_root = save_root
+        self._libc = libc
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._folders = {}
+        self._add_watch(save_root)
+        for folder in core.find_steamid_folders(save_root):
+            self._add_watch(folder)
+
+    def _add_watch(self, folder):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+        if wd >= 0:
+            self._folders[wd] = folder
+
+    def wait(self, timeout):
+        """Bloqueia até haver eventos (ou timeout); retorna os caminhos alterados"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+            offset += _EVENT_HEADER.size + length
+            folder = self._folders.get(wd)
+            name = os.fsdecode(raw_name.rstrip(b'\0'))
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            if mask & _IN_ISDIR:
+                # Pasta de SteamID nova (a migração renomeia pastas)
+                if folder == self.save_root and core.is_steamid_folder_name(name):
+                    self._add_watch(path)
+                    paths.extend(core.find_sav_files(path))
+            else:
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingSource:
+    """Eventos deduzidos comparando fotografias do stat dos .sav a cada interval segundos"""
+
+    name = 'polling'
+
+    def __init__(self, save_root, interval=DEFAULT_POLL_INTERVAL, stop_event=None):
+        self.save_root = save_root
+        self.interval = interval
+        self._stop = stop_event or threading.Event()
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for folder in core.find_steamid_folders(self.save_root):
+            for path in core.find_sav_files(folder):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return snapshot
+
+    def wait(self, timeout):
+        """Dorme até a próxima fotografia; retorna os caminhos novos ou alterados"""
+        delay = self.interval if timeout is None else min(timeout, self.interval)
+        if self._stop.wait(delay):
+            return []
+        snapshot = self._take_snapshot()
+        changed = [path for path, identity in snapshot.items() if self._snapshot.get(path) != identity]
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def _identity(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class SaveWatcher:
+    """Vigia uma pasta SaveGames e corrige o SteamID dos saves alterados
+
+    on_result(resultado) é chamado para cada arquivo verificado, com
+    {'file', 'action', 'old_steamid', 'new_steamid', 'replacements', 'message'};
+    action é 'patched', 'ok' ou 'error'.
+    """
+
+    def __init__(self, save_root=None, targets=None, settle=DEFAULT_SETTLE,
+                 interval=DEFAULT_POLL_INTERVAL, polling=False, backup=False, journal=True,
+                 on_result=None, cache=None):
+        self.save_root = save_root or core.default_save_root()
+        self.targets = targets
+        self.settle = settle
+        self.interval = interval
+        self.polling = polling
+        self.backup = backup
+        self.journal = journal
+        self.on_result = on_result
+        self.cache = cache
+        self.stop_event = threading.Event()
+        self.source = None
+        # Hash do conteúdo de cada save na última verificação (ou depois do patch)
+        self._hashes = {}
+        self._pending = {}
+
+    def _open_source(self):
+        libc = None if self.polling else _load_inotify()
+        if libc is not None:
+            try:
+                return InotifySource(self.save_root, libc)
+            except OSError:
+                pass
+        return PollingSource(self.save_root, self.interval, self.stop_event)
+
+    def expected_steamid(self, file_path, owner):
+        """SteamID que o save deveria ter, ou None se nada deve ser feito"""
+        if self.targets is not None:
+            return self.targets.get(str(owner))
+        folder = core.steamid_folder_of(file_path)
+        return int(os.path.basename(folder)) if folder else None
+
+    def _file_hash(self, file_path):
+        """Hash do conteúdo; com cache, vem da entrada se a identidade do arquivo não mudou"""
+        if self.cache is not None:
+            entry = self.cache.get(file_path)
+            if entry is not None:
+                return entry['hash']
+        with core.map_save(file_path) as data:
+            return hash_buffer(data)
+
+    def check_file(self, file_path):
+        """Verifica um save; corrige o SteamID se o conteúdo mudou e está errado
+
+        Só o hash é calculado antes; o SteamID é procurado apenas quando ele
+        difere do da última verificação (que então retorna None).
+        """
+        with trace.span('watch_check', file=file_path) as info:
+            info['bytes'] = os.path.getsize(file_path)
+            content_hash = self._file_hash(file_path)
+            if self._hashes.get(file_path) == content_hash:
+                info['skipped'] = True
+                return None
+
+            # Dono pelo nome da pasta quando ele aparece no save (ver core.find_steamid)
+            owner = core.scan_file(file_path)
+            result = {'file': file_path, 'action': 'ok', 'old_steamid': owner, 'new_steamid': owner,
+                      'replacements': 0, 'message': None}
+            expected = self.expected_steamid(file_path, owner) if owner else None
+            if expected and expected != owner:
+                try:
+                    patched = patch_save(file_path, owner, expected, backup=self.backup,
+                                         journal=self.journal)
+                    result.update(action='patched', new_steamid=expected,
+                                  replacements=patched['replacements'])
+                    content_hash = self._file_hash(file_path)
+                except Exception as e:
+                    result.update(action='error', message=str(e))
+            elif not owner:
+                result['message'] = "SteamID not found"
+            self._hashes[file_path] = content_hash
+        return result
+
+    def _report(self, result):
+        if result is not None and self.on_result:
+            self.on_result(result)
+
+    def _check(self, file_path):
+        try:
+            self._report(self.check_file(file_path))
+        except OSError as e:
+            # Arquivo apagado ou ainda preso pelo jogo: a próxima escrita gera outro evento
+            self._report({'file': file_path, 'action': 'error', 'old_steamid': None,
+                          'new_steamid': None, 'replacements': 0, 'message': str(e)})
+        if self.cache is not None:
+            try:
+                self.cache.save()
+            except OSError:
+                pass
+
+    def initial_check(self):
+        """Verifica todos os saves existentes (e guarda os hashes)"""
+        for folder in core.find_steamid_folders(self.save_root):
+            for file_path in core.find_sav_files(folder):
+                self._check(file_path)
+
+    def _note(self, file_path):
+        """Adia a verificação: o arquivo precisa ficar settle segundos sem mudar"""
+        self._pending[file_path] = (time.monotonic() + self.settle, _identity(file_path))
+
+    def _process_pending(self):
+        now = time.monotonic()
+        for file_path, (deadline, identity) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            current = _identity(file_path)
+            if current is None:
+                del self._pending[file_path]
+            elif current != identity:
+                # Mudou sem gerar evento (polling) ou ainda está sendo gravado
+                self._pending[file_path] = (now + self.settle, current)
+            else:
+                del self._pending[file_path]
+                self._check(file_path)
+
+    def _timeout(self):
+        if not self._pending:
+            return None
+        return max(0.0, min(deadline for deadline, _ in self._pending.values()) - time.monotonic())
+
+    def run(self, initial=True):
+        """Vigia até stop() ser chamado (ou KeyboardInterrupt)"""
+        if not os.path.isdir(self.save_root):
+            raise FileNotFoundError(f"SaveGames folder not found: {self.save_root}")
+        self.source = self._open_source()
+        try:
+            if initial:
+                self.initial_check()
+            while not self.stop_event.is_set():
+                timeout = self._timeout()
+                if isinstance(self.source, InotifySource):
+                    timeout = _IDLE_WAKEUP if timeout is None else min(timeout, _IDLE_WAKEUP)
+                for file_path in self.source.wait(timeout):
+                    if is_save_path(file_path):
+                        self._note(file_path)
+                self._process_pending()
+        finally:
+            self.source.close()
+
+    def stop(self):
+        self.stop_event.set()
@@ -1,27 +1,56 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import struct
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import argparse
 import os
-import shutil
-import re
+import queue
+import threading
 from datetime import datetime
-import configparser
-import io
+
+from sbeditor import archive, clone, core, diff, discovery, locator, trace
+from sbeditor.cache import get_default_cache, scan_file_cached
+from sbeditor.inventory import Inventory
+from sbeditor.journal import PatchJournal
+from sbeditor.migrate import migrate_save
+from sbeditor.transaction import recover
+
+# Linhas mostradas na janela de comparação (milhares deixam o Treeview lento)
+MAX_DIFF_ROWS = 5000
+
+
+def stage_progress(report, text, start, end):
+    """Converte progress(feito, total) de uma etapa em report(percentual, texto)"""
+    def progress(done, total):
+        report(start + (end - start) * done / max(total, 1), text)
+    return progress
+
 
 class StellarBladeSteamIDEditor:
     def __init__(self, root):
         self.root = root
         self.root.title("Stellar Blade SteamID Editor")
-        self.root.geometry("650x600")
+        self.root.geometry("650x670")
         self.root.resizable(False, False)
         
         # Variáveis
         self.file_path = None
-        self.original_data = None
+        self.file_loaded = False
         self.current_steamid = None
         self.old_steamid_folder = None
         self.config_path = None
         
+        # Tarefa em segundo plano
+        self.busy = False
+        self.cancel_event = None
+        self.task_queue = queue.Queue()
+        
+        # Inventário de saves (atualizado de forma incremental)
+        self.inventory = Inventory(cache=get_default_cache())
+        self.inventory_tree = None
+        
+        # Painel de diagnóstico (spans de tempo por etapa)
+        self.diagnostics_tree = None
+        self.diagnostics_summary = None
+        
         # Configurar cores
         self.bg_color = '#f5f5f5'
         self.entry_bg = 'white'
@@ -44,12 +73,47 @@ class StellarBladeSteamIDEditor:
         
         # Tentar encontrar pasta padrão
         self.auto_find_save_folder()
+        
+        # Completar ou desfazer migrações interrompidas numa execução anterior
+        self.root.after(100, self.recover_transactions)
+    
+    def recover_transactions(self):
+        """Resolve o log de transações deixado por uma execução interrompida"""
+        try:
+            results = recover()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to check interrupted changes: {str(e)}")
+            return
+        if not results:
+            return
+        lines = [f"• {os.path.basename(r['folder'] or r['files'][0])}: {r['action'].replace('_', ' ')} "
+                 f"- {r['message']}" for r in results]
+        messagebox.showinfo("Interrupted Changes",
+                            "A previous SteamID change was interrupted:\n\n" + "\n".join(lines))
     
     def create_menu(self):
         """Cria o menu superior"""
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
         
+        # Menu Edit (desfazer/refazer pelo diário de patches)
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Edit", menu=edit_menu)
+        edit_menu.add_command(label="Undo SteamID Change", command=self.undo_patch, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo SteamID Change", command=self.redo_patch, accelerator="Ctrl+Y")
+        self.root.bind_all("<Control-z>", lambda e: self.undo_patch())
+        self.root.bind_all("<Control-y>", lambda e: self.redo_patch())
+        
+        # Menu Saves
+        saves_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Saves", menu=saves_menu)
+        saves_menu.add_command(label="Save Inventory...", command=self.show_inventory)
+        saves_menu.add_command(label="Find Saves and Configs...", command=self.find_saves_and_configs)
+        saves_menu.add_command(label="Clone Save to SteamIDs...", command=self.clone_save_to_steamids)
+        saves_menu.add_command(label="Patch Save Archive...", command=self.patch_save_archive)
+        saves_menu.add_command(label="Compare Saves...", command=self.compare_saves)
+        saves_menu.add_command(label="Diagnostics...", command=self.show_diagnostics)
+        
         # Menu Help
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Instructions", menu=help_menu)
@@ -120,7 +184,7 @@ class StellarBladeSteamIDEditor:
             "4. Click 'Replace SteamID & Rename Folder'",
             "",
             "5. The tool will:",
-            "   • Backup your original .sav file",
+            "   • Record the change in an undo journal (Edit > Undo)",
             "   • Replace SteamID in the save file",
             "   • Rename the save folder to match new SteamID"
         ]
@@ -148,12 +212,14 @@ class StellarBladeSteamIDEditor:
         paths = [
             "Save Game Location:",
             "  %LOCALAPPDATA%\\SB\\Saved\\SaveGames\\7656119xxxxxxxxxx\\",
+            "  Linux/Steam Deck: Saves > Find Saves and Configs (Proton prefixes)",
             "",
             "Config File Location:",
             "  Engine\\Binaries\\ThirdParty\\Steamworks\\Steamv159\\Win64\\steam_settings\\configs.user.ini",
             "",
             "Backup Files:",
-            "  Same folder as original with .bak extension"
+            "  Undo journal: same folder, .journal.json extension",
+            "  Optional full copy: same folder, .bak extension"
         ]
         
         for path in paths:
@@ -180,7 +246,7 @@ class StellarBladeSteamIDEditor:
             "⚠️ Always backup your saves before modifying",
             "⚠️ SteamID must be exactly 17 digits",
             "⚠️ The save folder name MUST match the SteamID",
-            "⚠️ If folder rename fails, you must do it manually",
+            "⚠️ If folder rename fails, the file change is rolled back",
             "⚠️ Launch game with new SteamID after changes"
         ]
         
@@ -206,6 +272,536 @@ class StellarBladeSteamIDEditor:
                              width=20)
         close_btn.pack(pady=20)
     
+    def show_inventory(self):
+        """Mostra a tabela com todas as pastas de SteamID e seus saves"""
+        if self.inventory_tree is not None and self.inventory_tree.winfo_exists():
+            self.inventory_tree.winfo_toplevel().lift()
+            return
+        
+        inventory_window = tk.Toplevel(self.root)
+        inventory_window.title("Save Inventory - Stellar Blade SteamID Editor")
+        inventory_window.geometry("760x400")
+        inventory_window.configure(bg=self.bg_color)
+        
+        main_frame = tk.Frame(inventory_window, bg=self.bg_color, padx=15, pady=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        tk.Label(main_frame,
+                text=f"SaveGames: {self.inventory.save_root}",
+                font=("Arial", 9),
+                bg=self.bg_color,
+                fg=self.label_fg,
+                anchor='w').pack(fill=tk.X, pady=(0, 10))
+        
+        # Tabela
+        table_frame = tk.Frame(main_frame, bg=self.bg_color)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('folder', 'file', 'size', 'modified', 'steamid')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode='browse')
+        for column, heading, width in (('folder', "Folder", 150),
+                                       ('file', "File", 190),
+                                       ('size', "Size", 90),
+                                       ('modified', "Modified", 120),
+                                       ('steamid', "SteamID in file", 170)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor='e' if column == 'size' else 'w')
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        tree.bind("<Double-1>", lambda e: self.open_inventory_selection())
+        self.inventory_tree = tree
+        
+        # Botões
+        button_frame = tk.Frame(main_frame, bg=self.bg_color)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        for text, command in (("Open Selected", self.open_inventory_selection),
+                              ("Refresh", self.refresh_inventory),
+                              ("Close", inventory_window.destroy)):
+            tk.Button(button_frame,
+                     text=text,
+                     command=command,
+                     bg=self.button_bg,
+                     fg=self.button_fg,
+                     font=("Arial", 9, "bold"),
+                     relief=tk.RAISED,
+                     borderwidth=2,
+                     width=14).pack(side=tk.LEFT, padx=(0, 10))
+        
+        if self.inventory.rows:
+            self.fill_inventory(self.inventory.rows)
+        self.refresh_inventory()
+    
+    def refresh_inventory(self):
+        """Atualiza o inventário numa thread de trabalho"""
+        def work(report, cancel):
+            return self.inventory.refresh(stage_progress(report, "Scanning save folders...", 0, 100))
+        
+        self.run_in_background("Scanning save folders...", work, self.fill_inventory)
+    
+    def fill_inventory(self, rows):
+        """Preenche a tabela do inventário"""
+        tree = self.inventory_tree
+        if tree is None or not tree.winfo_exists():
+            return
+        
+        tree.delete(*tree.get_children())
+        for index, row in enumerate(rows):
+            if row['error']:
+                found = "[Error]"
+            elif row['steamid'] is None:
+                found = "[Not found]"
+            else:
+                found = str(row['steamid'])
+                if found != row['folder_steamid']:
+                    found += " ⚠️"
+            tree.insert('', tk.END, iid=str(index), values=(
+                row['folder_steamid'],
+                row['name'],
+                f"{row['size']:,}",
+                datetime.fromtimestamp(row['mtime']).strftime('%Y-%m-%d %H:%M'),
+                found,
+            ))
+        self.status_var.set(f"Inventory: {len(rows)} save file(s)")
+    
+    def find_saves_and_configs(self):
+        """Procura pastas SaveGames e configs.user.ini (Windows, bibliotecas do Steam, Proton e Wine)"""
+        def work(report, cancel):
+            report(0, "Searching Steam libraries and Proton/Wine prefixes...")
+            return discovery.discovered(refresh=True)
+        
+        self.run_in_background("Searching for saves and configs...", work, self.show_discovered)
+    
+    def show_discovered(self, entries):
+        """Lista única de saves e configs encontrados; o item escolhido é aberto na janela principal"""
+        self.status_var.set(f"Found {len(entries)} save folder(s) and config(s)")
+        if not entries:
+            messagebox.showinfo("Find Saves and Configs",
+                              "No SaveGames folder or configs.user.ini was found.\n\n"
+                              "Set SBEDITOR_STEAM_ROOT to your Steam folder if it is not in the usual place.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Saves and Configs - Stellar Blade SteamID Editor")
+        window.geometry("900x360")
+        window.configure(bg=self.bg_color)
+        
+        main_frame = tk.Frame(window, bg=self.bg_color, padx=15, pady=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        table_frame = tk.Frame(main_frame, bg=self.bg_color)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('kind', 'source', 'steamid', 'path')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode='browse')
+        for column, heading, width in (('kind', "Kind", 70),
+                                       ('source', "Source", 120),
+                                       ('steamid', "SteamID", 160),
+                                       ('path', "Path", 520)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor='w')
+        for index, entry in enumerate(entries):
+            source = entry['source'] + (f" {entry['prefix']}" if entry['prefix'] else '')
+            tree.insert('', tk.END, iid=str(index), values=(
+                "Saves" if entry['kind'] == 'saves' else "Config",
+                source,
+                ', '.join(entry['steamids']) or "-",
+                entry['path'],
+            ))
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        def use_selected():
+            selection = tree.selection()
+            if not selection or self.busy:
+                return
+            entry = entries[int(selection[0])]
+            if entry['kind'] == 'config':
+                self.apply_config(entry['path'])
+                return
+            self.inventory = Inventory(entry['path'], cache=get_default_cache())
+            if self.inventory_tree is not None and self.inventory_tree.winfo_exists():
+                # A janela do inventário mostrava a pasta SaveGames anterior
+                self.inventory_tree.winfo_toplevel().destroy()
+            for folder in core.find_steamid_folders(entry['path']):
+                sav_file = core.find_sav_file_in_folder(folder)
+                if sav_file:
+                    self.old_steamid_folder = folder
+                    self.set_file_path(sav_file)
+                    self.load_file()
+                    break
+            self.status_var.set(f"SaveGames: {entry['path']}")
+        
+        tree.bind("<Double-1>", lambda e: use_selected())
+        
+        button_frame = tk.Frame(main_frame, bg=self.bg_color)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        for text, command in (("Use Selected", use_selected),
+                              ("Close", window.destroy)):
+            tk.Button(button_frame,
+                     text=text,
+                     command=command,
+                     bg=self.button_bg,
+                     fg=self.button_fg,
+                     font=("Arial", 9, "bold"),
+                     relief=tk.RAISED,
+                     borderwidth=2,
+                     width=14).pack(side=tk.LEFT, padx=(0, 10))
+    
+    def open_inventory_selection(self):
+        """Carrega na janela principal o save selecionado no inventário"""
+        selection = self.inventory_tree.selection() if self.inventory_tree else ()
+        if not selection or self.busy:
+            return
+        
+        row = self.inventory.rows[int(selection[0])]
+        self.file_path = row['file']
+        self.file_entry.delete(0, tk.END)
+        self.file_entry.insert(0, self.file_path)
+        self.load_file()
+    
+    def show_diagnostics(self):
+        """Mostra o tempo de cada etapa (leitura, varredura, backup, gravação, renomeação)"""
+        if self.diagnostics_tree is not None and self.diagnostics_tree.winfo_exists():
+            self.diagnostics_tree.winfo_toplevel().lift()
+            self.refresh_diagnostics()
+            return
+        
+        diagnostics_window = tk.Toplevel(self.root)
+        diagnostics_window.title("Diagnostics - Stellar Blade SteamID Editor")
+        diagnostics_window.geometry("820x420")
+        diagnostics_window.configure(bg=self.bg_color)
+        
+        main_frame = tk.Frame(diagnostics_window, bg=self.bg_color, padx=15, pady=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.diagnostics_summary = tk.Label(main_frame,
+                                            text="",
+                                            font=("Arial", 9),
+                                            bg=self.bg_color,
+                                            fg=self.label_fg,
+                                            anchor='w',
+                                            justify=tk.LEFT)
+        self.diagnostics_summary.pack(fill=tk.X, pady=(0, 10))
+        
+        # Tabela de spans (etapas aninhadas aparecem recuadas)
+        table_frame = tk.Frame(main_frame, bg=self.bg_color)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('stage', 'file', 'wall', 'cpu', 'bytes', 'speed')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode='browse')
+        for column, heading, width in (('stage', "Stage", 200),
+                                       ('file', "File", 200),
+                                       ('wall', "Wall ms", 80),
+                                       ('cpu', "CPU ms", 80),
+                                       ('bytes', "Bytes", 100),
+                                       ('speed', "MB/s", 80)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor='w' if column in ('stage', 'file') else 'e')
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        self.diagnostics_tree = tree
+        
+        # Botões
+        button_frame = tk.Frame(main_frame, bg=self.bg_color)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        for text, command in (("Refresh", self.refresh_diagnostics),
+                              ("Export JSON Lines", lambda: self.export_diagnostics('.jsonl')),
+                              ("Export Chrome Trace", lambda: self.export_diagnostics('.json')),
+                              ("Clear", self.clear_diagnostics),
+                              ("Close", diagnostics_window.destroy)):
+            tk.Button(button_frame,
+                     text=text,
+                     command=command,
+                     bg=self.button_bg,
+                     fg=self.button_fg,
+                     font=("Arial", 9, "bold"),
+                     relief=tk.RAISED,
+                     borderwidth=2,
+                     width=16).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.refresh_diagnostics()
+    
+    def refresh_diagnostics(self):
+        """Preenche o painel de diagnóstico com os spans registrados"""
+        tree = self.diagnostics_tree
+        if tree is None or not tree.winfo_exists():
+            return
+        
+        spans = trace.get_tracer().snapshot()
+        tree.delete(*tree.get_children())
+        for record in spans:
+            info = record['args']
+            speed = trace.throughput(record)
+            file_name = os.path.basename(str(info.get('file') or info.get('folder') or ''))
+            stage = "   " * record['depth'] + record['name'] + (" [error]" if record['error'] else "")
+            tree.insert('', tk.END, values=(
+                stage,
+                file_name,
+                f"{record['wall'] * 1000:.1f}",
+                f"{record['cpu'] * 1000:.1f}",
+                f"{info['bytes']:,}" if info.get('bytes') else "",
+                f"{speed:.1f}" if speed else "",
+            ))
+        
+        totals = trace.summarize(spans)[:4]
+        summary = ", ".join(f"{t['name']} {t['wall'] * 1000:.0f} ms" for t in totals)
+        self.diagnostics_summary.config(
+            text=f"{len(spans)} span(s)" + (f" — slowest: {summary}" if summary else ""))
+    
+    def export_diagnostics(self, extension):
+        """Exporta os spans em JSON lines ou como trace do Chrome"""
+        if extension == '.jsonl':
+            filetypes = [("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        else:
+            filetypes = [("Chrome trace", "*.json"), ("All files", "*.*")]
+        path = filedialog.asksaveasfilename(title="Export Diagnostics",
+                                            defaultextension=extension,
+                                            filetypes=filetypes,
+                                            initialfile=f"sbeditor-profile{extension}")
+        if not path:
+            return
+        try:
+            if extension == '.jsonl':
+                count = trace.export_jsonl(path)
+            else:
+                count = trace.export_chrome(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export diagnostics: {str(e)}")
+            return
+        self.status_var.set(f"Exported {count} span(s) to {os.path.basename(path)}")
+    
+    def clear_diagnostics(self):
+        """Descarta os spans registrados até agora"""
+        trace.get_tracer().clear()
+        self.refresh_diagnostics()
+    
+    def clone_save_to_steamids(self):
+        """Copia o save carregado para as pastas de vários SteamIDs (a origem é lida uma vez)"""
+        if self.busy:
+            return
+        if not self.file_path or not self.file_loaded or not self.current_steamid:
+            messagebox.showwarning("Warning", "Load a save file with a SteamID first!")
+            return
+        text = simpledialog.askstring("Clone Save",
+                                      "Target SteamIDs (separated by commas or spaces):",
+                                      parent=self.root)
+        if not text:
+            return
+        try:
+            steamids = [core.parse_steamid(value) for value in text.replace(',', ' ').split()]
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        file_path = self.file_path
+        source_steamid = self.current_steamid
+        
+        def work(report, cancel):
+            done = []
+            
+            def progress(result):
+                done.append(result)
+                report(100 * len(done) / len(steamids), f"Cloned {len(done)}/{len(steamids)}...")
+            
+            return clone.clone_save(file_path, steamids, source_steamid=source_steamid, progress=progress)
+        
+        def finish(results):
+            failed = [r for r in results if r['error']]
+            lines = [f"{r['steamid']}: {r['error'] or 'OK'}" for r in results]
+            self.status_var.set(f"Cloned to {len(results) - len(failed)} SteamID folder(s)")
+            show = messagebox.showwarning if failed else messagebox.showinfo
+            show("Clone Save", "\n".join(lines))
+        
+        self.run_in_background(f"Cloning {os.path.basename(file_path)}...", work, finish,
+                               lambda e: messagebox.showerror("Error", f"Failed to clone save: {str(e)}"))
+    
+    def patch_save_archive(self):
+        """Varre um zip/tar de saves sem extrair e grava uma cópia com o novo SteamID"""
+        if self.busy:
+            return
+        archive_path = filedialog.askopenfilename(
+            title="Select Save Archive",
+            filetypes=[("Archives", "*.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz"), ("All files", "*.*")],
+            initialdir=os.path.expanduser("~")
+        )
+        if not archive_path:
+            return
+        
+        def work(report, cancel):
+            return archive.scan_archive(archive_path,
+                                        progress=stage_progress(report, "Scanning archive...", 0, 100))
+        
+        self.run_in_background(f"Scanning {os.path.basename(archive_path)}...", work,
+                               lambda results: self.confirm_archive_patch(archive_path, results),
+                               lambda e: messagebox.showerror("Error", f"Failed to read archive: {str(e)}"))
+    
+    def confirm_archive_patch(self, archive_path, results):
+        """Mostra os SteamIDs do arquivo compactado e, com um novo SteamID válido, grava a cópia"""
+        if not results:
+            messagebox.showinfo("Save Archive", "No .sav files found in the archive.")
+            return
+        lines = [f"{r['member']}: {r['hits'][0].steamid if r['hits'] else 'not found'}" for r in results]
+        summary = "Saves in archive:\n\n" + "\n".join(lines)
+        self.status_var.set(f"Archive scanned: {len(results)} save(s)")
+        
+        digits = ''.join(filter(str.isdigit, self.new_steamid_var.get()))
+        if len(digits) != 17:
+            messagebox.showinfo("Save Archive", summary + "\n\nEnter a new 17-digit SteamID "
+                                                         "to write a patched copy.")
+            return
+        if not messagebox.askyesno("Save Archive", summary + f"\n\nWrite a copy with SteamID {digits}?"):
+            return
+        
+        name, extension = os.path.splitext(os.path.basename(archive_path))
+        if name.lower().endswith('.tar'):
+            name, extension = name[:-4], name[-4:] + extension
+        output_path = filedialog.asksaveasfilename(
+            title="Save Patched Archive",
+            initialdir=os.path.dirname(archive_path),
+            initialfile=f"{name}-{digits}{extension}"
+        )
+        if not output_path:
+            return
+        
+        def work(report, cancel):
+            return archive.patch_archive(archive_path, output_path, digits,
+                                         progress=stage_progress(report, "Writing patched archive...", 0, 100))
+        
+        def done(patched):
+            count = sum(1 for r in patched if r['replacements'])
+            self.status_var.set(f"Patched archive written: {os.path.basename(output_path)}")
+            messagebox.showinfo("Success", f"{count} save(s) patched.\n\nArchive: {output_path}")
+        
+        self.run_in_background("Writing patched archive...", work, done,
+                               lambda e: messagebox.showerror("Error", f"Failed to patch archive: {str(e)}"))
+    
+    def compare_saves(self):
+        """Compara o save carregado (ou um escolhido) com o backup ou outro save"""
+        if self.busy:
+            return
+        new_path = self.file_path if self.file_loaded else filedialog.askopenfilename(
+            title="Select Save File",
+            filetypes=[("Save files", "*.sav"), ("All files", "*.*")],
+            initialdir=os.path.expanduser("~")
+        )
+        if not new_path:
+            return
+        backup_path = core.backup_path_for(new_path)
+        old_path = filedialog.askopenfilename(
+            title=f"Compare {os.path.basename(new_path)} with",
+            filetypes=[("Save files", "*.sav *.bak"), ("All files", "*.*")],
+            initialdir=os.path.dirname(new_path),
+            initialfile=os.path.basename(backup_path) if os.path.exists(backup_path) else ''
+        )
+        if not old_path:
+            return
+        
+        def work(report, cancel):
+            return diff.diff_files(old_path, new_path, cancel=cancel,
+                                   progress=stage_progress(report, "Comparing saves...", 0, 100))
+        
+        self.run_in_background("Comparing saves...", work, self.show_diff,
+                               lambda e: messagebox.showerror("Error", f"Failed to compare saves: {str(e)}"))
+    
+    def show_diff(self, result):
+        """Janela com os trechos diferentes entre os dois saves"""
+        ranges = result['ranges']
+        self.status_var.set(f"Compared: {len(ranges)} changed range(s)")
+        
+        diff_window = tk.Toplevel(self.root)
+        diff_window.title("Compare Saves - Stellar Blade SteamID Editor")
+        diff_window.geometry("860x420")
+        diff_window.configure(bg=self.bg_color)
+        
+        main_frame = tk.Frame(diff_window, bg=self.bg_color, padx=15, pady=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        steamid_changes = sum(1 for r in ranges if r['steamid'])
+        tk.Label(main_frame,
+                text=f"Old: {result['old_file']} ({result['old_size']:,} bytes)\n"
+                     f"New: {result['new_file']} ({result['new_size']:,} bytes)\n"
+                     f"{len(ranges)} changed range(s), {steamid_changes} of them SteamID changes; "
+                     f"{result['equal_bytes']:,} bytes unchanged",
+                font=("Arial", 9),
+                bg=self.bg_color,
+                fg=self.label_fg,
+                justify=tk.LEFT,
+                anchor='w').pack(fill=tk.X, pady=(0, 10))
+        
+        # Tabela
+        table_frame = tk.Frame(main_frame, bg=self.bg_color)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ('kind', 'old', 'new', 'property', 'steamid')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', selectmode='browse')
+        for column, heading, width in (('kind', "Kind", 80),
+                                       ('old', "Old offset +size", 140),
+                                       ('new', "New offset +size", 140),
+                                       ('property', "GVAS property", 250),
+                                       ('steamid', "SteamID change", 230)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor='w')
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        hide_steamid_var = tk.BooleanVar(value=False)
+        
+        def fill():
+            tree.delete(*tree.get_children())
+            shown = [r for r in ranges if not (hide_steamid_var.get() and r['steamid'])]
+            for entry in shown[:MAX_DIFF_ROWS]:
+                old_size = entry['old_end'] - entry['old_start']
+                new_size = entry['new_end'] - entry['new_start']
+                tree.insert('', tk.END, values=(
+                    entry['kind'],
+                    f"0x{entry['old_start']:x} +{old_size}" if old_size else "",
+                    f"0x{entry['new_start']:x} +{new_size}" if new_size else "",
+                    entry['property'] or "(outside known property)",
+                    f"{entry['steamid'][0]} -> {entry['steamid'][1]}" if entry['steamid'] else ""
+                ))
+            if len(shown) > MAX_DIFF_ROWS:
+                tree.insert('', tk.END, values=("...", "", "",
+                                                f"{len(shown) - MAX_DIFF_ROWS} more (see 'diff' command)", ""))
+        
+        # Botões
+        button_frame = tk.Frame(main_frame, bg=self.bg_color)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        tk.Checkbutton(button_frame,
+                      text="Hide SteamID changes",
+                      variable=hide_steamid_var,
+                      command=fill,
+                      font=("Arial", 9),
+                      bg=self.bg_color,
+                      fg=self.label_fg,
+                      activebackground=self.bg_color).pack(side=tk.LEFT, padx=(0, 10))
+        tk.Button(button_frame,
+                 text="Close",
+                 command=diff_window.destroy,
+                 bg=self.button_bg,
+                 fg=self.button_fg,
+                 font=("Arial", 9, "bold"),
+                 relief=tk.RAISED,
+                 borderwidth=2,
+                 width=14).pack(side=tk.RIGHT)
+        
+        fill()
+    
     def show_about(self):
         """Mostra informações sobre o programa"""
         messagebox.showinfo("About", 
@@ -216,27 +812,14 @@ class StellarBladeSteamIDEditor:
     
     def auto_find_save_folder(self):
         """Tenta encontrar a pasta de save automaticamente"""
-        save_path = os.path.join(os.getenv('LOCALAPPDATA', ''), 'SB', 'Saved', 'SaveGames')
-        if os.path.exists(save_path):
-            for folder in os.listdir(save_path):
-                if folder.isdigit() and len(folder) == 17:
-                    self.old_steamid_folder = os.path.join(save_path, folder)
-                    sav_file = self.find_sav_file_in_folder(self.old_steamid_folder)
-                    if sav_file:
-                        self.file_path = sav_file
-                        self.file_entry.delete(0, tk.END)
-                        self.file_entry.insert(0, self.file_path)
-                        break
-    
-    def find_sav_file_in_folder(self, folder_path):
-        """Encontra o primeiro arquivo .sav em uma pasta"""
-        if not os.path.exists(folder_path):
-            return None
-        
-        for file in os.listdir(folder_path):
-            if file.lower().endswith('.sav'):
-                return os.path.join(folder_path, file)
-        return None
+        for folder in core.find_steamid_folders():
+            self.old_steamid_folder = folder
+            sav_file = core.find_sav_file_in_folder(folder)
+            if sav_file:
+                self.file_path = sav_file
+                self.file_entry.delete(0, tk.END)
+                self.file_entry.insert(0, self.file_path)
+                break
     
     def create_widgets(self):
         # Frame principal
@@ -308,7 +891,7 @@ class StellarBladeSteamIDEditor:
                                   bg=self.entry_bg)
         self.file_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 10))
         
-        browse_btn = tk.Button(file_inner,
+        self.browse_btn = tk.Button(file_inner,
                               text="Browse",
                               command=self.browse_file,
                               bg=self.button_bg,
@@ -316,7 +899,7 @@ class StellarBladeSteamIDEditor:
                               font=("Arial", 9, "bold"),
                               relief=tk.RAISED,
                               borderwidth=2)
-        browse_btn.pack(side=tk.RIGHT)
+        self.browse_btn.pack(side=tk.RIGHT)
         
         # Frame das informações atuais
         info_frame = tk.LabelFrame(main_frame,
@@ -395,6 +978,16 @@ class StellarBladeSteamIDEditor:
                                     fg='#7f8c8d')
         self.length_label.pack(side=tk.LEFT)
         
+        # Cópia completa .bak (opcional; o diário de desfazer é sempre gravado)
+        self.full_backup_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(new_inner,
+                      text="Also create a full .bak copy of the save",
+                      variable=self.full_backup_var,
+                      font=("Arial", 9),
+                      bg=self.bg_color,
+                      fg=self.label_fg,
+                      activebackground=self.bg_color).pack(anchor='w', pady=(8, 0))
+        
         # Botão de ação principal
         action_frame = tk.Frame(main_frame, bg=self.bg_color)
         action_frame.pack(pady=20)
@@ -430,6 +1023,28 @@ class StellarBladeSteamIDEditor:
                                     pady=5)
         self.status_label.pack(fill=tk.X)
         
+        # Barra de progresso e botão de cancelar
+        progress_frame = tk.Frame(main_frame, bg=self.bg_color)
+        progress_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(progress_frame,
+                                           mode='determinate',
+                                           maximum=100,
+                                           variable=self.progress_var)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.cancel_btn = tk.Button(progress_frame,
+                                   text="Cancel",
+                                   command=self.cancel_background,
+                                   state=tk.DISABLED,
+                                   bg=self.button_bg,
+                                   fg=self.button_fg,
+                                   font=("Arial", 9, "bold"),
+                                   relief=tk.RAISED,
+                                   borderwidth=2)
+        self.cancel_btn.pack(side=tk.RIGHT, padx=(10, 0))
+        
         # Nota rápida
         note_label = tk.Label(main_frame,
                              text="💡 Need help? Click 'Instructions' in the menu above",
@@ -438,9 +1053,88 @@ class StellarBladeSteamIDEditor:
                              fg='#7f8c8d')
         note_label.pack(pady=(10, 0))
     
+    def run_in_background(self, description, work, on_success, on_error=None):
+        """Executa work(report, cancel) numa thread, devolvendo o resultado na thread do Tk"""
+        if self.busy:
+            return
+        
+        self.cancel_event = threading.Event()
+        self.task_queue = queue.Queue()
+        self.set_busy(True, description)
+        
+        task_queue = self.task_queue
+        cancel_event = self.cancel_event
+        
+        def report(percent, text=None):
+            task_queue.put(('progress', percent, text))
+        
+        def runner():
+            try:
+                result = work(report, cancel_event)
+            except core.OperationCancelled:
+                task_queue.put(('cancelled',))
+            except Exception as e:
+                task_queue.put(('error', e))
+            else:
+                task_queue.put(('done', result))
+        
+        threading.Thread(target=runner, daemon=True).start()
+        self.root.after(50, self.poll_background, on_success, on_error)
+    
+    def poll_background(self, on_success, on_error):
+        """Aplica na interface as mensagens enviadas pela thread de trabalho"""
+        while True:
+            try:
+                message = self.task_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            kind = message[0]
+            if kind == 'progress':
+                self.progress_var.set(message[1])
+                if message[2]:
+                    self.status_var.set(message[2])
+                continue
+            
+            self.set_busy(False)
+            if kind == 'done':
+                self.progress_var.set(100)
+                on_success(message[1])
+            elif kind == 'cancelled':
+                self.progress_var.set(0)
+                self.status_var.set("Cancelled - no changes were written")
+            elif on_error:
+                on_error(message[1])
+            else:
+                messagebox.showerror("Error", str(message[1]))
+            return
+        
+        self.root.after(50, self.poll_background, on_success, on_error)
+    
+    def set_busy(self, busy, description=None):
+        """Liga/desliga os controles enquanto uma tarefa roda"""
+        self.busy = busy
+        if busy:
+            self.progress_var.set(0)
+            self.status_var.set(description)
+            self.cancel_btn.config(state=tk.NORMAL)
+            self.browse_btn.config(state=tk.DISABLED)
+            self.replace_btn.config(state=tk.DISABLED, bg='#95a5a6')
+        else:
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.browse_btn.config(state=tk.NORMAL)
+            self.validate_steamid_length()
+    
+    def cancel_background(self):
+        """Pede o cancelamento da tarefa atual"""
+        if self.busy and self.cancel_event:
+            self.cancel_event.set()
+            self.status_var.set("Cancelling...")
+    
     def load_config_file(self):
         """Carrega arquivo configs.user.ini e extrai SteamID"""
-        initial_dir = os.path.expanduser("~")
+        config_path = discovery.find_config()
+        initial_dir = os.path.dirname(config_path) if config_path else os.path.expanduser("~")
         
         file_path = filedialog.askopenfilename(
             title="Select configs.user.ini file",
@@ -448,51 +1142,39 @@ class StellarBladeSteamIDEditor:
             initialdir=initial_dir
         )
         
-        if not file_path:
-            return
-        
+        if file_path:
+            self.apply_config(file_path)
+    
+    def apply_config(self, file_path):
+        """Usa o SteamID de um configs.user.ini como novo SteamID"""
         self.config_path = file_path
         
         try:
-            # Ler arquivo como texto
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            # Procurar account_steamid usando regex
-            steamid_match = re.search(r'account_steamid\s*=\s*(\d+)', content)
-            
-            if steamid_match:
-                steamid_str = steamid_match.group(1)
-                
-                if len(steamid_str) == 17 and steamid_str.startswith('7656'):
-                    # Preencher automaticamente no campo
-                    self.new_steamid_var.set(steamid_str)
-                    
-                    # Atualizar label
-                    self.config_steamid_label.config(
-                        text=f"Loaded: {steamid_str}",
-                        fg=self.success_color
-                    )
-                    
-                    self.status_var.set(f"Config loaded: SteamID {steamid_str}")
-                    
-                    # Se já temos arquivo .sav carregado, validar
-                    if self.file_path:
-                        self.validate_steamid_length()
-                    
-                    messagebox.showinfo("Success", 
-                                      f"SteamID loaded from config:\n{steamid_str}")
-                else:
-                    messagebox.showerror("Error", 
-                                       f"Invalid SteamID in config:\n"
-                                       f"Must be 17 digits starting with 7656\n"
-                                       f"Found: {steamid_str}")
-            else:
-                messagebox.showerror("Error", 
-                                   "account_steamid not found in config file!")
-                
+            steamid_str = core.read_config_steamid(file_path)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load config file: {str(e)}")
+            return
+        
+        # Preencher automaticamente no campo
+        self.new_steamid_var.set(steamid_str)
+        
+        # Atualizar label
+        self.config_steamid_label.config(
+            text=f"Loaded: {steamid_str}",
+            fg=self.success_color
+        )
+        
+        self.status_var.set(f"Config loaded: SteamID {steamid_str}")
+        
+        # Se já temos arquivo .sav carregado, validar
+        if self.file_path:
+            self.validate_steamid_length()
+        
+        messagebox.showinfo("Success", 
+                          f"SteamID loaded from config:\n{steamid_str}")
     
     def validate_steamid_length(self, *args):
         """Valida se o SteamID tem exatamente 17 dígitos"""
@@ -515,7 +1197,7 @@ class StellarBladeSteamIDEditor:
             valid = False
         
         # Ativar/desativar botão
-        if valid and self.file_path and self.current_steamid:
+        if valid and self.file_path and self.current_steamid and not self.busy:
             self.replace_btn.config(state=tk.NORMAL, bg='#27ae60')
         else:
             self.replace_btn.config(state=tk.DISABLED, bg='#95a5a6')
@@ -524,7 +1206,7 @@ class StellarBladeSteamIDEditor:
     
     def browse_file(self):
         """Abre diálogo para selecionar arquivo .sav"""
-        initial_dir = os.path.join(os.getenv('LOCALAPPDATA', ''), 'SB', 'Saved', 'SaveGames')
+        initial_dir = core.default_save_root()
         if not os.path.exists(initial_dir):
             initial_dir = os.path.expanduser("~")
         
@@ -549,13 +1231,22 @@ class StellarBladeSteamIDEditor:
             messagebox.showerror("Error", "File not found!")
             return
         
+        self.file_loaded = False
+        file_path = self.file_path
+        
+        def work(report, cancel):
+            with trace.span('load_file', file=file_path, size=os.path.getsize(file_path)):
+                return self.find_steamid_auto(file_path, report, cancel)
+        
+        self.run_in_background(f"Loading {os.path.basename(file_path)}...",
+                               work, self.finish_load,
+                               lambda e: messagebox.showerror("Error", f"Failed to load file: {str(e)}"))
+    
+    def finish_load(self, steamid):
+        """Atualiza a interface depois que a varredura termina"""
         try:
-            # Ler arquivo
-            with open(self.file_path, 'rb') as f:
-                self.original_data = bytearray(f.read())
-            
-            # Tentar encontrar SteamID
-            self.find_steamid_auto()
+            self.current_steamid = steamid
+            self.file_loaded = True
             
             # Encontrar pasta do save atual
             self.find_current_save_folder()
@@ -581,123 +1272,86 @@ class StellarBladeSteamIDEditor:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load file: {str(e)}")
     
-    def find_steamid_auto(self):
-        """Tenta encontrar SteamID automaticamente"""
-        if not self.original_data:
-            return
-        
-        data = self.original_data
-        
-        # Padrão para SteamID (17 dígitos começando com 7656)
-        steamid_pattern = rb'7656\d{13}'
-        
-        try:
-            data_str = data.decode('ascii', errors='ignore')
-            match = re.search(steamid_pattern.decode(), data_str)
-            
-            if match:
-                steamid_str = match.group(0)
-                if len(steamid_str) == 17:
-                    self.current_steamid = int(steamid_str)
-                    return
-        except:
-            pass
-        
-        self.current_steamid = None
+    def find_steamid_auto(self, file_path, report, cancel):
+        """Tenta encontrar SteamID automaticamente (roda na thread de trabalho, usa o cache)"""
+        cache = get_default_cache()
+        hits, _, from_cache = scan_file_cached(file_path, cache,
+                                               stage_progress(report, "Scanning save file...", 0, 100),
+                                               cancel)
+        if not from_cache:
+            try:
+                cache.save()
+            except OSError:
+                pass
+        return locator.owner_steamid(hits, core.folder_steamid_of(file_path))
     
     def find_current_save_folder(self):
         """Encontra a pasta do save atual"""
         if not self.file_path:
             return
         
-        parent_dir = os.path.dirname(self.file_path)
-        folder_name = os.path.basename(parent_dir)
+        self.old_steamid_folder = core.steamid_folder_of(self.file_path)
         
-        if folder_name.isdigit() and len(folder_name) == 17:
-            self.old_steamid_folder = parent_dir
+        if self.old_steamid_folder:
             self.current_folder_label.config(
-                text=folder_name,
+                text=os.path.basename(self.old_steamid_folder),
                 fg=self.success_color
             )
         else:
-            self.old_steamid_folder = None
             self.current_folder_label.config(
                 text="[Not a SteamID folder]",
                 fg=self.error_color
             )
     
-    def create_backup(self, file_path):
-        """Cria backup do arquivo atual"""
-        backup_path = f"{file_path}.bak"
-        
-        try:
-            shutil.copy2(file_path, backup_path)
-            return backup_path
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to create backup: {str(e)}")
-            return None
-    
-    def replace_steamid_in_file(self, file_path, old_steamid, new_steamid):
-        """Substitui SteamID em um arquivo"""
-        try:
-            with open(file_path, 'rb') as f:
-                data = bytearray(f.read())
-            
-            old_str = str(old_steamid)
-            new_str = str(new_steamid)
-            old_bytes = old_str.encode('ascii')
-            new_bytes = new_str.encode('ascii')
-            
-            replaced = False
-            replacement_count = 0
-            
-            pos = data.find(old_bytes)
-            while pos != -1:
-                data[pos:pos + len(old_bytes)] = new_bytes
-                replaced = True
-                replacement_count += 1
-                pos = data.find(old_bytes, pos + 1)
-            
-            if replaced:
-                with open(file_path, 'wb') as f:
-                    f.write(data)
-                return replacement_count
-            
-            return 0
-            
-        except Exception as e:
-            raise Exception(f"Failed to replace SteamID in file: {str(e)}")
+    def migrate_file(self, file_path, old_steamid, new_steamid, rename, backup, report, cancel):
+        """Troca o SteamID e renomeia a pasta numa transação (roda na thread de trabalho)"""
+        return migrate_save(file_path, new_steamid,
+                            old_steamid=old_steamid,
+                            rename=rename,
+                            backup=backup,
+                            progress=stage_progress(report, "Replacing SteamID...", 0, 100),
+                            cancel=cancel)
     
-    def rename_save_folder(self, old_steamid, new_steamid):
-        """Renomeia a pasta do save game"""
-        if not self.old_steamid_folder:
-            return False, "No save folder found to rename"
-        
-        parent_dir = os.path.dirname(self.old_steamid_folder)
-        new_folder_path = os.path.join(parent_dir, str(new_steamid))
+    def undo_patch(self, redo=False):
+        """Desfaz (ou refaz) a última troca de SteamID registrada no diário"""
+        if self.busy or not self.file_path:
+            return
         
-        if os.path.exists(new_folder_path):
-            return False, f"Folder already exists: {new_steamid}"
+        journal = PatchJournal(self.file_path)
+        if not (journal.can_redo if redo else journal.can_undo):
+            self.status_var.set("Nothing to redo" if redo else "Nothing to undo")
+            return
         
         try:
-            os.rename(self.old_steamid_folder, new_folder_path)
-            
-            # Atualizar caminho do arquivo
-            old_filename = os.path.basename(self.file_path)
-            self.file_path = os.path.join(new_folder_path, old_filename)
+            entry, file_path = journal.redo() if redo else journal.undo()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to {'redo' if redo else 'undo'}: {str(e)}")
+            return
+        
+        if file_path != self.file_path:
+            self.file_path = file_path
             self.file_entry.delete(0, tk.END)
             self.file_entry.insert(0, self.file_path)
-            
-            self.old_steamid_folder = new_folder_path
-            
-            return True, f"Folder renamed to: {new_steamid}"
-            
-        except Exception as e:
-            return False, f"Failed to rename folder: {str(e)}"
+        
+        steamid = entry['new_steamid'] if redo else entry['old_steamid']
+        self.load_file()
+        self.status_var.set(f"{'Redone' if redo else 'Undone'}: SteamID is now {steamid}")
+    
+    def redo_patch(self):
+        """Refaz a troca de SteamID desfeita"""
+        self.undo_patch(redo=True)
+    
+    def set_file_path(self, file_path):
+        """Atualiza o caminho do save (a pasta pode ter sido renomeada)"""
+        self.file_path = file_path
+        self.file_entry.delete(0, tk.END)
+        self.file_entry.insert(0, self.file_path)
+        if self.old_steamid_folder:
+            self.old_steamid_folder = os.path.dirname(file_path)
     
     def replace_steamid_and_folder(self):
         """Substitui o SteamID no arquivo E renomeia a pasta"""
-        if not self.file_path or not self.original_data:
+        if not self.file_path or not self.file_loaded:
             messagebox.showwarning("Warning", "No save file loaded!")
             return
         
@@ -730,32 +1384,43 @@ class StellarBladeSteamIDEditor:
             f"This will:\n"
             f"1. Replace SteamID in save file\n"
             f"2. Rename save folder\n"
-            f"3. Create backup of original file"
+            "3. Record the change in the undo journal"
+            + (" and create a .bak copy" if self.full_backup_var.get() else "")
         )
         
         if not messagebox.askyesno("Confirm Replacement", confirm_msg):
             return
         
-        # Criar backup
-        backup_path = self.create_backup(self.file_path)
-        if not backup_path:
-            return
-        
+        file_path = self.file_path
+        old_steamid = self.current_steamid
+        rename = bool(self.old_steamid_folder)
+        backup = self.full_backup_var.get()
+        
+        def work(report, cancel):
+            # Patch e renomeação numa transação: se a renomeação falhar, o patch é desfeito
+            # (o cancelamento é aceito até antes da gravação)
+            with trace.span('replace_steamid_and_folder', file=file_path,
+                            size=os.path.getsize(file_path)):
+                return self.migrate_file(file_path, old_steamid, new_steamid, rename, backup,
+                                         report, cancel)
+        
+        self.run_in_background("Replacing SteamID...", work,
+                               lambda result: self.finish_replacement(new_steamid, result),
+                               self.replacement_failed)
+    
+    def replacement_failed(self, error):
+        """Mostra erro da substituição"""
+        messagebox.showerror("Error", f"Failed to complete replacement: {str(error)}")
+        self.status_var.set("Error during replacement")
+    
+    def finish_replacement(self, new_steamid, result):
+        """Atualiza a interface depois da substituição e da renomeação da pasta"""
         try:
-            # Substituir no arquivo
-            replacements = self.replace_steamid_in_file(self.file_path, self.current_steamid, new_steamid)
-            
-            if replacements == 0:
-                messagebox.showerror("Error", "Failed to find SteamID in file for replacement!")
-                return
-            
-            # Renomear pasta
-            folder_result = ""
-            if self.old_steamid_folder:
-                success, folder_result = self.rename_save_folder(self.current_steamid, new_steamid)
-                if not success:
-                    messagebox.showwarning("Warning", 
-                                         f"File SteamID replaced but folder rename failed:\n{folder_result}")
+            replacements = result['replacements']
+            backup_path = result['backup']
+            folder_result = result['folder_message']
+            if result['renamed']:
+                self.set_file_path(result['file'])
             
             # Atualizar interface
             self.current_steamid = new_steamid
@@ -771,14 +1436,18 @@ class StellarBladeSteamIDEditor:
             success_msg = (
                 f"✅ SUCCESS!\n\n"
                 f"SteamID replaced in file: {replacements} occurrence(s)\n"
-                f"Backup: {os.path.basename(backup_path)}\n\n"
+                "Undo: Edit > Undo SteamID Change\n"
             )
             
+            if backup_path:
+                success_msg += f"Backup: {os.path.basename(backup_path)} ({result['backup_strategy']})\n"
+            success_msg += "\n"
+            
             if folder_result:
                 success_msg += f"Folder: {folder_result}\n\n"
             
             success_msg += (
-                f"Next steps:\n"
+                "Next steps:\n"
                 f"1. Launch the game with your new SteamID\n"
                 f"2. The save should now load correctly"
             )
@@ -792,9 +1461,21 @@ class StellarBladeSteamIDEditor:
             self.status_var.set("Error during replacement")
 
 def main():
+    parser = argparse.ArgumentParser(description="Stellar Blade SteamID Editor")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="on exit, write per-stage timings to FILE "
+                             "(.jsonl: JSON lines, otherwise a Chrome trace)")
+    args = parser.parse_args()
+    
     root = tk.Tk()
     app = StellarBladeSteamIDEditor(root)
     
+    if args.profile:
+        def close():
+            trace.export(args.profile)
+            root.destroy()
+        root.protocol("WM_DELETE_WINDOW", close)
+    
     # Centralizar janela
     root.update_idletasks()
     width = root.winfo_width()
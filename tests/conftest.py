@@ -0,0 +1,33 @@
+"""Fixtures comuns: saves sintéticos dentro de uma árvore SaveGames temporária"""
+import os
+
+import pytest
+
+from sbeditor import synthetic
+
+OLD_STEAMID = 76561198000000001
+NEW_STEAMID = 76561198000000002
+
+
+def make_save(save_root, steamid=OLD_STEAMID, size=256 * 1024, density=16.0, name='StellarBladeSave00.sav',
+              seed=0):
+    """Grava um save sintético em <save_root>/<steamid>/<name> e retorna o caminho"""
+    folder = os.path.join(str(save_root), str(steamid))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    synthetic.generate_save(path, size, steamid=steamid, density=density, seed=seed)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def isolated_dirs(tmp_path, monkeypatch):
+    """Cache, transações e backups do editor ficam na pasta temporária do teste"""
+    for name in ('SBEDITOR_CACHE_DIR', 'SBEDITOR_TRANSACTION_DIR', 'SBEDITOR_BACKUP_DIR'):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+
+
+@pytest.fixture
+def save_root(tmp_path):
+    root = tmp_path / 'SaveGames'
+    root.mkdir()
+    return root
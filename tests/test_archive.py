@@ -0,0 +1,102 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from sbeditor import archive, core
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def _build(kind, path, save_path):
+    """Arquivo compactado com SteamID/save.sav e um arquivo que não é save"""
+    name = f"SaveGames/{OLD_STEAMID}/{os.path.basename(save_path)}"
+    if kind == 'zip':
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as writer:
+            writer.write(save_path, name)
+            writer.writestr('readme.txt', b'not a save')
+    else:
+        with tarfile.open(path, f'w:{kind}') as writer:
+            writer.add(save_path, name)
+            info = tarfile.TarInfo('readme.txt')
+            info.size = 10
+            writer.addfile(info, io.BytesIO(b'not a save'))
+    return name
+
+
+def _read(path, name):
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as reader:
+            return reader.read(name)
+    with tarfile.open(path) as reader:
+        return reader.extractfile(name).read()
+
+
+@pytest.mark.parametrize('kind, suffix', [('zip', '.zip'), ('gz', '.tar.gz'), ('xz', '.tar.xz')])
+def test_patch_round_trip_matches_in_place_patch(save_root, tmp_path, kind, suffix):
+    save_path = make_save(save_root)
+    source = str(tmp_path / f'saves{suffix}')
+    name = _build(kind, source, save_path)
+    assert archive.scan_archive(source)[0]['hits'][0].steamid == OLD_STEAMID
+
+    output = str(tmp_path / f'patched{suffix}')
+    result, = archive.patch_archive(source, output, NEW_STEAMID, chunk_size=4096)
+    new_name = name.replace(str(OLD_STEAMID), str(NEW_STEAMID))
+    assert result['new_member'] == new_name and result['old_steamid'] == OLD_STEAMID
+
+    core.replace_steamid_in_file(save_path, OLD_STEAMID, NEW_STEAMID)
+    assert _read(output, new_name) == open(save_path, 'rb').read()
+    assert _read(output, 'readme.txt') == b'not a save'
+    assert {hit.steamid for hit in archive.scan_archive(output)[0]['hits']} == {NEW_STEAMID}
+
+
+def test_patch_back_restores_original(save_root, tmp_path):
+    save_path = make_save(save_root)
+    original = open(save_path, 'rb').read()
+    source = str(tmp_path / 'saves.zip')
+    name = _build('zip', source, save_path)
+    patched, restored = str(tmp_path / 'patched.zip'), str(tmp_path / 'restored.zip')
+    archive.patch_archive(source, patched, NEW_STEAMID, old_steamid=OLD_STEAMID)
+    archive.patch_archive(patched, restored, OLD_STEAMID, old_steamid=NEW_STEAMID)
+    assert _read(restored, name) == original
+
+
+def test_output_must_differ_from_input(save_root, tmp_path):
+    source = str(tmp_path / 'saves.zip')
+    _build('zip', source, make_save(save_root))
+    with pytest.raises(ValueError):
+        archive.patch_archive(source, source, NEW_STEAMID)
+
+
+def test_tar_is_read_in_one_pass(save_root, tmp_path, monkeypatch):
+    """Vários saves num tar.gz: nada de getmembers() nem de voltar ao início do fluxo"""
+    saves = [make_save(save_root, name=f'StellarBladeSave{i:02d}.sav', seed=i) for i in range(3)]
+    source = str(tmp_path / 'saves.tar.gz')
+    with tarfile.open(source, 'w:gz') as writer:
+        for save_path in saves:
+            writer.add(save_path, f"SaveGames/{OLD_STEAMID}/{os.path.basename(save_path)}")
+    monkeypatch.setattr(tarfile.TarFile, 'getmembers', None)
+    progress = []
+
+    scanned = archive.scan_archive(source, progress=lambda done, total: progress.append((done, total)))
+    assert [r['hits'][0].steamid for r in scanned] == [OLD_STEAMID] * 3
+    assert progress[-1][0] <= progress[-1][1] == os.path.getsize(source)
+    patched = archive.patch_archive(source, str(tmp_path / 'patched.tar.gz'), NEW_STEAMID)
+    assert [r['old_steamid'] for r in patched] == [OLD_STEAMID] * 3
+    assert all(r['replacements'] for r in patched)
+
+
+def test_rename_without_old_steamid_only_touches_the_owner_folder(save_root, tmp_path):
+    save_path = make_save(save_root)
+    source = str(tmp_path / 'saves.zip')
+    with zipfile.ZipFile(source, 'w') as writer:
+        writer.write(save_path, f"SaveGames/{OLD_STEAMID}/StellarBladeSave00.sav")
+        writer.writestr(f"SaveGames/{OLD_STEAMID}/settings.ini", b'')
+        writer.writestr(f"Screenshots/{OLD_STEAMID}/shot.png", b'')
+    archive.patch_archive(source, str(tmp_path / 'patched.zip'), NEW_STEAMID)
+    with zipfile.ZipFile(str(tmp_path / 'patched.zip')) as reader:
+        assert sorted(reader.namelist()) == [f"SaveGames/{NEW_STEAMID}/StellarBladeSave00.sav",
+                                             f"SaveGames/{NEW_STEAMID}/settings.ini",
+                                             f"Screenshots/{OLD_STEAMID}/shot.png"]
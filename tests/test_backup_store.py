@@ -0,0 +1,31 @@
+from sbeditor import core
+from sbeditor.backup_store import BackupStore
+from sbeditor.migrate import migrate_save
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def _no_scan(*args, **kwargs):
+    raise AssertionError("snapshot must not scan the file again")
+
+
+def test_snapshot_is_labelled_without_scanning(save_root, tmp_path, monkeypatch):
+    path = make_save(save_root)
+    store = BackupStore(str(tmp_path / 'store'))
+    monkeypatch.setattr(core, 'scan_file', _no_scan)
+    assert store.snapshot(path)['steamid'] == OLD_STEAMID
+    assert store.snapshot(path, steamid=NEW_STEAMID)['steamid'] == NEW_STEAMID
+
+
+def test_migrate_snapshot_restores_the_original(save_root, tmp_path):
+    path = make_save(save_root)
+    with open(path, 'rb') as f:
+        original = f.read()
+    store = BackupStore(str(tmp_path / 'store'))
+    result = migrate_save(path, NEW_STEAMID, old_steamid=OLD_STEAMID, rename=False, backup=True,
+                          store=store)
+    snapshot = store.get_snapshot(path, result['snapshot'])
+    assert snapshot['steamid'] == OLD_STEAMID
+    store.restore(path, result['snapshot'])
+    with open(path, 'rb') as f:
+        assert f.read() == original
@@ -0,0 +1,67 @@
+import os
+
+from sbeditor import cache, core, locator
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def _scan(path, scan_cache):
+    return cache.scan_file_cached(path, scan_cache)
+
+
+def test_second_scan_comes_from_cache(save_root, tmp_path):
+    path = make_save(save_root)
+    scan_cache = cache.ScanCache(str(tmp_path / 'cache.json'))
+    hits, content_hash, from_cache = _scan(path, scan_cache)
+    assert not from_cache and hits == core.find_steamid_offsets(core.read_save(path))
+    assert _scan(path, scan_cache) == (hits, content_hash, True)
+
+
+def test_incremental_rescan_matches_full_scan(save_root, tmp_path):
+    path = make_save(save_root, size=6 * cache.DEFAULT_BLOCK_SIZE, density=4)
+    scan_cache = cache.ScanCache(str(tmp_path / 'cache.json'))
+    _scan(path, scan_cache)
+
+    # Um ID novo bem na fronteira de dois blocos
+    encoded = locator.encode_steamid(NEW_STEAMID, locator.ENCODING_UTF16)
+    with open(path, 'r+b') as f:
+        f.seek(3 * cache.DEFAULT_BLOCK_SIZE - 10)
+        f.write(encoded)
+    hits, content_hash, from_cache = _scan(path, scan_cache)
+    data = core.read_save(path)
+    assert not from_cache
+    assert hits == core.find_steamid_offsets(data)
+    assert content_hash == cache.hash_buffer(data)
+    assert NEW_STEAMID in {hit.steamid for hit in hits}
+
+
+def test_replaced_file_with_same_size_and_mtime_is_rescanned(save_root, tmp_path):
+    path = make_save(save_root, size=5 * cache.DEFAULT_BLOCK_SIZE, density=0)
+    scan_cache = cache.ScanCache(str(tmp_path / 'cache.json'))
+    old_hits, _, _ = _scan(path, scan_cache)
+
+    # Novo inode, mesmo tamanho e mtime, com um SteamID novo no bloco 1
+    st = os.stat(path)
+    data = bytearray(core.read_save(path))
+    offset = cache.DEFAULT_BLOCK_SIZE + 1000
+    data[offset:offset + 17] = str(NEW_STEAMID).encode('ascii')
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.utime(path + '.tmp', ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.replace(path + '.tmp', path)
+
+    hits, content_hash, from_cache = _scan(path, scan_cache)
+    assert not from_cache
+    assert hits == core.find_steamid_offsets(data)
+    assert hits == sorted(old_hits + [locator.SteamIDHit(offset, locator.ENCODING_ASCII, NEW_STEAMID)])
+    assert content_hash == cache.hash_buffer(bytes(data))
+
+
+def test_invalidated_entry_is_not_reused(save_root, tmp_path):
+    path = make_save(save_root)
+    scan_cache = cache.ScanCache(str(tmp_path / 'cache.json'))
+    _scan(path, scan_cache)
+    core.replace_steamid_in_file(path, OLD_STEAMID, NEW_STEAMID)
+    scan_cache.invalidate(path)
+    hits, _, from_cache = _scan(path, scan_cache)
+    assert not from_cache and {hit.steamid for hit in hits} == {NEW_STEAMID}
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+from sbeditor import cli, transaction
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+HEAVY_MODULES = ('sbeditor.server', 'sbeditor.archive', 'sbeditor.batch', 'sbeditor.bench', 'sbeditor.watch',
+                 'http.server', 'multiprocessing', 'tarfile', 'zipfile', 'numpy')
+
+
+def test_help_does_not_import_subsystems():
+    code = ("import sys\n"
+            "from sbeditor import cli\n"
+            "cli.build_parser().format_help()\n"
+            "print(' '.join(sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.split()
+    assert not [name for name in HEAVY_MODULES if name in loaded]
+
+
+def test_lazy_defaults_are_resolved():
+    args = cli.resolve_defaults(cli.build_parser().parse_args(['diff', 'a.sav']))
+    assert isinstance(args.block_size, int)
+    args = cli.resolve_defaults(cli.build_parser().parse_args(['generate', 'out.sav', '--size', '1M']))
+    assert args.steamid.isdigit() and ',' in args.encodings
+
+
+@pytest.fixture
+def recover_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(transaction, 'recover', lambda: calls.append(True) or [])
+    return calls
+
+
+def test_recover_runs_only_before_commands_that_write(save_root, recover_calls, capsys):
+    path = make_save(save_root)
+    assert cli.main(['scan', path, '--no-cache']) == 0
+    assert cli.main(['inspect', path]) == 0
+    assert recover_calls == []
+    assert cli.main(['patch', path, '--new', str(NEW_STEAMID), '--no-rename']) == 0
+    assert recover_calls == [True]
+    assert str(OLD_STEAMID) in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('value', ['123', '7656119800000000123', 'abc'])
+def test_invalid_new_steamid_is_a_usage_error(save_root, monkeypatch, capsys, value):
+    path = make_save(save_root)
+    monkeypatch.setattr(cli, 'warn_unsafe_hits', lambda *args: pytest.fail("file was read"))
+    with pytest.raises(SystemExit) as exc:
+        cli.main(['patch', path, '--new', value])
+    assert exc.value.code == 2
+    assert 'argument --new: SteamID must be exactly 17 digits' in capsys.readouterr().err
+
+
+def test_patch_requires_new_or_config(save_root):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(['patch', make_save(save_root)])
+    assert exc.value.code == 2
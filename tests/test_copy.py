@@ -0,0 +1,44 @@
+import errno
+import os
+
+import pytest
+
+from sbeditor import core
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'source.sav'
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    return str(path)
+
+
+@pytest.mark.parametrize('strategy', core.COPY_STRATEGIES)
+def test_each_strategy_copies_the_bytes(source, tmp_path, strategy):
+    target = str(tmp_path / 'target.sav')
+    used = core.copy_file(source, target, strategies=(strategy, 'buffered'))
+    assert used in (strategy, 'buffered')
+    assert open(target, 'rb').read() == open(source, 'rb').read()
+
+
+def _refuse_copy_file_range(monkeypatch, error):
+    def copy_file_range(*args):
+        raise OSError(error, os.strerror(error))
+    monkeypatch.setattr(os, 'copy_file_range', copy_file_range, raising=False)
+
+
+def test_unsupported_strategy_falls_back(source, tmp_path, monkeypatch):
+    _refuse_copy_file_range(monkeypatch, errno.EXDEV)
+    target = str(tmp_path / 'target.sav')
+    assert core.copy_file(source, target, strategies=('copy_file_range', 'buffered')) == 'buffered'
+    assert open(target, 'rb').read() == open(source, 'rb').read()
+
+
+@pytest.mark.parametrize('error', [errno.EPERM, errno.EBADF, errno.EIO])
+def test_real_errors_are_not_hidden_by_fallback(source, tmp_path, monkeypatch, error):
+    _refuse_copy_file_range(monkeypatch, error)
+    target = tmp_path / 'target.sav'
+    with pytest.raises(OSError) as raised:
+        core.copy_file(source, str(target), strategies=('copy_file_range', 'buffered'))
+    assert raised.value.errno == error
+    assert list(tmp_path.iterdir()) == [tmp_path / 'source.sav']
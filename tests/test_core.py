@@ -0,0 +1,54 @@
+from sbeditor import core, locator, synthetic
+from sbeditor.journal import replace_steamid_journaled
+
+from .conftest import NEW_STEAMID, OLD_STEAMID
+
+OTHER_STEAMID = 76561198000000042
+
+
+def test_find_steamid_skips_stray_binary_hits():
+    stray = locator.encode_steamid(OTHER_STEAMID, locator.ENCODING_UINT64)
+    data = b'\0' * 8 + stray + b'\0' * 8 + str(OLD_STEAMID).encode('ascii')
+    assert core.find_steamid(data) == OLD_STEAMID
+    assert core.find_steamid(data[:24]) == OTHER_STEAMID
+
+
+def test_find_steamid_prefers_folder_steamid():
+    data = str(OTHER_STEAMID).encode('ascii') + b'\0' + str(OLD_STEAMID).encode('utf-16-le')
+    assert core.find_steamid(data) == OTHER_STEAMID
+    assert core.find_steamid(data, OLD_STEAMID) == OLD_STEAMID
+    assert core.find_steamid(data, NEW_STEAMID) == OTHER_STEAMID
+
+
+def test_scan_file_uses_folder_name(tmp_path):
+    folder = tmp_path / str(OLD_STEAMID)
+    folder.mkdir()
+    path = folder / 'StellarBladeSave00.sav'
+    path.write_bytes(str(OTHER_STEAMID).encode('ascii') + b'\0' + str(OLD_STEAMID).encode('ascii'))
+    assert core.scan_file(str(path)) == OLD_STEAMID
+
+
+def test_account_id_is_patched_only_inside_int_properties(tmp_path):
+    path = str(tmp_path / 'save.sav')
+    synthetic.generate_save(path, 256 * 1024, steamid=OLD_STEAMID, density=16,
+                            encodings=(locator.ENCODING_ACCOUNT_ID, locator.ENCODING_ASCII))
+    data = bytearray(open(path, 'rb').read())
+    inside = [hit.offset for hit in locator.locate_steamids(data, [OLD_STEAMID])
+              if hit.encoding == locator.ENCODING_ACCOUNT_ID]
+    assert inside
+    # Os mesmos 4 bytes dentro do Payload (array de bytes) do registro
+    account_id = locator.encode_steamid(OLD_STEAMID, locator.ENCODING_ACCOUNT_ID)
+    stray = inside[0] + 200
+    data[stray:stray + 4] = account_id
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    hits = core.find_steamid_offsets(data, OLD_STEAMID)
+    assert stray not in {hit.offset for hit in hits}
+    assert set(inside) <= {hit.offset for hit in hits}
+
+    replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID)
+    patched = open(path, 'rb').read()
+    assert patched[stray:stray + 4] == account_id
+    new_account_id = locator.encode_steamid(NEW_STEAMID, locator.ENCODING_ACCOUNT_ID)
+    assert all(patched[offset:offset + 4] == new_account_id for offset in inside)
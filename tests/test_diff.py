@@ -0,0 +1,70 @@
+import random
+import shutil
+
+import pytest
+
+from sbeditor import core, diff
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def _rebuild(old, new, ranges):
+    """Aplica os trechos ao arquivo antigo; deve dar o arquivo novo"""
+    out, position = bytearray(), 0
+    for entry in sorted(ranges, key=lambda r: r['old_start']):
+        out += old[position:entry['old_start']] + new[entry['new_start']:entry['new_end']]
+        position = entry['old_end']
+    return bytes(out + old[position:])
+
+
+def _edit(rng, data):
+    data = bytearray(data)
+    for _ in range(rng.randrange(1, 6)):
+        at = rng.randrange(len(data))
+        action = rng.choice(('change', 'insert', 'delete'))
+        if action == 'change':
+            data[at:at + rng.randrange(1, 40)] = rng.randbytes(rng.randrange(1, 40))
+        elif action == 'insert':
+            data[at:at] = rng.randbytes(rng.randrange(1, 5000))
+        else:
+            del data[at:at + rng.randrange(1, 5000)]
+    return bytes(data)
+
+
+@pytest.mark.parametrize('block_size', [16, 512, diff.DEFAULT_BLOCK_SIZE])
+def test_ranges_rebuild_the_new_file(block_size):
+    rng = random.Random(block_size)
+    for _ in range(30):
+        old = rng.randbytes(rng.randrange(1, 200_000))
+        new = _edit(rng, old)
+        matches = diff.match_blocks(old, new, block_size)
+        assert _rebuild(old, new, diff.changed_ranges(old, new, matches)) == new
+
+
+def test_identical_files_have_no_ranges(save_root):
+    path = make_save(save_root)
+    result = diff.diff_files(path, path)
+    assert result['ranges'] == [] and result['equal_bytes'] == result['new_size']
+
+
+def test_steamid_patch_is_reported_as_steamid_change(save_root, tmp_path):
+    path = make_save(save_root)
+    patched = str(tmp_path / 'patched.sav')
+    shutil.copyfile(path, patched)
+    hits = core.find_steamid_offsets(core.read_save(patched), OLD_STEAMID)
+    core.replace_steamid_in_file(patched, OLD_STEAMID, NEW_STEAMID)
+
+    result = diff.diff_files(path, patched)
+    assert result['old_size'] == result['new_size']
+    assert len(result['ranges']) == len(hits)
+    assert all(entry['steamid'] == (OLD_STEAMID, NEW_STEAMID) for entry in result['ranges'])
+
+
+@pytest.mark.skipif(not diff.numpy_available(), reason="NumPy not installed")
+def test_numpy_rolling_hash_matches_pure_python(monkeypatch):
+    rng = random.Random(3)
+    old = rng.randbytes(2 * diff.NUMPY_MIN_SIZE)
+    new = _edit(rng, old)
+    with_numpy = diff.match_blocks(old, new, 64)
+    monkeypatch.setattr(diff, 'numpy_available', lambda: False)
+    assert diff.match_blocks(old, new, 64) == with_numpy
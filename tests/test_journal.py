@@ -0,0 +1,82 @@
+import pytest
+
+from sbeditor import core, journal
+from sbeditor.journal import PatchJournal, replace_steamid_journaled
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def test_undo_redo_round_trip(save_root):
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+
+    count, entry = replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID)
+    assert count == len(entry['patches']) > 0
+    patched = open(path, 'rb').read()
+    assert journal.hash_file(path) == entry['hash_after']
+
+    PatchJournal(path).undo()
+    assert open(path, 'rb').read() == original
+    PatchJournal(path).redo()
+    assert open(path, 'rb').read() == patched
+
+
+def test_undo_refuses_changed_file(save_root):
+    path = make_save(save_root)
+    _, entry = replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID)
+    offset = entry['patches'][0][0]
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(b'x')
+    with pytest.raises(Exception, match="File changed"):
+        PatchJournal(path).undo()
+
+
+def _fail_after(monkeypatch, writes):
+    """Faz o patch no lugar falhar depois de gravar alguns offsets"""
+    real_pwrite = core._pwrite
+    done = []
+
+    def flaky_pwrite(f, data, offset):
+        if len(done) == writes:
+            raise OSError("disk full")
+        done.append(offset)
+        return real_pwrite(f, data, offset)
+    monkeypatch.setattr(core, '_pwrite', flaky_pwrite)
+
+
+def test_failure_mid_patch_restores_written_bytes(save_root, monkeypatch):
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+    _fail_after(monkeypatch, 2)
+    with pytest.raises(Exception, match="disk full"):
+        replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID, verify=False)
+    assert open(path, 'rb').read() == original
+    assert not PatchJournal(path).entries
+
+
+def test_failed_rollback_keeps_incomplete_entry_for_undo(save_root, monkeypatch):
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+    _fail_after(monkeypatch, 2)
+    monkeypatch.setattr(PatchJournal, '_restore_written',
+                        lambda self, entry: (_ for _ in ()).throw(OSError("read-only")))
+    with pytest.raises(Exception, match="disk full"):
+        replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID, verify=False)
+    monkeypatch.undo()
+
+    patch_journal = PatchJournal(path)
+    assert patch_journal.entries[-1]['incomplete']
+    patch_journal.undo()
+    assert open(path, 'rb').read() == original
+
+
+def test_failed_verification_undoes_the_patch(save_root, monkeypatch):
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+    # Hash esperado errado: a conferência depois da gravação falha
+    monkeypatch.setattr(journal, 'hash_with_patches', lambda data, patches: '0' * 64)
+    with pytest.raises(Exception, match="Verification failed"):
+        replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID)
+    assert open(path, 'rb').read() == original
+    assert not PatchJournal(path).entries
@@ -0,0 +1,107 @@
+import random
+import re
+
+import pytest
+
+from sbeditor import locator
+
+from .conftest import OLD_STEAMID
+
+OTHER_STEAMID = 76561198000000042
+
+
+def _reference(data, steamids=None, encodings=locator.ALL_ENCODINGS):
+    """Regex única com uma alternativa por codificação (a definição das ocorrências)"""
+    alternatives = []
+    if steamids:
+        for encoding in locator.ALL_ENCODINGS:
+            if encoding in encodings:
+                literals = b'|'.join(re.escape(locator.encode_steamid(s, encoding)) for s in sorted(steamids))
+                alternatives.append(b'(?P<%s>%s)' % (encoding.encode('ascii'), literals))
+    else:
+        for encoding, pattern, lead in locator._GENERIC_PATTERNS:
+            if encoding in encodings:
+                alternatives.append(b'(?P<%s>%s%s)' % (encoding.encode('ascii'), b'.' * lead, pattern))
+    regex = re.compile(b'|'.join(alternatives), re.DOTALL)
+    return [locator.SteamIDHit(m.start(), m.lastgroup, locator.decode_steamid(m.group(), m.lastgroup))
+            for m in regex.finditer(data)]
+
+
+def _random_buffer(rng):
+    pieces = []
+    for _ in range(rng.randrange(1, 12)):
+        steamid = rng.choice((OLD_STEAMID, OTHER_STEAMID))
+        encoded = locator.encode_steamid(steamid, rng.choice(locator.ALL_ENCODINGS))
+        pieces.append(rng.choice((
+            encoded,
+            encoded[:rng.randrange(len(encoded))],
+            locator.STEAMID64_HIGH_DWORD,
+            '7656'.encode('utf-16-le'),
+            b'7656' + bytes(rng.choice(b'0123456789') for _ in range(rng.randrange(20))),
+            rng.randbytes(rng.randrange(6)),
+        )))
+    return b''.join(pieces)
+
+
+@pytest.mark.parametrize('encoding', locator.ALL_ENCODINGS)
+def test_each_encoding_is_found(encoding):
+    data = b'header' + locator.encode_steamid(OLD_STEAMID, encoding) + b'trailer'
+    hits = locator.locate_steamids(data, [OLD_STEAMID])
+    assert hits == [locator.SteamIDHit(6, encoding, OLD_STEAMID)]
+    if encoding != locator.ENCODING_ACCOUNT_ID:
+        assert locator.locate_steamids(data) == hits
+
+
+def test_uint64_wins_over_account_id_prefix():
+    data = locator.encode_steamid(OLD_STEAMID, locator.ENCODING_UINT64)
+    assert [hit.encoding for hit in locator.locate_steamids(data, [OLD_STEAMID])] == ['uint64']
+    only_account = locator.locate_steamids(data, [OLD_STEAMID], encodings=(locator.ENCODING_ACCOUNT_ID,))
+    assert [hit.encoding for hit in only_account] == ['account_id']
+
+
+def test_matches_single_alternation_on_random_buffers():
+    rng = random.Random(4)
+    for _ in range(500):
+        data = _random_buffer(rng)
+        for steamids in (None, [OLD_STEAMID], [OLD_STEAMID, OTHER_STEAMID]):
+            for encodings in (locator.ALL_ENCODINGS, (locator.ENCODING_ASCII, locator.ENCODING_UTF16),
+                              (locator.ENCODING_UINT64,)):
+                assert locator.locate_steamids(data, steamids, encodings) == _reference(data, steamids, encodings)
+
+
+def test_chunk_boundaries_do_not_split_or_duplicate_hits():
+    rng = random.Random(7)
+    for _ in range(200):
+        data = _random_buffer(rng)
+        expected = locator.locate_steamids(data)
+        for chunk_size in (1, 3, 16, 33, 34, 35):
+            assert locator.locate_steamids_chunked(data, chunk_size=chunk_size) == expected
+
+
+def test_chunked_reports_progress_and_cancels():
+    data = b'\0' * 100 + locator.encode_steamid(OLD_STEAMID, locator.ENCODING_ASCII)
+    calls = []
+    locator.locate_steamids_chunked(data, chunk_size=40, progress=lambda done, total: calls.append(done))
+    assert calls == [40, 80, 117]
+
+    def cancel():
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        locator.locate_steamids_chunked(data, check_cancel=cancel)
+
+
+def test_window_limits_are_respected():
+    encoded = locator.encode_steamid(OLD_STEAMID, locator.ENCODING_ASCII)
+    data = encoded + b'..' + encoded
+    assert [hit.offset for hit in locator.locate_steamids(data, start=1)] == [19]
+    assert locator.locate_steamids(data, end=len(data) - 1)[1:] == []
+
+
+def test_owner_prefers_folder_then_text_then_binary():
+    stray = locator.SteamIDHit(0, locator.ENCODING_UINT64, OTHER_STEAMID)
+    text = locator.SteamIDHit(40, locator.ENCODING_UTF16, OLD_STEAMID)
+    assert locator.owner_steamid([stray, text]) == OLD_STEAMID
+    assert locator.owner_steamid([stray, text], folder_steamid=OTHER_STEAMID) == OTHER_STEAMID
+    assert locator.owner_steamid([stray, text], folder_steamid=76561198000000099) == OLD_STEAMID
+    assert locator.owner_steamid([stray]) == OTHER_STEAMID
+    assert locator.owner_steamid([]) is None
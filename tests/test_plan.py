@@ -0,0 +1,61 @@
+import os
+
+from sbeditor import plan
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def _targets():
+    return {str(OLD_STEAMID): NEW_STEAMID}
+
+
+def test_plan_round_trips_through_file(save_root, tmp_path):
+    make_save(save_root)
+    made = plan.make_plan(save_root, _targets())
+    path = str(tmp_path / 'migration.json.gz')
+    plan.save_plan(made, path)
+    assert plan.load_plan(path) == made
+    assert plan.plan_summary(made)['renames'] == 1
+
+
+def test_apply_twice_is_idempotent(save_root):
+    make_save(save_root)
+    made = plan.make_plan(save_root, _targets())
+
+    first, = plan.apply_plans([made])
+    assert first['renamed'] and all(f['replacements'] and not f['error'] for f in first['files'])
+    patched = open(first['files'][0]['file'], 'rb').read()
+
+    second, = plan.apply_plans([made])
+    assert second['message'] == "Already applied (folder already renamed)"
+    assert all(not f['error'] for f in second['files'])
+    assert open(first['files'][0]['file'], 'rb').read() == patched
+
+
+def test_apply_skips_saves_already_patched(save_root):
+    done = make_save(save_root, name='StellarBladeSave00.sav', seed=1)
+    pending = make_save(save_root, name='StellarBladeSave01.sav', seed=2)
+    made = plan.make_plan(save_root, _targets(), rename=False)
+    entry = made['folders'][0]['files'][0]
+    plan.rewrite_patches(done, entry['patches'], forward=True)
+
+    result, = plan.apply_plans([made])
+    by_name = {os.path.basename(f['file']): f for f in result['files']}
+    assert by_name['StellarBladeSave00.sav']['skipped']
+    assert not by_name['StellarBladeSave00.sav']['error']
+    assert by_name['StellarBladeSave01.sav']['replacements'] > 0
+    assert plan.hash_file(pending) == made['folders'][0]['files'][1]['hash_after']
+
+    again, = plan.apply_plans([made])
+    assert again['message'] == "Already applied"
+    assert all(f['skipped'] and not f['error'] for f in again['files'])
+
+
+def test_apply_refuses_changed_save(save_root):
+    path = make_save(save_root)
+    made = plan.make_plan(save_root, _targets(), rename=False)
+    with open(path, 'r+b') as f:
+        f.write(b'X')
+    result, = plan.apply_plans([made])
+    assert result['files'][0]['error'] == "content changed since the plan was made"
+    assert result['message'].startswith("Skipped")
@@ -0,0 +1,125 @@
+import http.client
+import json
+import os
+import threading
+import time
+
+from sbeditor import clone, server
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+def test_scan_and_patch(save_root):
+    path = make_save(save_root)
+    service = server.EditorService(workers=2)
+    try:
+        scanned = service.dispatch('scan', {'paths': [path]})['results'][0]
+        assert scanned['steamid'] == OLD_STEAMID
+        result = service.dispatch('patch', {'file': path, 'new': str(NEW_STEAMID), 'rename': False})
+        assert result['replacements'] > 0
+        assert service.dispatch('scan', {'paths': path})['results'][0]['steamid'] == NEW_STEAMID
+    finally:
+        service.close()
+
+
+def _post(port, operation, params):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('POST', f'/{operation}', json.dumps(params),
+                           {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_scan_and_patch_over_http(save_root):
+    path = make_save(save_root)
+    service = server.EditorService(workers=2)
+    httpd = server.EditorServer(service, port=0)
+    port = httpd.server_address[1]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        status, body = _post(port, 'scan', {'paths': [path]})
+        assert status == 200
+        assert body['results'][0]['steamid'] == OLD_STEAMID
+
+        status, body = _post(port, 'patch', {'file': path, 'new': str(NEW_STEAMID)})
+        assert status == 200
+        assert body['replacements'] > 0 and body['renamed']
+        new_path = clone.clone_target_path(path, NEW_STEAMID)
+        assert os.path.exists(new_path)
+
+        status, body = _post(port, 'scan', {'paths': [new_path]})
+        assert status == 200
+        assert body['results'][0]['steamid'] == NEW_STEAMID
+
+        status, body = _post(port, 'patch', {'file': new_path, 'new': 'not-a-steamid'})
+        assert status == 400 and 'error' in body
+        status, body = _post(port, 'nope', {})
+        assert status == 400 and 'nope' in body['error']
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+    thread.join(5)
+
+
+def test_patch_with_rename_locks_the_new_folder(save_root, monkeypatch):
+    """Quem já usa o caminho renomeado precisa esperar o patch que renomeia a pasta"""
+    path = make_save(save_root)
+    new_path = clone.clone_target_path(path, NEW_STEAMID)
+    service = server.EditorService(workers=1)
+    held = {}
+    real_migrate_save = server.migrate_save
+
+    def checking_migrate_save(*args, **kwargs):
+        for name, target in (('old', path), ('new', new_path)):
+            held[name] = service._locks[service.lock_key(target)].locked()
+        return real_migrate_save(*args, **kwargs)
+
+    monkeypatch.setattr(server, 'migrate_save', checking_migrate_save)
+    try:
+        service.dispatch('patch', {'file': path, 'new': str(NEW_STEAMID)})
+    finally:
+        service.close()
+    assert held == {'old': True, 'new': True}
+
+
+def test_scan_during_clone_does_not_deadlock(save_root, monkeypatch):
+    """Um scan que ocupa todo o pool esperando o lock do clone não pode travar as cópias"""
+    source = make_save(save_root, size=2 * 1024 * 1024)
+    target = clone.clone_target_path(source, NEW_STEAMID)
+    clone_started = threading.Event()
+    scan_sent = threading.Event()
+    real_clone_save = clone.clone_save
+
+    def slow_clone_save(*args, **kwargs):
+        # Com os locks já tomados, deixa o scan ocupar o único worker do pool
+        clone_started.set()
+        scan_sent.wait(5)
+        time.sleep(0.3)
+        return real_clone_save(*args, **kwargs)
+
+    monkeypatch.setattr(clone, 'clone_save', slow_clone_save)
+    service = server.EditorService(workers=1)
+    results = {}
+    clone_thread = threading.Thread(target=lambda: results.update(
+        clone=service.dispatch('clone', {'file': source, 'to': [str(NEW_STEAMID)]})))
+    scan_thread = threading.Thread(target=lambda: results.update(
+        scan=service.dispatch('scan', {'paths': [source, target]})))
+    try:
+        clone_thread.start()
+        assert clone_started.wait(5)
+        scan_thread.start()
+        scan_sent.set()
+        clone_thread.join(30)
+        scan_thread.join(30)
+        assert not clone_thread.is_alive() and not scan_thread.is_alive(), "clone and scan deadlocked"
+    finally:
+        scan_sent.set()
+    service.close()
+
+    assert results['clone']['results'][0]['error'] is None
+    assert [r['steamid'] for r in results['scan']['results']] == [OLD_STEAMID, NEW_STEAMID]
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from sbeditor import journal, transaction
+from sbeditor.transaction import STATE_PATCHING, Transaction
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+@pytest.fixture(autouse=True)
+def owner_is_dead(monkeypatch):
+    """As transações do teste passam por interrompidas (dono morto)"""
+    monkeypatch.setattr(transaction, '_process_alive', lambda pid: False)
+
+
+def _interrupted_migration(save_root, written):
+    """Migração que morreu com só os primeiros `written` offsets do save gravados"""
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+    folder = os.path.dirname(path)
+    tx = Transaction.begin([path], OLD_STEAMID, NEW_STEAMID, folder=folder)
+    tx.set_state(STATE_PATCHING)
+    _, entry = journal.replace_steamid_journaled(path, OLD_STEAMID, NEW_STEAMID)
+    with open(path, 'r+b') as f:
+        for offset, old_hex, _ in entry['patches'][written:]:
+            f.seek(offset)
+            f.write(bytes.fromhex(old_hex))
+    return path, original, entry
+
+
+def test_interrupted_before_any_change_is_discarded(save_root):
+    path = make_save(save_root)
+    original = open(path, 'rb').read()
+    Transaction.begin([path], OLD_STEAMID, NEW_STEAMID, folder=os.path.dirname(path))
+
+    result, = transaction.recover()
+    assert result['action'] == 'discarded'
+    assert open(path, 'rb').read() == original
+    assert transaction.recover() == []
+
+
+def test_partial_patch_is_rolled_forward(save_root):
+    path, _, entry = _interrupted_migration(save_root, written=1)
+
+    result, = transaction.recover()
+    assert result['action'] == 'rolled_forward', result['message']
+    new_path = os.path.join(save_root, str(NEW_STEAMID), os.path.basename(path))
+    assert not os.path.exists(path)
+    assert journal.hash_file(new_path) == entry['hash_after']
+    assert transaction.recover() == []
+
+
+def test_failed_roll_forward_is_rolled_back(save_root):
+    path, original, _ = _interrupted_migration(save_root, written=2)
+    # A pasta de destino aparece no meio: a renomeação falha
+    os.makedirs(os.path.join(save_root, str(NEW_STEAMID)))
+
+    result, = transaction.recover()
+    assert result['action'] == 'rolled_back', result['message']
+    assert open(path, 'rb').read() == original
+    assert not journal.PatchJournal(path).entries
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from sbeditor import core, watch
+
+from .conftest import NEW_STEAMID, OLD_STEAMID, make_save
+
+
+@pytest.fixture
+def moved_save(save_root):
+    """Save com o SteamID antigo dentro da pasta do novo (como depois de uma sincronização)"""
+    path = make_save(save_root)
+    folder = os.path.join(str(save_root), str(NEW_STEAMID))
+    os.rename(os.path.dirname(path), folder)
+    return os.path.join(folder, os.path.basename(path))
+
+
+def test_patches_save_to_folder_steamid(save_root, moved_save):
+    watcher = watch.SaveWatcher(str(save_root))
+    result = watcher.check_file(moved_save)
+    assert result['action'] == 'patched'
+    assert (result['old_steamid'], result['new_steamid']) == (OLD_STEAMID, NEW_STEAMID)
+    assert core.scan_file(moved_save) == NEW_STEAMID
+
+
+def test_unchanged_hash_skips_the_scan(save_root, moved_save, monkeypatch):
+    watcher = watch.SaveWatcher(str(save_root))
+    watcher.check_file(moved_save)
+
+    def no_scan(path):
+        raise AssertionError("scanned a save whose hash did not change")
+    monkeypatch.setattr(core, 'scan_file', no_scan)
+    assert watcher.check_file(moved_save) is None